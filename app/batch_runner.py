@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from playwright.sync_api import sync_playwright
+
+from app.browser_pool import BrowserPool
+from app.checkpoint import RunJournal, journal_path_for
+from app.excel_writer import ExcelWriter
+from app.pacser_maps import YandexMapsScraper, new_browser_context
+from app.request_blocking import RequestBlocker
+from app.stopwords import passes_filters
+from app.utils import build_result_paths, configure_logging, split_query
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class QueryResult:
+    query: str
+    output_path: Optional[Path] = None
+    count: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+
+def read_queries(path: Path) -> list[str]:
+    queries: list[str] = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        query = line.split("#", 1)[0].strip()
+        if query:
+            queries.append(query)
+    return queries
+
+
+def unique_queries(queries: Iterable[str]) -> list[str]:
+    seen: set[str] = set()
+    result: list[str] = []
+    for query in queries:
+        key = query.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            result.append(query.strip())
+    return result
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        queries: Iterable[str],
+        settings,
+        results_dir: Path,
+        limit: Optional[int] = None,
+        reuse_context: bool = False,
+        extra_log_path: Optional[Path] = None,
+        writer_factory: Callable[[Path], object] = ExcelWriter,
+        stop_event=None,
+        pause_event=None,
+        captcha_resume_event=None,
+        captcha_hook=None,
+        log: Optional[Callable[[str], None]] = None,
+        dedup_index=None,
+        skip_known: bool = False,
+        context_max_pages: int = 300,
+        context_max_minutes: float = 20.0,
+        scraper_kwargs: Optional[dict] = None,
+    ) -> None:
+        self.queries = unique_queries(queries)
+        self.settings = settings
+        self.results_dir = Path(results_dir)
+        self.limit = limit
+        self.reuse_context = reuse_context
+        self.extra_log_path = extra_log_path
+        self.writer_factory = writer_factory
+        self.stop_event = stop_event or threading.Event()
+        self.pause_event = pause_event or threading.Event()
+        self.captcha_resume_event = captcha_resume_event or threading.Event()
+        self.captcha_hook = captcha_hook
+        self.log = log
+        # dedup_index пополняется всегда; skip_known — ещё и пропускать уже известные карточки.
+        self.dedup_index = dedup_index
+        self.skip_known = skip_known and dedup_index is not None
+        self.context_max_pages = context_max_pages
+        self.context_max_minutes = context_max_minutes
+        self.scraper_kwargs = scraper_kwargs or {}
+        # Один блокировщик на пакет: маршруты ставит фабрика контекстов пула.
+        self.request_blocker = RequestBlocker(self.scraper_kwargs.get("block_preset", "off"))
+        self.results: list[QueryResult] = []
+
+    def run(self) -> list[QueryResult]:
+        self.results = []
+        if not self.queries:
+            return self.results
+
+        with sync_playwright() as p:
+            LOGGER.info("Запускаю браузер для пакета из %s запросов", len(self.queries))
+            block_preset = self.scraper_kwargs.get("block_preset", "off")
+            pool = BrowserPool(
+                p,
+                context_factory=lambda browser: new_browser_context(browser, self.request_blocker),
+                launch_args=YandexMapsScraper.launch_args(block_preset),
+                # Без reuse_context каждый запрос получает свежий контекст, как раньше.
+                max_leases=None if self.reuse_context else 1,
+                max_pages=self.context_max_pages,
+                max_age=self.context_max_minutes * 60,
+            )
+            try:
+                pool.warm()
+                for query in self.queries:
+                    if self.stop_event.is_set():
+                        break
+                    self.results.append(self._run_query(query, pool))
+            finally:
+                pool.close()
+                LOGGER.info("Браузер закрыт")
+        return self.results
+
+    def _make_scraper(
+        self, query: str, pool=None, journal=None, profile_path=None
+    ) -> YandexMapsScraper:
+        kwargs = dict(self.scraper_kwargs)
+        kwargs["request_blocker"] = self.request_blocker
+        if profile_path is not None:
+            kwargs["profile_path"] = profile_path
+        if self.skip_known:
+            kwargs["seen_ids"] = self.dedup_index
+        return YandexMapsScraper(
+            query=query,
+            limit=self.limit,
+            stop_event=self.stop_event,
+            pause_event=self.pause_event,
+            captcha_resume_event=self.captcha_resume_event,
+            captcha_hook=self.captcha_hook,
+            log=self.log,
+            browser_pool=pool,
+            journal=journal,
+            **kwargs,
+        )
+
+    def _run_query(self, query: str, pool: BrowserPool) -> QueryResult:
+        niche, city = split_query(query)
+        output_path, results_folder = build_result_paths(
+            niche=niche,
+            city=city,
+            results_dir=self.results_dir,
+        )
+        configure_logging(
+            self.settings.program.log_level,
+            self.extra_log_path,
+            results_folder / "log.txt",
+        )
+        result = QueryResult(query=query, output_path=output_path)
+        started = time.monotonic()
+        writer = self.writer_factory(output_path)
+        journal = RunJournal(journal_path_for(output_path))
+        journal.write_header(query, output_path, self.limit)
+        try:
+            scraper = self._make_scraper(
+                query, pool, journal, profile_path=results_folder / "profile.json"
+            )
+            for org in scraper.run():
+                include = passes_filters(org, self.settings)
+                writer.append(org, include_in_potential=include)
+                if self.dedup_index is not None:
+                    self.dedup_index.add(org, query=query)
+                result.count += 1
+        except Exception as exc:
+            LOGGER.exception("Запрос завершился с ошибкой: %s", query)
+            result.error = str(exc) or exc.__class__.__name__
+        finally:
+            writer.close()
+            journal.close()
+            result.seconds = time.monotonic() - started
+        LOGGER.info(
+            "Запрос готов: %s — %s организаций за %.1fs",
+            query,
+            result.count,
+            result.seconds,
+        )
+        return result
+
+
+def format_summary(results: list[QueryResult]) -> str:
+    if not results:
+        return "Пакет пуст"
+    width = max(len(result.query) for result in results)
+    lines = [f"{'Запрос'.ljust(width)}  {'Орг.':>6}  {'Время, с':>9}  {'Орг./мин':>9}"]
+    total_count = 0
+    total_seconds = 0.0
+    for result in results:
+        per_minute = result.count * 60.0 / result.seconds if result.seconds > 0 else 0.0
+        line = (
+            f"{result.query.ljust(width)}  {result.count:>6}  "
+            f"{result.seconds:>9.1f}  {per_minute:>9.1f}"
+        )
+        if result.error:
+            line += f"  ошибка: {result.error}"
+        lines.append(line)
+        total_count += result.count
+        total_seconds += result.seconds
+    lines.append(
+        f"Итого: запросов={len(results)}, организаций={total_count}, время={total_seconds:.1f}s"
+    )
+    return "\n".join(lines)
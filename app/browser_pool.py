@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from app.playwright_utils import launch_chrome
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PooledContext:
+    context: object
+    number: int
+    created_at: float = field(default_factory=time.monotonic)
+    pages_opened: int = 0
+    leases: int = 0
+    captcha_hit: bool = False
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+
+# Playwright sync API однопоточный: пул — не очередь для потоков, а хозяин
+# жизненного цикла браузера и контекстов между запросами одного потока.
+class BrowserPool:
+    def __init__(
+        self,
+        playwright,
+        context_factory: Callable[[object], object],
+        launch_args: Optional[list[str]] = None,
+        warm_size: int = 1,
+        max_pages: int = 300,
+        max_age: float = 20 * 60,
+        max_leases: Optional[int] = None,
+        browser_max_contexts: int = 50,
+    ) -> None:
+        self.playwright = playwright
+        self.context_factory = context_factory
+        self.launch_args = list(launch_args or [])
+        self.warm_size = max(0, warm_size)
+        # Контекст пересоздаётся после max_pages вкладок, max_age секунд или max_leases запросов.
+        self.max_pages = max_pages
+        self.max_age = max_age
+        self.max_leases = max_leases
+        # Сам браузер перезапускается после browser_max_contexts контекстов — против утечек памяти Chrome.
+        self.browser_max_contexts = browser_max_contexts
+        self.created = 0
+        self.recycled = 0
+        self.evicted_captcha = 0
+        self.browser_restarts = 0
+        self._browser = None
+        self._browser_contexts = 0
+        self._idle: deque[PooledContext] = deque()
+        self._leased: dict[int, PooledContext] = {}
+        self._numbers = itertools.count(1)
+
+    @property
+    def browser(self):
+        if self._browser is None or not self._is_connected(self._browser):
+            if self._browser is not None:
+                LOGGER.info("Браузер пула недоступен — перезапускаю")
+                self.browser_restarts += 1
+                self._drop_idle()
+            LOGGER.info("Запускаю браузер пула")
+            self._browser = launch_chrome(self.playwright, args=self.launch_args)
+            self._browser_contexts = 0
+        return self._browser
+
+    def warm(self) -> None:
+        while len(self._idle) < self.warm_size:
+            self._idle.append(self._create())
+
+    def acquire(self) -> PooledContext:
+        while self._idle:
+            entry = self._idle.popleft()
+            if self._healthy(entry):
+                break
+            self._dispose(entry, "не прошёл проверку")
+        else:
+            entry = self._create()
+        entry.leases += 1
+        self._leased[entry.number] = entry
+        return entry
+
+    def release(self, entry: PooledContext, evict: bool = False, reason: str = "ошибка запроса") -> None:
+        self._leased.pop(entry.number, None)
+        if entry.captcha_hit:
+            self.evicted_captcha += 1
+            self._dispose(entry, "капча")
+        elif evict:
+            self._dispose(entry, reason)
+        elif not self._healthy(entry):
+            self.recycled += 1
+            self._dispose(entry, "исчерпан лимит")
+        else:
+            self._close_extra_pages(entry)
+            self._idle.append(entry)
+        if self._browser_contexts >= self.browser_max_contexts and not self._leased:
+            self._restart_browser()
+        # Новый контекст создаст следующий acquire(): после последнего запроса
+        # прогрев был бы лишней работой перед закрытием.
+
+    def close(self) -> None:
+        for entry in list(self._leased.values()):
+            self._dispose(entry, "закрытие пула")
+        self._leased.clear()
+        self._drop_idle()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                LOGGER.debug("Failed to close pool browser", exc_info=True)
+            self._browser = None
+        LOGGER.info("Пул браузера: %s", self.summary())
+
+    def summary(self) -> str:
+        return (
+            f"контекстов создано={self.created}, переработано={self.recycled}, "
+            f"выброшено после капчи={self.evicted_captcha}, перезапусков браузера={self.browser_restarts}"
+        )
+
+    def _create(self) -> PooledContext:
+        browser = self.browser
+        context = self.context_factory(browser)
+        entry = PooledContext(context=context, number=next(self._numbers))
+        try:
+            context.on("page", lambda _page: self._count_page(entry))
+        except Exception:
+            LOGGER.debug("Failed to subscribe to context pages", exc_info=True)
+        self.created += 1
+        self._browser_contexts += 1
+        LOGGER.debug("Pool context #%s created", entry.number)
+        return entry
+
+    @staticmethod
+    def _count_page(entry: PooledContext) -> None:
+        entry.pages_opened += 1
+
+    def _healthy(self, entry: PooledContext) -> bool:
+        if entry.captcha_hit:
+            return False
+        if self.max_pages and entry.pages_opened >= self.max_pages:
+            return False
+        if self.max_age and entry.age >= self.max_age:
+            return False
+        if self.max_leases and entry.leases >= self.max_leases:
+            return False
+        browser = self._browser
+        if browser is None or not self._is_connected(browser):
+            return False
+        try:
+            return entry.context in browser.contexts
+        except Exception:
+            return False
+
+    def _close_extra_pages(self, entry: PooledContext) -> None:
+        # В контексте между запросами не должно оставаться вкладок — они держат память.
+        try:
+            for page in list(entry.context.pages):
+                page.close()
+        except Exception:
+            LOGGER.debug("Failed to close leftover pages", exc_info=True)
+
+    def _dispose(self, entry: PooledContext, reason: str) -> None:
+        LOGGER.info(
+            "Закрываю контекст #%s (%s): вкладок=%s, запросов=%s, возраст=%.0fs",
+            entry.number,
+            reason,
+            entry.pages_opened,
+            entry.leases,
+            entry.age,
+        )
+        try:
+            entry.context.close()
+        except Exception:
+            LOGGER.debug("Failed to close pool context", exc_info=True)
+
+    def _drop_idle(self) -> None:
+        while self._idle:
+            self._dispose(self._idle.popleft(), "сброс пула")
+
+    def _restart_browser(self) -> None:
+        self._drop_idle()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                LOGGER.debug("Failed to close pool browser", exc_info=True)
+        self._browser = None
+        self.browser_restarts += 1
+        LOGGER.info("Перезапускаю браузер пула после %s контекстов", self._browser_contexts)
+
+    @staticmethod
+    def _is_connected(browser) -> bool:
+        try:
+            return browser.is_connected()
+        except Exception:
+            return False
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Признаки капчи Яндекса: редирект на /showcaptcha и разметка SmartCaptcha.
+CAPTCHA_URL_MARKERS = ("showcaptcha", "checkcaptcha")
+CAPTCHA_SELECTOR = (
+    ".CheckboxCaptcha, .AdvancedCaptcha, .SmartCaptcha, "
+    "form[action*='checkcaptcha'], iframe[src*='captcha']"
+)
+SIGNAL_BINDING = "__serpCaptchaSignal"
+
+# Наблюдатель DOM в странице: появление разметки капчи сразу сообщается в Python
+# через expose_binding, без опроса из скрапера.
+CAPTCHA_WATCH_SCRIPT = """
+(selector, binding) => {
+  if (window.__serpCaptchaWatch) return;
+  window.__serpCaptchaWatch = true;
+  let pending = false;
+  let signalled = false;
+  const check = () => {
+    pending = false;
+    if (signalled || !document.querySelector(selector)) return;
+    signalled = true;
+    if (window[binding]) window[binding]();
+  };
+  const start = () => {
+    check();
+    new MutationObserver(() => {
+      if (pending || signalled) return;
+      pending = true;
+      setTimeout(check, 50);
+    }).observe(document.documentElement, { childList: true, subtree: true });
+  };
+  if (document.documentElement) start();
+  else document.addEventListener("DOMContentLoaded", start);
+}
+"""
+
+
+def is_captcha_url(url: str) -> bool:
+    return any(marker in (url or "") for marker in CAPTCHA_URL_MARKERS)
+
+
+# is_captcha() — круг IPC к браузеру на каждую карточку. Вместо этого главная
+# вкладка подписывается на навигацию и наблюдатель DOM: полная проверка идёт,
+# только когда они подняли флаг, и для страховки раз в recheck_every вызовов.
+class CaptchaProbe:
+    def __init__(self, recheck_every: int = 50) -> None:
+        self.recheck_every = max(1, int(recheck_every))
+        self.page = None
+        self.dirty = True
+        self.since_check = 0
+        self.checks = 0
+        self.skipped = 0
+        self.signals = 0
+
+    def install(self, page, current_document: bool = False) -> None:
+        self.page = page
+        self.dirty = True
+        script = f"({CAPTCHA_WATCH_SCRIPT})({json.dumps(CAPTCHA_SELECTOR)}, {json.dumps(SIGNAL_BINDING)})"
+        try:
+            page.on("framenavigated", self._on_navigated)
+            page.expose_binding(SIGNAL_BINDING, self._on_signal)
+            page.add_init_script(script)
+            if current_document:
+                page.evaluate(f"() => {script}")
+        except Exception:
+            # Без наблюдателя проверяем капчу на каждом вызове, как раньше.
+            LOGGER.debug("Failed to install captcha watcher", exc_info=True)
+            self.page = None
+
+    def mark(self) -> None:
+        self.dirty = True
+
+    def due(self, page) -> bool:
+        if page is not self.page or self.dirty or self.since_check >= self.recheck_every:
+            if page is self.page:
+                self.dirty = False
+                self.since_check = 0
+            self.checks += 1
+            return True
+        self.since_check += 1
+        self.skipped += 1
+        return False
+
+    def summary(self) -> str:
+        return f"проверок={self.checks}, пропущено={self.skipped}, сигналов={self.signals}"
+
+    def _on_navigated(self, frame) -> None:
+        if frame.parent_frame is None and is_captcha_url(frame.url):
+            self.signals += 1
+            self.dirty = True
+
+    def _on_signal(self, _source=None, *args) -> None:
+        self.signals += 1
+        self.dirty = True
+
+
+# AIMD по темпу: капча умножает паузы на backoff (и вдвое сильнее сверх бюджета),
+# каждые clean_cards карточек без капчи множитель уменьшается на step, пока
+# капч за окно меньше бюджета. Сессия ротируется заранее — до того числа карточек,
+# на котором сессии обычно ловят капчу.
+class CaptchaGovernor:
+    def __init__(
+        self,
+        budget: float = 2.0,
+        window: float = 3600.0,
+        card_pause: tuple[float, float] = (0.1, 0.3),
+        backoff: float = 2.0,
+        step: float = 0.1,
+        clean_cards: int = 25,
+        min_scale: float = 0.25,
+        max_scale: float = 16.0,
+        rotate_margin: float = 0.8,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # budget — допустимое число капч за window секунд (по умолчанию в час).
+        self.budget = max(0.0, float(budget))
+        self.window = window
+        self.card_pause = card_pause
+        self.backoff = backoff
+        self.step = step
+        self.clean_cards = max(1, int(clean_cards))
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.rotate_margin = rotate_margin
+        self.clock = clock
+        self.scale = 1.0
+        self.cards = 0
+        self.captcha_total = 0
+        self.captcha_wait = 0.0
+        self.paused = 0.0
+        self.sessions = 0
+        self.rotations = 0
+        self.session_cards = 0
+        self.session_captchas = 0
+        # Сглаженное число карточек, после которого сессия получает первую капчу.
+        self.cards_per_session: Optional[float] = None
+        self.started_at = clock()
+        self._clean_streak = 0
+        self._captchas: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def captchas_in_window(self) -> int:
+        with self._lock:
+            self._trim(self.clock())
+            return len(self._captchas)
+
+    def over_budget(self) -> bool:
+        return self.captchas_in_window() >= self.budget
+
+    def scaled(self, low: float, high: float) -> tuple[float, float]:
+        scale = self.scale
+        return low * scale, high * scale
+
+    def next_delay(self) -> float:
+        low, high = self.card_pause
+        if high <= 0:
+            return 0.0
+        return random.uniform(low, high) * self.scale
+
+    def pace(self, stop_event=None) -> None:
+        delay = self.next_delay()
+        if delay <= 0:
+            return
+        if stop_event is not None:
+            stop_event.wait(delay)
+        else:
+            time.sleep(delay)
+        self.paused += delay
+
+    def workers(self, requested: int) -> int:
+        if self.scale <= 1.0:
+            return requested
+        return max(1, math.ceil(requested / self.scale))
+
+    def on_card(self) -> None:
+        with self._lock:
+            self.cards += 1
+            self.session_cards += 1
+            self._clean_streak += 1
+            if self._clean_streak < self.clean_cards:
+                return
+            self._clean_streak = 0
+            self._trim(self.clock())
+            if len(self._captchas) < self.budget:
+                self.scale = max(self.min_scale, round(self.scale - self.step, 6))
+
+    def on_captcha(self, waited: float = 0.0) -> None:
+        with self._lock:
+            now = self.clock()
+            self._captchas.append(now)
+            self._trim(now)
+            self.captcha_total += 1
+            self.captcha_wait += waited
+            self._clean_streak = 0
+            if not self.session_captchas:
+                sample = float(self.session_cards)
+                previous = self.cards_per_session
+                self.cards_per_session = sample if previous is None else 0.7 * previous + 0.3 * sample
+            self.session_captchas += 1
+            factor = self.backoff
+            if len(self._captchas) > self.budget:
+                factor *= self.backoff
+            self.scale = min(self.max_scale, self.scale * factor)
+            in_window = len(self._captchas)
+        LOGGER.info(
+            "Капча: множитель пауз %.2f (капч за окно %s, бюджет %s)",
+            self.scale,
+            in_window,
+            _number(self.budget),
+        )
+
+    def start_session(self) -> None:
+        with self._lock:
+            self.sessions += 1
+            self.session_cards = 0
+            self.session_captchas = 0
+
+    def should_rotate(self) -> bool:
+        limit = self.cards_per_session
+        if limit is None or self.session_captchas:
+            return False
+        return self.session_cards >= max(1.0, limit * self.rotate_margin)
+
+    def rotated(self) -> None:
+        self.rotations += 1
+        LOGGER.info(
+            "Ротация сессии после %s карточек (капча обычно после %.0f)",
+            self.session_cards,
+            self.cards_per_session or 0,
+        )
+
+    def cards_per_hour(self) -> float:
+        elapsed = self.clock() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.cards * 3600.0 / elapsed
+
+    def summary(self) -> str:
+        return (
+            f"карточек={self.cards}, капч={self.captcha_total} "
+            f"(за окно {self.captchas_in_window()}/{_number(self.budget)}), "
+            f"множитель пауз={self.scale:.2f}, пауз={self.paused:.1f}s, "
+            f"ожидание капч={self.captcha_wait:.1f}s, сессий={self.sessions}, "
+            f"ротаций={self.rotations}, {self.cards_per_hour():.0f} карточек/ч"
+        )
+
+    def _trim(self, now: float) -> None:
+        while self._captchas and now - self._captchas[0] > self.window:
+            self._captchas.popleft()
+
+
+def _number(value: float) -> str:
+    return f"{value:g}"
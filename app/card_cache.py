@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.organization import Organization, organization_from_dict, organization_to_dict
+
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class CardCache:
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        refresh: bool = False,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        # refresh: не читаем старые записи, но свежие результаты сохраняем.
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cards (
+                org_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+
+    def get(self, org_id: str) -> Optional[Organization]:
+        if self.refresh or not org_id:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, updated_at FROM cards WHERE org_id = ?", (org_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        try:
+            org = organization_from_dict(json.loads(row[0]))
+        except (ValueError, TypeError):
+            LOGGER.debug("Broken cache entry for %s", org_id, exc_info=True)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return org
+
+    def put(self, org_id: str, org: Organization) -> None:
+        if not org_id:
+            return
+        payload = json.dumps(organization_to_dict(org), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cards (org_id, payload, updated_at) VALUES (?, ?, ?)",
+                (org_id, payload, time.time()),
+            )
+        self.writes += 1
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM cards WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            )
+        return cursor.rowcount
+
+    def summary(self) -> str:
+        return f"попаданий={self.hits}, промахов={self.misses}, записано={self.writes}"
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                LOGGER.debug("Failed to close card cache", exc_info=True)
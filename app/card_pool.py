@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Generator, Iterable, Optional
+
+from playwright.sync_api import BrowserContext, Page
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolStats:
+    started: int = 0
+    parsed: int = 0
+    failed: int = 0
+    retries: int = 0
+    captcha_hits: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def cards_per_minute(self) -> float:
+        elapsed = self.elapsed
+        if elapsed <= 0:
+            return 0.0
+        return self.parsed * 60.0 / elapsed
+
+
+@dataclass
+class _WorkerSlot:
+    page: Page
+    org_id: str = ""
+    url: str = ""
+    started_at: float = 0.0
+    attempts: int = 0
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.org_id)
+
+
+# Playwright sync API однопоточный, поэтому вкладки пула опрашиваются по кругу:
+# навигация запускается без ожидания, а карточки разбираются в порядке готовности.
+class CardFetchPool:
+    card_selector = "div.business-card-view[data-id]"
+    card_id_selector = "div.business-card-view[data-id='{org_id}']"
+    poll_interval = 0.05
+    max_attempts = 2
+
+    def __init__(
+        self,
+        context: BrowserContext,
+        parse_card: Callable[[object, str], object],
+        url_for_id: Callable[[str], str],
+        ensure_no_captcha: Callable[[Page], Optional[Page]],
+        concurrency: int = 4,
+        card_timeout: float = 15.0,
+        setup_page: Optional[Callable[[Page], None]] = None,
+        stop_event=None,
+        pause_event=None,
+        progress_every: int = 25,
+        stage_timer=None,
+        governor=None,
+        main_page: Optional[Page] = None,
+    ) -> None:
+        self.context = context
+        self.parse_card = parse_card
+        self.url_for_id = url_for_id
+        self.ensure_no_captcha = ensure_no_captcha
+        self.concurrency = max(1, int(concurrency))
+        self.card_timeout = card_timeout
+        self.setup_page = setup_page
+        self.stop_event = stop_event or threading.Event()
+        self.pause_event = pause_event or threading.Event()
+        self.progress_every = progress_every
+        self.stage_timer = stage_timer
+        # Регулятор темпа (app.captcha_governor): сколько вкладок грузят карточки
+        # одновременно и пауза между стартами навигаций.
+        self.governor = governor
+        # Вкладка скрапера: пул её не закрывает, даже если капчу решали в ней.
+        self.main_page = main_page
+        self.stats = PoolStats()
+        self._next_start_at = 0.0
+        self._pages: list[Page] = []
+
+    def fetch(self, org_ids: Iterable[str]) -> Generator[tuple[str, object], None, None]:
+        pending = deque(org_ids)
+        total = len(pending)
+        LOGGER.info(
+            "Пул карточек: организаций=%s, вкладок=%s", total, self.concurrency
+        )
+        slots: list[_WorkerSlot] = []
+        try:
+            for _ in range(min(self.concurrency, total)):
+                page = self.context.new_page()
+                page.set_default_timeout(20000)
+                if self.setup_page is not None:
+                    self.setup_page(page)
+                slots.append(_WorkerSlot(page=page))
+                self._pages.append(page)
+
+            while pending or any(slot.busy for slot in slots):
+                if self.stop_event.is_set():
+                    return
+                if self.pause_event.is_set():
+                    while self.pause_event.is_set() and not self.stop_event.is_set():
+                        time.sleep(0.1)
+                    # Таймауты не должны истекать, пока пользователь держит паузу.
+                    now = time.monotonic()
+                    for slot in slots:
+                        if slot.busy:
+                            slot.started_at = now
+
+                active = sum(1 for slot in slots if slot.busy)
+                limit = self.governor.workers(len(slots)) if self.governor is not None else len(slots)
+                for slot in slots:
+                    if slot.busy:
+                        continue
+                    if active >= limit or not pending or not self._may_start():
+                        break
+                    self._start(slot, pending.popleft())
+                    active += 1
+
+                progressed = False
+                for slot in slots:
+                    if not slot.busy:
+                        continue
+                    outcome = self._poll(slot)
+                    if outcome is None:
+                        continue
+                    progressed = True
+                    if outcome is _STOP:
+                        return
+                    if outcome is _RETRY:
+                        continue
+                    org_id = slot.org_id
+                    slot.org_id = ""
+                    if outcome is _FAILED:
+                        continue
+                    self.stats.parsed += 1
+                    if self.progress_every and self.stats.parsed % self.progress_every == 0:
+                        self._log_progress(total)
+                    yield org_id, outcome
+
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            for slot in slots:
+                try:
+                    slot.page.close()
+                except Exception:
+                    LOGGER.debug("Failed to close pool page", exc_info=True)
+            self._log_progress(total)
+
+    def _may_start(self) -> bool:
+        if self.governor is None:
+            return True
+        now = time.monotonic()
+        if now < self._next_start_at:
+            return False
+        self._next_start_at = now + self.governor.next_delay()
+        return True
+
+    def _start(self, slot: _WorkerSlot, org_id: str) -> None:
+        slot.org_id = org_id
+        slot.url = self.url_for_id(org_id)
+        slot.attempts += 1
+        slot.started_at = time.monotonic()
+        self.stats.started += 1
+        try:
+            slot.page.evaluate("(url) => { window.location.assign(url); }", slot.url)
+        except Exception:
+            # Навигация может оборвать evaluate — это ожидаемо.
+            LOGGER.debug("Navigation evaluate interrupted (id=%s)", org_id, exc_info=True)
+
+    def _poll(self, slot: _WorkerSlot):
+        page = slot.page
+        if "showcaptcha" in (page.url or ""):
+            self.stats.captcha_hits += 1
+            LOGGER.info("Капча во вкладке пула (id=%s)", slot.org_id)
+            if not self._resolve_captcha(slot):
+                return _STOP
+            return self._retry(slot)
+
+        card = self._ready_card(slot)
+        if card is not None:
+            if self.stage_timer is not None:
+                # Время до готовности карточки с точностью до интервала опроса.
+                self.stage_timer.record("card_wait", time.monotonic() - slot.started_at)
+            try:
+                org = self.parse_card(card, slot.org_id)
+            except Exception:
+                LOGGER.info("Ошибка разбора карточки в пуле (id=%s)", slot.org_id)
+                self.stats.failed += 1
+                slot.attempts = 0
+                return _FAILED
+            slot.attempts = 0
+            return org
+
+        if time.monotonic() - slot.started_at < self.card_timeout:
+            return None
+
+        if not self._resolve_captcha(slot):
+            return _STOP
+        return self._retry(slot)
+
+    def _resolve_captcha(self, slot: _WorkerSlot) -> bool:
+        resolved = self.ensure_no_captcha(slot.page)
+        if resolved is None:
+            return False
+        # Капчу могли решать в другой вкладке: слот остаётся на своей, лишнюю закрываем.
+        if resolved is not slot.page and resolved is not self.main_page and resolved not in self._pages:
+            try:
+                resolved.close()
+            except Exception:
+                LOGGER.debug("Failed to close captcha page", exc_info=True)
+        return True
+
+    def _ready_card(self, slot: _WorkerSlot):
+        try:
+            locator = slot.page.locator(self.card_id_selector.format(org_id=slot.org_id))
+            if locator.count() > 0:
+                return locator.first
+            # Старый DOM остаётся до смены документа, поэтому общий
+            # селектор допустим только после перехода на URL нужной карточки.
+            if slot.org_id in (slot.page.url or ""):
+                locator = slot.page.locator(self.card_selector)
+                if locator.count() > 0:
+                    return locator.first
+        except Exception:
+            return None
+        return None
+
+    def _retry(self, slot: _WorkerSlot):
+        org_id = slot.org_id
+        if slot.attempts >= self.max_attempts:
+            LOGGER.info("Карточка не загрузилась в пуле (id=%s)", org_id)
+            self.stats.failed += 1
+            slot.attempts = 0
+            return _FAILED
+        self.stats.retries += 1
+        self._start(slot, org_id)
+        return _RETRY
+
+    def _log_progress(self, total: int) -> None:
+        LOGGER.info(
+            "Пул карточек: готово %s/%s, ошибок=%s, повторов=%s, капч=%s, %.1f карточек/мин",
+            self.stats.parsed,
+            total,
+            self.stats.failed,
+            self.stats.retries,
+            self.stats.captcha_hits,
+            self.stats.cards_per_minute(),
+        )
+
+
+_STOP = object()
+_RETRY = object()
+_FAILED = object()
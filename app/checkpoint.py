@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.organization import Organization, organization_from_dict, organization_to_dict
+
+
+LOGGER = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+def journal_path_for(output_path: Path) -> Path:
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}{JOURNAL_SUFFIX}")
+
+
+@dataclass
+class JournalState:
+    query: str = ""
+    output_path: Optional[Path] = None
+    limit: Optional[int] = None
+    all_ids: list[str] = field(default_factory=list)
+    ids_complete: bool = False
+    orgs: dict[str, Organization] = field(default_factory=dict)
+
+    @property
+    def known_ids(self) -> Optional[list[str]]:
+        # Потоковый сбор пишет id порциями: без отметки о конце списка журнал
+        # знает только его начало, и выдачу нужно собрать заново.
+        return self.all_ids if self.ids_complete else None
+
+
+class RunJournal:
+    # Одна запись — одна строка JSON. Обрыв на середине строки портит только её,
+    # поэтому загрузка просто пропускает нечитаемый хвост.
+    def __init__(self, path: Path, fsync_every: int = 10) -> None:
+        self.path = Path(path)
+        self.fsync_every = max(1, fsync_every)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self) -> None:
+        # После падения последняя строка может быть оборвана: без перевода строки
+        # первая новая запись склеилась бы с ней и пропала при загрузке.
+        try:
+            with open(self.path, "rb") as handle:
+                handle.seek(0, os.SEEK_END)
+                if handle.tell() == 0:
+                    return
+                handle.seek(-1, os.SEEK_END)
+                if handle.read(1) == b"\n":
+                    return
+        except OSError:
+            LOGGER.debug("Failed to check journal tail %s", self.path, exc_info=True)
+            return
+        self._file.write("\n")
+        self._file.flush()
+
+    def write_header(self, query: str, output_path: Path, limit: Optional[int] = None) -> None:
+        self._write(
+            {"type": "run", "query": query, "output": str(output_path), "limit": limit},
+            sync=True,
+        )
+
+    def write_ids(self, ids: Iterable[str]) -> None:
+        self._write({"type": "ids", "ids": list(ids)}, sync=True)
+
+    def mark_ids_complete(self) -> None:
+        self._write({"type": "ids_complete"}, sync=True)
+
+    def write_org(self, org_id: str, org: Organization) -> None:
+        self._write({"type": "org", "id": org_id, "org": organization_to_dict(org)})
+
+    def _write(self, record: dict, sync: bool = False) -> None:
+        record["ts"] = round(time.time(), 3)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            if sync or self._pending >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            try:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            finally:
+                self._file.close()
+
+    @staticmethod
+    def load(path: Path) -> JournalState:
+        state = JournalState()
+        seen_ids: set[str] = set()
+        with open(path, encoding="utf-8") as handle:
+            for line_no, line in enumerate(handle, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    LOGGER.info("Пропускаю повреждённую строку журнала %s:%s", path, line_no)
+                    continue
+                if not isinstance(record, dict):
+                    LOGGER.info("Пропускаю повреждённую строку журнала %s:%s", path, line_no)
+                    continue
+                kind = record.get("type")
+                if kind == "run":
+                    state.query = record.get("query") or state.query
+                    if record.get("output"):
+                        state.output_path = Path(record["output"])
+                    state.limit = record.get("limit")
+                elif kind == "ids":
+                    for org_id in record.get("ids") or []:
+                        if org_id not in seen_ids:
+                            seen_ids.add(org_id)
+                            state.all_ids.append(org_id)
+                elif kind == "ids_complete":
+                    state.ids_complete = True
+                elif kind == "org" and record.get("id") and isinstance(record.get("org"), dict):
+                    state.orgs[record["id"]] = organization_from_dict(record["org"])
+        return state
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.links import canonical_website, website_domain
+from app.organization import (
+    Organization,
+    merge_organizations,
+    organization_from_dict,
+    organization_to_dict,
+)
+from app.phones import normalize_phone
+from app.stopwords import normalize_phrase
+
+
+LOGGER = logging.getLogger(__name__)
+
+CARD_ID_RE = re.compile(r"/maps/org/(?:[^/]+/)?(\d+)")
+# Общие площадки: один домен у тысяч несвязанных организаций — не признак дубля.
+SHARED_DOMAINS = frozenset(
+    {
+        "vk.com",
+        "vk.ru",
+        "ok.ru",
+        "t.me",
+        "wa.me",
+        "instagram.com",
+        "facebook.com",
+        "youtube.com",
+        "taplink.cc",
+        "taplink.ws",
+        "yandex.ru",
+        "2gis.ru",
+        "avito.ru",
+        "tilda.ws",
+        "wixsite.com",
+        "ucoz.ru",
+        "narod.ru",
+        "business.site",
+    }
+)
+
+# Общие номера — не признак дубля: 8-800/8-804 (федеральные линии, колл-центры сетей).
+# Номер или домен, который указали больше MAX_KEY_ORGS разных организаций, тоже не ключ.
+SHARED_PHONE_PREFIXES = ("+7800", "+7804")
+MAX_KEY_ORGS = 3
+MASTERS_BATCH = 500
+
+
+def org_id_from_card_url(card_url: str) -> str:
+    match = CARD_ID_RE.search(card_url or "")
+    return match.group(1) if match else ""
+
+
+def dedup_keys(org: Organization) -> list[tuple[str, str]]:
+    keys = []
+    # Добавочный не часть ключа: старые записи кэша и журнала могли хранить его в phone.
+    phone = normalize_phone(org.phone or "").partition(";")[0]
+    if phone and not phone.startswith(SHARED_PHONE_PREFIXES):
+        keys.append(("phone", phone))
+    domain = website_domain(canonical_website(org.website or ""))
+    if domain and domain not in SHARED_DOMAINS:
+        keys.append(("domain", domain))
+    return keys
+
+
+class DedupIndex:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.added = 0
+        self.merged = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # ids: каждый встреченный id → id основной записи; keys: телефон/домен → основная запись;
+        # key_orgs: какие id указали номер или домен (для порога MAX_KEY_ORGS).
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ids (
+                org_id TEXT PRIMARY KEY,
+                master_id TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS keys (
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                master_id TEXT NOT NULL,
+                PRIMARY KEY (kind, value)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS key_orgs (
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                org_id TEXT NOT NULL,
+                PRIMARY KEY (kind, value, org_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS masters (
+                master_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                queries TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            """
+        )
+
+    def __contains__(self, org_id: object) -> bool:
+        if not isinstance(org_id, str) or not org_id:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM ids WHERE org_id = ?", (org_id,)).fetchone()
+        if row is not None:
+            self.skipped += 1
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM masters").fetchone()[0]
+
+    def find_master(self, org_id: str, org: Organization) -> Optional[str]:
+        with self._lock:
+            return self._find_master(org_id, org, self._usable_keys(dedup_keys(org)))
+
+    def _usable_keys(self, keys: list[tuple[str, str]], org_id: str = "") -> list[tuple[str, str]]:
+        usable = []
+        for kind, value in keys:
+            if org_id:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO key_orgs (kind, value, org_id) VALUES (?, ?, ?)",
+                    (kind, value, org_id),
+                )
+            users = self._conn.execute(
+                "SELECT COUNT(*) FROM key_orgs WHERE kind = ? AND value = ?", (kind, value)
+            ).fetchone()[0]
+            if users <= MAX_KEY_ORGS:
+                usable.append((kind, value))
+        return usable
+
+    def _find_master(self, org_id: str, org: Organization, keys: list[tuple[str, str]]) -> Optional[str]:
+        if org_id:
+            row = self._conn.execute("SELECT master_id FROM ids WHERE org_id = ?", (org_id,)).fetchone()
+            if row is not None:
+                return row[0]
+        # Один ключ — не дубль: общий номер офиса или сайт сети есть у разных филиалов.
+        # Нужны два ключа на одну запись (телефон и домен) или телефон плюс то же название.
+        votes: dict[str, list[str]] = {}
+        for kind, value in keys:
+            row = self._conn.execute(
+                "SELECT master_id FROM keys WHERE kind = ? AND value = ?", (kind, value)
+            ).fetchone()
+            if row is not None:
+                votes.setdefault(row[0], []).append(kind)
+        for master_id, kinds in votes.items():
+            if len(kinds) >= 2 or ("phone" in kinds and self._same_name(master_id, org)):
+                return master_id
+        return None
+
+    def _same_name(self, master_id: str, org: Organization) -> bool:
+        name = normalize_phrase(org.name or "")
+        if not name:
+            return False
+        row = self._conn.execute("SELECT payload FROM masters WHERE master_id = ?", (master_id,)).fetchone()
+        return row is not None and normalize_phrase(json.loads(row[0]).get("name") or "") == name
+
+    def add(self, org: Organization, query: str = "", org_id: str = "") -> tuple[str, bool]:
+        # Возвращает (id основной записи, новая ли организация).
+        org_id = org_id or org_id_from_card_url(org.card_url)
+        keys = dedup_keys(org)
+        if not org_id:
+            if not keys:
+                return "", True
+            org_id = f"{keys[0][0]}:{keys[0][1]}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                keys = self._usable_keys(keys, org_id)
+                master_id = self._find_master(org_id, org, keys)
+                is_new = master_id is None
+                if is_new:
+                    master_id = org_id
+                    self._conn.execute(
+                        "INSERT INTO masters (master_id, payload, queries, first_seen, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (master_id, self._dump(org), json.dumps([query] if query else []), now, now),
+                    )
+                else:
+                    self._merge_into(master_id, org, query, now)
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO ids (org_id, master_id) VALUES (?, ?)", (org_id, master_id)
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO keys (kind, value, master_id) VALUES (?, ?, ?)",
+                    [(kind, value, master_id) for kind, value in keys],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if is_new:
+            self.added += 1
+        else:
+            self.merged += 1
+        return master_id, is_new
+
+    def _merge_into(self, master_id: str, org: Organization, query: str, now: float) -> None:
+        row = self._conn.execute(
+            "SELECT payload, queries FROM masters WHERE master_id = ?", (master_id,)
+        ).fetchone()
+        if row is None:
+            return
+        master = organization_from_dict(json.loads(row[0]))
+        queries = json.loads(row[1])
+        if query and query not in queries:
+            queries.append(query)
+        merged = merge_organizations(master, org)
+        self._conn.execute(
+            "UPDATE masters SET payload = ?, queries = ?, updated_at = ? WHERE master_id = ?",
+            (self._dump(merged), json.dumps(queries, ensure_ascii=False), now, master_id),
+        )
+
+    def masters(self) -> Iterator[tuple[str, Organization, list[str]]]:
+        # Курсор читается пачками: весь индекс в память не поднимается.
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT master_id, payload, queries FROM masters ORDER BY first_seen"
+            )
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(MASTERS_BATCH)
+                if not rows:
+                    return
+                for master_id, payload, queries in rows:
+                    yield master_id, organization_from_dict(json.loads(payload)), json.loads(queries)
+        finally:
+            cursor.close()
+
+    def export_master(self, writer, include_in_potential=None) -> int:
+        # include_in_potential(org) -> bool; writer — ExcelWriter или приёмник из app.sinks.
+        count = 0
+        for _master_id, org, _queries in self.masters():
+            include = bool(include_in_potential(org)) if include_in_potential else False
+            writer.append(org, include_in_potential=include)
+            count += 1
+        return count
+
+    def summary(self) -> str:
+        return (
+            f"новых={self.added}, объединено дублей={self.merged}, "
+            f"пропущено известных={self.skipped}"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                LOGGER.debug("Failed to close dedup index", exc_info=True)
+
+    @staticmethod
+    def _dump(org: Organization) -> str:
+        return json.dumps(organization_to_dict(org), ensure_ascii=False)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+
+from openpyxl import Workbook
+
+from app.organization import Organization, organization_columns
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Листы называются по аргументу append(): все строки и прошедшие include_in_potential.
+ALL_SHEET_TITLE = "all"
+POTENTIAL_SHEET_TITLE = "potential"
+
+
+class StreamingExcelWriter:
+    # Книга в режиме write_only: строки уходят во временные XML-файлы openpyxl
+    # и не держатся в памяти, а файл .xlsx собирается один раз в close().
+    # Промежуточных сохранений нет: после сбоя книгу пересобирает --resume
+    # из журнала запуска (app.checkpoint).
+    def __init__(self, output_path: Path) -> None:
+        self.output_path = Path(output_path)
+        self.columns = organization_columns()
+        self.rows = 0
+        self.potential_rows = 0
+        self._closed = False
+        self._workbook = Workbook(write_only=True)
+        self._all_sheet = self._create_sheet(ALL_SHEET_TITLE)
+        self._potential_sheet = self._create_sheet(POTENTIAL_SHEET_TITLE)
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _create_sheet(self, title: str):
+        sheet = self._workbook.create_sheet(title)
+        sheet.freeze_panes = "A2"
+        sheet.append(self.columns)
+        return sheet
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        if self._closed:
+            raise RuntimeError("Writer is closed")
+        row = [getattr(org, column, "") for column in self.columns]
+        self._all_sheet.append(row)
+        self.rows += 1
+        if include_in_potential:
+            self._potential_sheet.append(row)
+            self.potential_rows += 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._workbook.save(self.output_path)
+        LOGGER.info("Сохранил файл: %s", self.output_path)
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+from urllib.parse import unquote
+
+
+SOCIAL_KINDS = ("vk", "telegram", "whatsapp", "viber", "ok", "youtube", "instagram")
+WEBSITE = "website"
+
+# Хост (или его родительский домен) → вид ссылки. Поиск идёт от полного хоста
+# к родителям: m.vk.com → vk.com, так что поддомены перечислять не нужно.
+HOST_KINDS = {
+    "vk.com": "vk",
+    "vk.ru": "vk",
+    "vkontakte.ru": "vk",
+    "t.me": "telegram",
+    "telegram.me": "telegram",
+    "telegram.dog": "telegram",
+    "wa.me": "whatsapp",
+    "whatsapp.com": "whatsapp",
+    "viber.com": "viber",
+    "vb.me": "viber",
+    "ok.ru": "ok",
+    "odnoklassniki.ru": "ok",
+    "youtube.com": "youtube",
+    "youtu.be": "youtube",
+    "instagram.com": "instagram",
+    "instagr.am": "instagram",
+    "yandex.ru": "yandex",
+    "yandex.com": "yandex",
+    "yandex.by": "yandex",
+    "yandex.kz": "yandex",
+    "yandex.net": "yandex",
+    "ya.ru": "yandex",
+}
+# Канонический хост для зеркал одной сети.
+CANONICAL_HOSTS = {
+    "vk": "vk.com",
+    "telegram": "t.me",
+    "ok": "ok.ru",
+    "instagram": "instagram.com",
+}
+APP_SCHEMES = {"tg": "telegram", "whatsapp": "whatsapp", "viber": "viber"}
+IGNORED_SCHEMES = frozenset({"tel", "mailto", "javascript", "data", "sms", "geo", "intent"})
+# Кнопки «поделиться» на карточке ведут в соцсети, но это не контакты организации.
+SHARE_PATHS = {
+    "vk": ("/share.php",),
+    "telegram": ("/share",),
+    "ok": ("/dk",),
+    "whatsapp": ("/send",),
+}
+# Параметры, в которых обёртки-редиректы прячут настоящий адрес.
+REDIRECT_PARAMS = ("url", "u", "to", "target")
+TRACKING_PARAMS = frozenset(
+    {"yclid", "ysclid", "gclid", "fbclid", "_openstat", "roistat", "igshid", "openstat"}
+)
+MAX_REDIRECT_DEPTH = 3
+
+# Разбор по RFC 3986 (приложение B) одним регулярным выражением: urlsplit
+# с последующим .hostname разбирает адрес дважды и занимает половину времени.
+# Хост выделяется тем же проходом, без userinfo, «www.» и порта.
+URL_RE = re.compile(
+    r"(?:([A-Za-z][A-Za-z0-9+.\-]*):)?"
+    r"(?://((?:[^@/?#]*@)?(?:[Ww][Ww][Ww]\.)?([^/?#:@]*)[^/?#]*))?"
+    r"([^?#]*)(?:\?([^#]*))?"
+)
+NON_DIGITS_RE = re.compile(r"\D+")
+# Схема — только в начале адреса: «site.ru/?r=http://x» — это адрес без схемы.
+SCHEME_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.\-]*://")
+
+
+def _param_re(*names: str) -> re.Pattern:
+    return re.compile(r"(?:^|&)(?:%s)=([^&]*)" % "|".join(names), re.IGNORECASE)
+
+
+REDIRECT_RE = _param_re(*REDIRECT_PARAMS)
+PHONE_RE = _param_re("phone")
+DOMAIN_RE = _param_re("domain")
+
+# (scheme, netloc, host, path, query) — обычный кортеж: NamedTuple на каждый адрес
+# стоит столько же, сколько сам разбор.
+UrlParts = tuple[str, str, str, str, str]
+
+
+@dataclass(slots=True)
+class CardLinks:
+    vk: str = ""
+    telegram: str = ""
+    whatsapp: str = ""
+    viber: str = ""
+    ok: str = ""
+    youtube: str = ""
+    instagram: str = ""
+    website: str = ""
+
+
+def host_kind(host: str) -> Optional[str]:
+    while host:
+        kind = HOST_KINDS.get(host)
+        if kind is not None:
+            return kind
+        dot = host.find(".")
+        if dot < 0:
+            return None
+        host = host[dot + 1:]
+    return None
+
+
+def strip_tracking(query: str) -> str:
+    # Без parse_qsl/urlencode: оставшиеся параметры сохраняют исходную кодировку.
+    if not query:
+        return ""
+    kept = []
+    for pair in query.split("&"):
+        key = pair.split("=", 1)[0].lower()
+        if not key or key.startswith("utm_") or key in TRACKING_PARAMS:
+            continue
+        kept.append(pair)
+    return "&".join(kept)
+
+
+def _query_value(pattern: re.Pattern, query: str) -> str:
+    match = pattern.search(query) if query else None
+    return unquote(match.group(1).replace("+", " ")) if match else ""
+
+
+def _phone_digits(query: str) -> str:
+    return NON_DIGITS_RE.sub("", _query_value(PHONE_RE, query))
+
+
+def _unwrap_redirect(parts: UrlParts) -> str:
+    # yandex.ru/redirect?url=…, vk.com/away.php?to=…, clck.yandex.ru/redir/…/*https://…
+    _scheme, _netloc, _host, path, query = parts
+    target = _query_value(REDIRECT_RE, query)
+    if not target:
+        star = path.find("*http")
+        if star >= 0:
+            target = unquote(path[star + 1:])
+    return target if "://" in target or target.startswith("//") else ""
+
+
+def split_url(href: str) -> UrlParts:
+    scheme, netloc, host, path, query = URL_RE.match(href).groups()
+    return scheme or "", netloc or "", (host or "").lower(), path, query or ""
+
+
+def _app_link(scheme: str, parts: UrlParts) -> tuple[str, str]:
+    kind = APP_SCHEMES[scheme]
+    _scheme, netloc, _host, path, query = parts
+    if kind == "telegram":
+        domain = _query_value(DOMAIN_RE, query)
+        return (kind, f"https://t.me/{domain}") if domain else ("", "")
+    if kind == "whatsapp":
+        phone = _phone_digits(query)
+        return (kind, f"https://wa.me/{phone}") if phone else ("", "")
+    # У Viber нет веб-адреса для чата, оставляем ссылку приложения без мусора.
+    query = strip_tracking(query)
+    return kind, f"viber://{netloc}{path}" + (f"?{query}" if query else "")
+
+
+def _social_link(kind: str, parts: UrlParts) -> str:
+    _scheme, _netloc, host, path, query = parts
+    path = path.rstrip("/")
+    if kind == "whatsapp":
+        phone = _phone_digits(query)
+        if phone:
+            return f"https://wa.me/{phone}"
+        if host.startswith("chat."):
+            return f"https://chat.whatsapp.com{path}" if path else ""
+    if kind == "viber":
+        query = strip_tracking(query)
+        return f"https://{host}{path}" + (f"?{query}" if query else "") if path or query else ""
+    if not path or path.lower().startswith(SHARE_PATHS.get(kind, ("\0",))):
+        return ""
+    if kind == "youtube":
+        query = strip_tracking(query)
+        host = "youtu.be" if host == "youtu.be" else "www.youtube.com"
+        return f"https://{host}{path}" + (f"?{query}" if query else "")
+    # Профили vk/t.me/ok/instagram однозначны по пути — параметры отбрасываем.
+    return f"https://{CANONICAL_HOSTS.get(kind, host)}{path}"
+
+
+def _website_link(parts: UrlParts) -> str:
+    scheme, netloc, _host, path, query = parts
+    scheme = scheme.lower()
+    if scheme not in {"http", "https"}:
+        scheme = "https"
+    query = strip_tracking(query)
+    # Корневой «/» убирается только без параметров: канонический вид — «site.ru/?id=5».
+    path = path if path != "/" or query else ""
+    return f"{scheme}://{netloc.lower()}{path}" + (f"?{query}" if query else "")
+
+
+@lru_cache(maxsize=65536)
+def classify_url(href: str) -> tuple[str, str]:
+    # (вид, канонический адрес); ("", "") — не контакт (внутренние ссылки, tel:, якоря).
+    return _classify(href.strip(), 0)
+
+
+def _split(href: str) -> Optional[UrlParts]:
+    if href.startswith("//"):
+        href = f"https:{href}"
+    elif not SCHEME_RE.match(href):
+        href = f"https://{href}"
+    parts = split_url(href)
+    host = parts[2]
+    if "." not in host or " " in host or host.startswith("["):
+        return None
+    return parts
+
+
+def _classify(href: str, depth: int) -> tuple[str, str]:
+    if not href or (href[0] in "/#?" and not href.startswith("//")):
+        return "", ""
+    colon = href.find(":")
+    scheme = href[:colon].lower() if 0 < colon < 12 else ""
+    if scheme in IGNORED_SCHEMES:
+        return "", ""
+    if scheme in APP_SCHEMES:
+        return _app_link(scheme, split_url(href))
+    parts = _split(href)
+    if parts is None:
+        return "", ""
+    kind = host_kind(parts[2])
+    if kind == "yandex" or (kind == "vk" and parts[3].startswith("/away")):
+        target = _unwrap_redirect(parts)
+        if target and depth < MAX_REDIRECT_DEPTH:
+            return _classify(target, depth + 1)
+        return "", ""
+    if kind is None:
+        return WEBSITE, _website_link(parts)
+    canonical = _social_link(kind, parts)
+    return (kind, canonical) if canonical else ("", "")
+
+
+def classify_links(hrefs: Iterable[str], website: str = "") -> CardLinks:
+    # Все ссылки карточки приходят одним списком из evaluate; по каждой сети берём первую.
+    links = CardLinks(website=canonical_website(website))
+    missing = set(SOCIAL_KINDS)
+    for href in hrefs:
+        if not href:
+            continue
+        kind, canonical = classify_url(href)
+        if kind in missing:
+            setattr(links, kind, canonical)
+            missing.discard(kind)
+            if not missing:
+                break
+    return links
+
+
+def classify_many(batches: Iterable[Iterable[str]]) -> list[CardLinks]:
+    return [classify_links(hrefs) for hrefs in batches]
+
+
+def website_domain(url: str) -> str:
+    # Хост сайта без «www.», порта и регистра — тот же разбор, что у classify_url.
+    if not url:
+        return ""
+    parts = _split(url.strip())
+    return parts[2] if parts is not None else ""
+
+
+def canonical_website(raw_url: str) -> str:
+    # Сайт из карточки: может оказаться и соцсетью — тогда отдаём её канонический адрес.
+    if not raw_url:
+        return ""
+    kind, canonical = classify_url(raw_url)
+    if kind:
+        return canonical
+    # Страница на хосте Яндекса, указанная как сайт, — тоже сайт, если это не редирект.
+    parts = _split(raw_url.strip())
+    if parts is None or parts[0].lower() not in {"http", "https"} or host_kind(parts[2]) != "yandex":
+        return ""
+    return _website_link(parts)
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from app.timing import STAGES, StageTimer
+
+try:
+    import psutil
+except ImportError:  # необязательная зависимость: без неё RSS читается из /proc (Linux)
+    psutil = None
+
+
+LOGGER = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "serm"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(value) if isinstance(value, int) else f"{value:.6g}"
+
+
+def _process_group(name: str) -> str:
+    # Потомки скрапера: драйвер Playwright (node) и процессы Chrome.
+    name = name.lower()
+    if name.startswith("node") or "playwright" in name:
+        return "playwright"
+    if "chrom" in name:
+        return "browser"
+    return "other"
+
+
+def _proc_tree_rss() -> dict[str, int]:
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    parents: dict[int, int] = {}
+    names: dict[int, str] = {}
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", encoding="utf-8", errors="replace") as handle:
+                stat = handle.read()
+        except OSError:
+            continue
+        # Имя процесса в скобках может содержать пробелы — поля считаем после последней «)».
+        name = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2:].split()
+        pid = int(entry.name)
+        parents[pid] = int(fields[1])
+        names[pid] = name
+    own = os.getpid()
+    children: dict[int, list[int]] = {}
+    for pid, parent in parents.items():
+        children.setdefault(parent, []).append(pid)
+    totals: dict[str, int] = {}
+    stack = [own]
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, ()))
+        try:
+            with open(f"/proc/{pid}/statm", encoding="ascii") as handle:
+                rss = int(handle.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+        group = "python" if pid == own else _process_group(names.get(pid, ""))
+        totals[group] = totals.get(group, 0) + rss
+    return totals
+
+
+def process_tree_rss() -> dict[str, int]:
+    # RSS по группам: python (сам скрапер), playwright (драйвер), browser (Chrome).
+    if psutil is not None:
+        totals: dict[str, int] = {}
+        own = psutil.Process()
+        processes = [own]
+        try:
+            processes += own.children(recursive=True)
+        except psutil.Error:
+            pass
+        for process in processes:
+            try:
+                group = "python" if process.pid == own.pid else _process_group(process.name())
+                totals[group] = totals.get(group, 0) + process.memory_info().rss
+            except psutil.Error:
+                continue
+        return totals
+    if os.path.isdir("/proc"):
+        try:
+            return _proc_tree_rss()
+        except OSError:
+            LOGGER.debug("Failed to read process tree RSS", exc_info=True)
+    return {}
+
+
+class _Totals:
+    __slots__ = ("cards", "captchas", "captcha_wait", "stage_seconds", "stage_counts", "queries")
+
+    def __init__(self) -> None:
+        self.cards = 0
+        self.captchas = 0
+        self.captcha_wait = 0.0
+        self.stage_seconds: dict[str, float] = {}
+        self.stage_counts: dict[str, int] = {}
+        self.queries = 0
+
+    def add(self, timer: StageTimer) -> None:
+        self.cards += timer.cards
+        for stage, histogram in list(timer.histograms.items()):
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + histogram.total
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + histogram.count
+        captcha = timer.histograms.get("captcha_wait")
+        if captcha is not None:
+            self.captchas += captcha.count
+            self.captcha_wait += captcha.total
+        self.queries += 1
+
+    def add_snapshot(self, snapshot: dict) -> None:
+        self.cards += snapshot["cards"]
+        for stage, seconds in snapshot["stage_seconds"].items():
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        for stage, count in snapshot["stage_counts"].items():
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + count
+        self.captchas += snapshot["captchas"]
+        self.captcha_wait += snapshot["captcha_wait"]
+        self.queries += 1
+
+    def copy(self) -> "_Totals":
+        totals = _Totals()
+        totals.cards = self.cards
+        totals.captchas = self.captchas
+        totals.captcha_wait = self.captcha_wait
+        totals.stage_seconds = dict(self.stage_seconds)
+        totals.stage_counts = dict(self.stage_counts)
+        totals.queries = self.queries
+        return totals
+
+
+def timer_snapshot(timer: StageTimer, query: str = "", active: bool = True) -> dict:
+    # Снимок таймера для передачи между процессами (--processes): только простые типы.
+    totals = _Totals()
+    totals.add(timer)
+    return {
+        "query": query,
+        "active": active,
+        "cards": totals.cards,
+        "captchas": totals.captchas,
+        "captcha_wait": totals.captcha_wait,
+        "stage_seconds": totals.stage_seconds,
+        "stage_counts": totals.stage_counts,
+        "ids_total": timer.ids_total,
+        "ids_parsed": timer.ids_parsed,
+        "cards_per_minute": timer.cards_per_minute(),
+        "current_stage": timer.current_stage,
+        "idle_seconds": time.monotonic() - timer.last_progress_at,
+    }
+
+
+# Метрики одного процесса скрапера в текстовом формате Prometheus. Таймер текущего
+# запроса подменяется через attach(); завершённые таймеры складываются в итоги,
+# поэтому счётчики (*_total) не сбрасываются между запросами пакета. В режиме
+# --processes таймеры живут в воркерах: их снимки приходят через update_remote().
+class MetricsServer:
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.started_at = time.monotonic()
+        self.timer: Optional[StageTimer] = None
+        self.query = ""
+        # Регулятор темпа (app.captcha_governor), если включён --captcha-budget.
+        self.governor = None
+        self._done = _Totals()
+        self._remote: dict[object, dict] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._unix_path: Optional[Path] = None
+
+    def attach(self, timer: StageTimer, query: str = "") -> None:
+        with self._lock:
+            if self.timer is not None and self.timer is not timer:
+                self._done.add(self.timer)
+            self.timer = timer
+            self.query = query
+
+    def update_remote(self, key: object, snapshot: dict) -> None:
+        # key — (воркер, запрос, шард); последний снимок заменяет предыдущий.
+        snapshot = dict(snapshot, received_at=time.monotonic())
+        with self._lock:
+            self._remote[key] = snapshot
+
+    def start(self) -> "MetricsServer":
+        handler = _make_handler(self)
+        if self.address.startswith("unix:"):
+            if not hasattr(socket, "AF_UNIX"):
+                raise ValueError("Unix sockets are not supported on this platform")
+            path = Path(self.address[len("unix:"):])
+            if path.exists():
+                path.unlink()
+            self._server = _UnixHTTPServer(str(path), handler)
+            self._unix_path = path
+        else:
+            host, _, port = self.address.rpartition(":")
+            self._server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+        LOGGER.info("Метрики: %s", self.url)
+        return self
+
+    @property
+    def url(self) -> str:
+        if self._unix_path is not None:
+            return f"unix:{self._unix_path} (GET /metrics)"
+        host, port = self._server.server_address[:2] if self._server else ("", 0)
+        return f"http://{host}:{port}/metrics"
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._unix_path is not None:
+            try:
+                self._unix_path.unlink()
+            except OSError:
+                LOGGER.debug("Failed to remove %s", self._unix_path, exc_info=True)
+            self._unix_path = None
+
+    def __enter__(self) -> "MetricsServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def render(self) -> str:
+        with self._lock:
+            timer, query = self.timer, self.query
+            totals = self._done.copy()
+            remote = list(self._remote.values())
+        now = time.monotonic()
+        current = _Totals()
+        # Идущие запросы: (запрос, найдено id, разобрано, карточек/мин, секунд без прогресса, этап).
+        live: list[tuple[str, int, int, float, float, str]] = []
+        if timer is not None:
+            current.add(timer)
+            live.append((query, timer.ids_total, timer.ids_parsed, timer.cards_per_minute(),
+                         now - timer.last_progress_at, timer.current_stage))
+        for snapshot in remote:
+            current.add_snapshot(snapshot)
+            if snapshot["active"]:
+                live.append((snapshot["query"], snapshot["ids_total"], snapshot["ids_parsed"],
+                             snapshot["cards_per_minute"], snapshot["idle_seconds"] + now - snapshot["received_at"],
+                             snapshot["current_stage"]))
+        by_query: dict[str, list[float]] = {}
+        for name, ids_total, ids_parsed, per_minute, idle, _stage in live:
+            values = by_query.setdefault(name, [0, 0, 0.0, idle])
+            values[0] += ids_total
+            values[1] += ids_parsed
+            values[2] += per_minute
+            values[3] = min(values[3], idle)
+        if not by_query:
+            by_query[query] = [0, 0, 0.0, 0.0]
+        stage_workers = Counter(stage for *_rest, stage in live)
+        lines: list[str] = []
+
+        def per_query(position: int) -> list[tuple[str, float]]:
+            return [(f'{{query="{_escape(name)}"}}', values[position]) for name, values in by_query.items()]
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(f"{PREFIX}_{name}{labels} {_number(value)}" for labels, value in samples)
+
+        metric("up", "gauge", "Scraper process is alive.", [("", 1)])
+        metric("uptime_seconds", "gauge", "Seconds since the metrics endpoint started.",
+               [("", now - self.started_at)])
+        metric("queries_started_total", "counter", "Queries started in this process.",
+               [("", totals.queries + current.queries)])
+        metric("ids_discovered", "gauge", "Organization ids found in the current result list.", per_query(0))
+        metric("ids_parsed", "gauge", "Organization ids parsed or skipped in the current query.", per_query(1))
+        metric("cards_total", "counter", "Cards parsed by this process.", [("", totals.cards + current.cards)])
+        metric("cards_per_minute", "gauge", "Cards per minute in the current query.", per_query(2))
+        metric("seconds_since_progress", "gauge", "Seconds since the last parsed card or id (stall alert).",
+               per_query(3))
+        metric("captcha_total", "counter", "Captchas met by this process.",
+               [("", totals.captchas + current.captchas)])
+        metric("captcha_wait_seconds_total", "counter", "Seconds spent waiting for captcha resolution.",
+               [("", totals.captcha_wait + current.captcha_wait)])
+        metric("current_stage", "gauge", "Stage the scraper is in right now (workers in it with --processes).",
+               [(f'{{stage="{name}"}}', stage_workers.get(name, 0)) for name in STAGES])
+        stages = sorted(set(totals.stage_seconds) | set(current.stage_seconds),
+                        key=lambda name: (STAGES.index(name) if name in STAGES else len(STAGES), name))
+        metric("stage_seconds_total", "counter", "Time spent per stage.",
+               [(f'{{stage="{_escape(name)}"}}',
+                 totals.stage_seconds.get(name, 0.0) + current.stage_seconds.get(name, 0.0)) for name in stages])
+        metric("stage_count_total", "counter", "Completed spans per stage.",
+               [(f'{{stage="{_escape(name)}"}}',
+                 totals.stage_counts.get(name, 0) + current.stage_counts.get(name, 0)) for name in stages])
+        governor = self.governor
+        if governor is not None:
+            metric("pace_scale", "gauge", "Delay multiplier chosen by the captcha governor.", [("", governor.scale)])
+            metric("captcha_window", "gauge", "Captchas within the governor window (compare with the budget).",
+                   [("", governor.captchas_in_window())])
+            metric("captcha_budget", "gauge", "Captchas allowed within the governor window.", [("", governor.budget)])
+            metric("session_rotations_total", "counter", "Sessions rotated ahead of an expected captcha.",
+                   [("", governor.rotations)])
+        rss = process_tree_rss()
+        if rss:
+            metric("process_rss_bytes", "gauge", "Resident memory of the scraper and its child processes.",
+                   [(f'{{process="{group}"}}', value) for group, value in sorted(rss.items())])
+        return "\n".join(lines) + "\n"
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _make_handler(server: MetricsServer):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in {"/metrics", "/"}:
+                self.send_error(404)
+                return
+            try:
+                body = server.render().encode("utf-8")
+            except Exception:
+                LOGGER.debug("Failed to render metrics", exc_info=True)
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self) -> str:
+            # У Unix-сокета client_address — пустая строка.
+            return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+        def log_message(self, format: str, *args) -> None:
+            LOGGER.debug("metrics %s - %s", self.address_string(), format % args)
+
+    return Handler
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields, replace
+
+
+# Модель без зависимостей от Playwright: её берут кэш, журнал, индекс дублей и выгрузки.
+@dataclass(slots=True)
+class Organization:
+    name: str = ""
+    phone: str = ""
+    verified: str = ""
+    award: str = ""
+    vk: str = ""
+    telegram: str = ""
+    whatsapp: str = ""
+    website: str = ""
+    card_url: str = ""
+    rating: str = ""
+    rating_count: str = ""
+    # Новые сети — в конце, после прежних колонок выгрузки.
+    viber: str = ""
+    ok: str = ""
+    youtube: str = ""
+    instagram: str = ""
+    # phone — первый номер карточки (E.164 без добавочного), phones — все номера через
+    # запятую: E.164 с «;ext=», короткие без известного кода города — как в карточке.
+    phones: str = ""
+    mobile_phone: str = ""
+
+
+def merge_organizations(primary: Organization, fallback: Organization) -> Organization:
+    # Значения primary приоритетны, fallback заполняет только пустые поля.
+    updates = {
+        field.name: getattr(fallback, field.name)
+        for field in fields(Organization)
+        if not getattr(primary, field.name) and getattr(fallback, field.name)
+    }
+    return replace(primary, **updates) if updates else primary
+
+
+def organization_columns() -> list[str]:
+    # Порядок колонок всех выгрузок — порядок полей модели.
+    return [field.name for field in fields(Organization)]
+
+
+def organization_to_dict(org: Organization) -> dict:
+    return asdict(org)
+
+
+def organization_from_dict(data: dict) -> Organization:
+    # Старые записи (кэш, журнал) могут не знать о новых полях — берём известные.
+    names = {field.name for field in fields(Organization)}
+    return Organization(**{key: str(value) for key, value in data.items() if key in names})
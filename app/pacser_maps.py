@@ -5,39 +5,178 @@ import re
 import random
 import threading
 import time
-from dataclasses import dataclass
-from typing import Callable, Generator, Optional
-from urllib.parse import quote
+from pathlib import Path
+from typing import Callable, Container, Generator, Iterable, Optional
+from urllib.parse import quote, urlsplit
 
 from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+from app.captcha_governor import CaptchaGovernor, CaptchaProbe
+from app.card_pool import CardFetchPool
 from app.captcha_utils import CaptchaFlowHelper, is_captcha, wait_captcha_resolved, CaptchaHook
+from app.links import canonical_website, classify_links
+# Модель переехала в app.organization; прежний адрес импорта сохранён.
+from app.organization import (  # noqa: F401
+    Organization,
+    merge_organizations,
+    organization_from_dict,
+    organization_to_dict,
+)
+from app.phones import card_phones, normalize_phone
 from app.playwright_utils import (
     PLAYWRIGHT_LAUNCH_ARGS,
     PLAYWRIGHT_USER_AGENT,
     PLAYWRIGHT_VIEWPORT,
     launch_chrome,
 )
+from app.request_blocking import RequestBlocker, get_preset
+from app.timing import StageTimer
 from app.utils import extract_count, human_delay, normalize_rating, sanitize_text
+from app.waits import AdaptiveWaiter
 
 
 LOGGER = logging.getLogger(__name__)
 
-
-@dataclass
-class Organization:
-    name: str = ""
-    phone: str = ""
-    verified: str = ""
-    award: str = ""
-    vk: str = ""
-    telegram: str = ""
-    whatsapp: str = ""
-    website: str = ""
-    card_url: str = ""
-    rating: str = ""
-    rating_count: str = ""
+CARD_EXTRACTION_MODES = ("evaluate", "locators")
+COLLECT_STRATEGIES = ("dom", "network")
+
+VISIBLE_IDS_SCRIPT = """
+(selector) => {
+  return Array.from(document.querySelectorAll(selector))
+    .map(node => node.dataset.id)
+    .filter(Boolean);
+}
+"""
+
+SCROLL_LIST_SCRIPT = """
+({selector, scrollStep}) => {
+  const container = document.querySelector(selector);
+  if (!container) {
+    return { moved: false, scrollTop: 0 };
+  }
+  const prevTop = container.scrollTop;
+  const maxTop = container.scrollHeight - container.clientHeight;
+  const nextTop = Math.min(prevTop + scrollStep, maxTop);
+  container.scrollTop = nextTop;
+  container.dispatchEvent(new Event("scroll", { bubbles: true }));
+  return { moved: nextTop > prevTop, scrollTop: nextTop, maxTop };
+}
+"""
+
+RESET_SCROLL_SCRIPT = """
+(selector) => {
+  const container = document.querySelector(selector);
+  if (!container) {
+    return false;
+  }
+  container.scrollTop = 0;
+  container.dispatchEvent(new Event("scroll", { bubbles: true }));
+  return true;
+}
+"""
+
+# Новая сессия без следов прошлых: хранилища чистятся до скриптов страницы.
+RESET_STORAGE_SCRIPT = """
+(() => {
+  try { localStorage.clear(); } catch (e) {}
+  try { sessionStorage.clear(); } catch (e) {}
+  try {
+    if (window.caches && caches.keys) {
+      caches.keys().then(keys => keys.forEach(key => caches.delete(key)));
+    }
+  } catch (e) {}
+  try {
+    if (window.indexedDB && indexedDB.databases) {
+      indexedDB.databases().then(dbs => {
+        dbs.forEach(db => {
+          if (db && db.name) {
+            indexedDB.deleteDatabase(db.name);
+          }
+        });
+      });
+    }
+  } catch (e) {}
+})();
+"""
+
+# Все поля карточки за один вызов evaluate: сырые строки, нормализация — в Python.
+CARD_PAYLOAD_SCRIPT = """
+(root) => {
+  const first = (selector) => root.querySelector(selector);
+  const text = (selector) => {
+    const node = first(selector);
+    return node ? node.textContent || "" : "";
+  };
+  const attr = (selector, name) => {
+    const node = first(selector);
+    return node ? node.getAttribute(name) || "" : "";
+  };
+  const titleSelector = "h1.card-title-view__title a.card-title-view__title-link";
+  const badge = first("h1.card-title-view__title span.business-verified-badge");
+  return {
+    title: text(titleSelector),
+    title_href: attr(titleSelector, "href"),
+    rating_text: text(".business-rating-badge-view__rating-text"),
+    count_text: text(".business-header-rating-view__text"),
+    phone_texts: Array.from(root.querySelectorAll("span[itemprop='telephone']"))
+      .map((node) => node.textContent || ""),
+    award: text(".business-header-awards-view__award-text"),
+    website_href: attr("a.business-urls-view__link[href]", "href"),
+    website_text: text(".business-urls-view__text"),
+    hrefs: Array.from(root.querySelectorAll("a[href]"))
+      .map((node) => node.getAttribute("href") || ""),
+    badge_prioritized: Boolean(
+      first("h1.card-title-view__title span.business-verified-badge._prioritized")
+    ),
+    badge_fills: badge
+      ? Array.from(badge.querySelectorAll("svg path[fill]"))
+          .map((path) => (path.getAttribute("fill") || "").trim().toLowerCase())
+      : null,
+  };
+}
+"""
+
+
+def context_options() -> dict:
+    return {
+        "user_agent": PLAYWRIGHT_USER_AGENT,
+        "viewport": PLAYWRIGHT_VIEWPORT,
+        "is_mobile": False,
+        "has_touch": False,
+        "device_scale_factor": 1,
+    }
+
+
+def reset_browser_data(context) -> None:
+    LOGGER.info("Очищаю cookies, разрешения и хранилище для новой сессии")
+    try:
+        context.clear_cookies()
+    except Exception:
+        LOGGER.warning("Failed to clear cookies")
+    try:
+        context.clear_permissions()
+    except Exception:
+        LOGGER.warning("Failed to clear permissions")
+    context.add_init_script(RESET_STORAGE_SCRIPT)
+
+
+# Фабрика контекстов для одиночного запуска и пулов браузера (пакет, процессы, бенчмарки).
+def new_browser_context(browser, request_blocker: Optional[RequestBlocker] = None):
+    LOGGER.info("Создаю контекст браузера")
+    context = browser.new_context(**context_options())
+    reset_browser_data(context)
+    if request_blocker is not None:
+        request_blocker.install(context)
+    return context
+
+
+def card_page_url(base_url: str, org_id: str) -> str:
+    # Адрес отдельной страницы карточки; для локального стенда — на его же хосте.
+    if base_url == YandexMapsScraper.base_url:
+        return YandexMapsScraper._normalize_card_url("", org_id)
+    parts = urlsplit(base_url)
+    return f"{parts.scheme}://{parts.netloc}/maps/org/{org_id}/"
 
 
 class YandexMapsScraper:
@@ -61,18 +200,100 @@ class YandexMapsScraper:
         captcha_whitelist_event=None,
         captcha_hook: Optional[CaptchaHook] = None,
         log: Optional[Callable[[str], None]] = None,
+        card_extraction: str = "evaluate",
+        collect_strategy: str = "dom",
+        network_required_fields: Optional[Iterable[str]] = None,
+        record_search_dir: Optional[Path] = None,
+        card_workers: int = 0,
+        card_cache=None,
+        block_preset: str = "off",
+        request_blocker: Optional[RequestBlocker] = None,
+        adaptive_waits: bool = True,
+        stream_ids: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        politeness: tuple[float, float] = (0.2, 0.4),
+        captcha_governor: Optional[CaptchaGovernor] = None,
+        captcha_recheck_every: int = 0,
+        journal=None,
+        known_ids: Optional[Iterable[str]] = None,
+        skip_ids: Optional[Container[str]] = None,
+        seen_ids: Optional[Container[str]] = None,
+        stage_timer: Optional[StageTimer] = None,
+        profile_path: Optional[Path] = None,
+        base_url: Optional[str] = None,
+        metrics=None,
+        browser_pool=None,
+        playwright=None,
+        browser=None,
+        context=None,
         **ignored_kwargs,
     ) -> None:
         if ignored_kwargs:
             LOGGER.debug("Игнорирую неподдерживаемые параметры: %s", ignored_kwargs)
+        if card_extraction not in CARD_EXTRACTION_MODES:
+            raise ValueError(f"Неизвестный режим разбора карточки: {card_extraction}")
+        if collect_strategy not in COLLECT_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия сбора: {collect_strategy}")
         self.query = query
         self.limit = limit
+        if base_url:
+            # Локальный стенд для бенчмарков вместо yandex.ru.
+            self.base_url = base_url
         self.stop_event = stop_event or threading.Event()
         self.pause_event = pause_event or threading.Event()
         self.captcha_resume_event = captcha_resume_event or threading.Event()
         self.captcha_whitelist_event = captcha_whitelist_event
         self.captcha_hook = captcha_hook
         self._log_cb = log
+        self.card_extraction = card_extraction
+        self.network_collector = None
+        if collect_strategy == "network":
+            from app.search_api import DEFAULT_REQUIRED_FIELDS, SearchResponseCollector
+
+            self.network_collector = SearchResponseCollector(
+                required_fields=network_required_fields or DEFAULT_REQUIRED_FIELDS,
+                record_dir=record_search_dir,
+            )
+        self.card_workers = max(0, int(card_workers or 0))
+        self.pool_stats = None
+        self.card_cache = card_cache
+        self.block_preset = get_preset(block_preset).name
+        # С пулом обработчик маршрутов ставит фабрика контекстов: она и арендующий
+        # скрапер передают один блокировщик, иначе счётчики остаются нулевыми.
+        self.request_blocker = request_blocker or RequestBlocker(self.block_preset)
+        self.stream_ids = stream_ids
+        self.progress = progress
+        # None — прежние фиксированные паузы.
+        self.waiter = AdaptiveWaiter(politeness=politeness) if adaptive_waits else None
+        # Регулятор темпа по частоте капч (общий на пакет) и проверка капчи по событиям
+        # главной вкладки; captcha_recheck_every=0 — is_captcha() перед каждой карточкой.
+        self.governor = captcha_governor
+        self.captcha_recheck_every = max(0, int(captcha_recheck_every or 0))
+        self.captcha_probe: Optional[CaptchaProbe] = None
+        self.card_page_blocker = RequestBlocker("card-only" if self.block_preset != "off" else "off")
+        # Продолжение прерванного запуска: id уже собраны, часть карточек уже записана.
+        self.journal = journal
+        self.known_ids = list(known_ids) if known_ids else None
+        self.skip_ids = skip_ids
+        # Организации, уже собранные другими запросами (индекс дублей): пропускаются
+        # и, в отличие от skip_ids, не считаются в limit.
+        self.seen_ids = seen_ids
+        # Замеры этапов всегда включены; profile_path — куда сохранить profile.json.
+        self.stage_timer = stage_timer or StageTimer()
+        self.profile_path = profile_path
+        # Эндпоинт метрик (app.metrics.MetricsServer) переключается на таймер этого запроса.
+        if metrics is not None:
+            metrics.attach(self.stage_timer, query)
+        # Пул браузера (пакетный режим): контекст берётся в аренду и возвращается после запроса.
+        self.browser_pool = browser_pool
+        self.captcha_seen = False
+        # collect_ids(): только собрать id выдачи, без разбора карточек (для шардирования).
+        self.collected_ids: list[str] = []
+        self._ids_only = False
+        # Внешние браузер и контекст (пакетный режим) не закрываются в run().
+        self._playwright = playwright
+        self._browser = browser
+        self._context = context
 
     def run(self) -> Generator[Organization, None, None]:
         self._log(
@@ -80,71 +301,161 @@ class YandexMapsScraper:
             self.query,
             self.limit,
         )
+        if self.browser_pool is not None:
+            yield from self._run_pooled()
+            return
+        if self._playwright is not None and self._browser is not None:
+            yield from self._run_in_browser(self._playwright, self._browser)
+            return
         with sync_playwright() as p:
             LOGGER.info("Запускаю браузер")
-            launch_args = [*PLAYWRIGHT_LAUNCH_ARGS, "--start-minimized"]
             browser = launch_chrome(
                 p,
-                args=launch_args,
-            )
-            LOGGER.info("Создаю контекст браузера")
-            context = browser.new_context(
-                user_agent=PLAYWRIGHT_USER_AGENT,
-                viewport=PLAYWRIGHT_VIEWPORT,
-                is_mobile=False,
-                has_touch=False,
-                device_scale_factor=1,
-            )
-            self._reset_browser_data(context)
-            page = context.new_page()
-            page.set_default_timeout(20000)
-
-            url = f"{self.base_url}?text={quote(self.query)}"
-            LOGGER.info("Открываю страницу: %s", url)
-            nav_start = time.monotonic()
-            page.goto(url, wait_until="domcontentloaded")
-            captcha_helper = CaptchaFlowHelper(
-                playwright=p,
-                base_context=context,
-                base_page=page,
-                log=self._log,
-                hook=self.captcha_hook,
-                user_agent=PLAYWRIGHT_USER_AGENT,
-                viewport=PLAYWRIGHT_VIEWPORT,
-                target_url=url,
-                whitelist_event=self.captcha_whitelist_event,
+                args=self.launch_args(self.block_preset),
             )
-            self._captcha_action_poll = captcha_helper.poll
             try:
-                page = self._ensure_no_captcha(page)
-                if page is None:
-                    return
+                yield from self._run_in_browser(p, browser)
+            finally:
+                try:
+                    browser.close()
+                except Exception:
+                    LOGGER.debug("Failed to close browser", exc_info=True)
+                LOGGER.info("Браузер закрыт")
+
+    def collect_ids(self) -> list[str]:
+        self._ids_only = True
+        try:
+            for _ in self.run():
+                pass
+        finally:
+            self._ids_only = False
+        return self.collected_ids
+
+    def _run_pooled(self) -> Generator[Organization, None, None]:
+        pool = self.browser_pool
+        lease = pool.acquire()
+        failed = False
+        self._context = lease.context
+        if self.governor is not None and lease.leases == 1:
+            self.governor.start_session()
+        try:
+            yield from self._run_in_browser(pool.playwright, pool.browser)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._context = None
+            # Контекст, на котором была капча, в пул не возвращается.
+            lease.captcha_hit = lease.captcha_hit or self.captcha_seen
+            rotate = (
+                not failed
+                and not lease.captcha_hit
+                and self.governor is not None
+                and self.governor.should_rotate()
+            )
+            if rotate:
+                self.governor.rotated()
+            pool.release(lease, evict=failed or rotate, reason="ротация сессии" if rotate else "ошибка запроса")
+
+    @staticmethod
+    def launch_args(block_preset: str = "off") -> list[str]:
+        return [*PLAYWRIGHT_LAUNCH_ARGS, "--start-minimized", *get_preset(block_preset).launch_args]
+
+    def new_context(self, browser):
+        return new_browser_context(browser, self.request_blocker)
+
+    def _run_in_browser(self, p, browser) -> Generator[Organization, None, None]:
+        owns_context = self._context is None
+        context = self.new_context(browser) if owns_context else self._context
+        if owns_context and self.governor is not None:
+            self.governor.start_session()
+        page = context.new_page()
+        page.set_default_timeout(20000)
+        first_page = page
+        if self.network_collector is not None:
+            # Подписываемся до навигации, чтобы не пропустить первую выдачу.
+            self.network_collector.attach(page)
+        if self.captcha_recheck_every:
+            self.captcha_probe = CaptchaProbe(self.captcha_recheck_every)
+            self.captcha_probe.install(page)
+
+        url = f"{self.base_url}?text={quote(self.query)}"
+        LOGGER.info("Открываю страницу: %s", url)
+        with self.stage_timer.span("navigate"):
+            page.goto(url, wait_until="domcontentloaded")
+        captcha_helper = CaptchaFlowHelper(
+            playwright=p,
+            base_context=context,
+            base_page=page,
+            log=self._log,
+            hook=self.captcha_hook,
+            user_agent=PLAYWRIGHT_USER_AGENT,
+            viewport=PLAYWRIGHT_VIEWPORT,
+            target_url=url,
+            whitelist_event=self.captcha_whitelist_event,
+        )
+        self._captcha_action_poll = captcha_helper.poll
+        try:
+            page = self._ensure_no_captcha(page)
+            if page is None:
+                return
 
+            with self.stage_timer.span("popup_close"):
                 self._close_popups(page)
-                page = self._ensure_no_captcha(page)
-                if page is None:
-                    return
+            page = self._ensure_no_captcha(page)
+            if page is None:
+                return
 
-                self._wait_for_results(page)
-                page = self._ensure_no_captcha(page)
-                if page is None:
-                    return
+            self._wait_for_results(page)
+            page = self._ensure_no_captcha(page)
+            if page is None:
+                return
 
-                yield from self._collect_organizations(page)
-            finally:
-                try:
-                    captcha_helper.close()
-                except Exception:
-                    LOGGER.debug("Failed to close captcha helper", exc_info=True)
+            for org in self._collect_organizations(page):
+                self.stage_timer.count_card()
+                yield org
+        finally:
+            self._emit_profile()
+            if self.card_cache is not None:
+                LOGGER.info("Кэш карточек: %s", self.card_cache.summary())
+            if self.network_collector is not None:
+                LOGGER.info("Ответы поиска: %s", self.network_collector.summary())
+            if self.request_blocker.enabled:
+                LOGGER.info("Блокировка запросов: %s", self.request_blocker.summary())
+            if self.waiter is not None:
+                LOGGER.info("Ожидания: %s", self.waiter.summary())
+            if self.captcha_probe is not None:
+                LOGGER.info("Проверки капчи: %s", self.captcha_probe.summary())
+            if self.governor is not None:
+                LOGGER.info("Темп: %s", self.governor.summary())
+            if self.pool_stats is not None and self.card_page_blocker.enabled:
+                LOGGER.info("Блокировка запросов во вкладках пула: %s", self.card_page_blocker.summary())
+            try:
+                captcha_helper.close()
+            except Exception:
+                LOGGER.debug("Failed to close captcha helper", exc_info=True)
+            if owns_context:
                 try:
                     context.close()
                 except Exception:
                     LOGGER.debug("Failed to close browser context", exc_info=True)
+            else:
+                # Общий контекст живёт дольше запроса — закрываем только свою вкладку.
                 try:
-                    browser.close()
+                    first_page.close()
                 except Exception:
-                    LOGGER.debug("Failed to close browser", exc_info=True)
-                LOGGER.info("Браузер закрыт")
+                    LOGGER.debug("Failed to close page", exc_info=True)
+
+    def _emit_profile(self) -> None:
+        self.stage_timer.finish()
+        LOGGER.info("Профиль этапов: %s", self.stage_timer.summary())
+        if self.profile_path is None:
+            return
+        try:
+            path = self.stage_timer.write_profile(self.profile_path, query=self.query)
+            LOGGER.info("Профиль запуска сохранён: %s", path)
+        except Exception:
+            LOGGER.warning("Не удалось сохранить профиль запуска", exc_info=True)
 
     def _log(self, message: str, *args) -> None:
         if self._log_cb:
@@ -158,52 +469,28 @@ class YandexMapsScraper:
     def _ensure_no_captcha(self, page: Page) -> Optional[Page]:
         if self.stop_event.is_set():
             return None
+        probe = self.captcha_probe
+        if probe is not None and not probe.due(page):
+            return page
         if is_captcha(page):
-            return wait_captcha_resolved(
-                page,
-                self._log,
-                self.stop_event,
-                self.captcha_resume_event,
-                hook=self.captcha_hook,
-                action_poll=getattr(self, "_captcha_action_poll", None),
-            )
+            self.captcha_seen = True
+            with self.stage_timer.span("captcha_wait") as span:
+                resolved = wait_captcha_resolved(
+                    page,
+                    self._log,
+                    self.stop_event,
+                    self.captcha_resume_event,
+                    hook=self.captcha_hook,
+                    action_poll=getattr(self, "_captcha_action_poll", None),
+                )
+            if self.governor is not None:
+                self.governor.on_captcha(span.seconds)
+            if probe is not None and resolved is not None and page is probe.page and resolved is not page:
+                # Капчу решали в другой вкладке — следим уже за ней.
+                probe.install(resolved, current_document=True)
+            return resolved
         return page
 
-    def _reset_browser_data(self, context) -> None:
-        LOGGER.info("Очищаю cookies, разрешения и хранилище для новой сессии")
-        try:
-            context.clear_cookies()
-        except Exception:
-            LOGGER.warning("Failed to clear cookies")
-        try:
-            context.clear_permissions()
-        except Exception:
-            LOGGER.warning("Failed to clear permissions")
-        context.add_init_script(
-            """
-            (() => {
-              try { localStorage.clear(); } catch (e) {}
-              try { sessionStorage.clear(); } catch (e) {}
-              try {
-                if (window.caches && caches.keys) {
-                  caches.keys().then(keys => keys.forEach(key => caches.delete(key)));
-                }
-              } catch (e) {}
-              try {
-                if (window.indexedDB && indexedDB.databases) {
-                  indexedDB.databases().then(dbs => {
-                    dbs.forEach(db => {
-                      if (db && db.name) {
-                        indexedDB.deleteDatabase(db.name);
-                      }
-                    });
-                  });
-                }
-              } catch (e) {}
-            })();
-            """
-        )
-
     def _close_popups(self, page) -> None:
         selectors = [
             "button:has-text('Принять')",
@@ -214,12 +501,12 @@ class YandexMapsScraper:
         for selector in selectors:
             try:
                 LOGGER.info("Пробую закрыть всплывающее окно: %s", selector)
-                click_start = time.monotonic()
+                click_start = time.perf_counter()
                 page.locator(selector).first.click(timeout=2000)
                 LOGGER.info(
                     "Закрыл всплывающее окно: %s (%.2fs)",
                     selector,
-                    time.monotonic() - click_start,
+                    time.perf_counter() - click_start,
                 )
                 human_delay(0.2, 0.6)
             except PlaywrightTimeoutError:
@@ -229,23 +516,53 @@ class YandexMapsScraper:
 
     def _wait_for_results(self, page) -> None:
         LOGGER.info("Жду загрузку списка результатов")
-        wait_start = time.monotonic()
-        page.wait_for_selector(self.list_item_selector, timeout=30000)
-        LOGGER.info(
-            "Список результатов загружен за %.2fs",
-            time.monotonic() - wait_start,
-        )
+        with self.stage_timer.span("results_wait") as span:
+            page.wait_for_selector(self.list_item_selector, timeout=30000)
+        LOGGER.info("Список результатов загружен за %.2fs", span.seconds)
 
     def _collect_organizations(self, page) -> Generator[Organization, None, None]:
-        all_ids = self._collect_all_ids(page)
+        if self.stream_ids and self.known_ids is None and not self.card_workers and not self._ids_only:
+            yield from self._collect_streaming(page)
+            return
+        if self.known_ids is not None:
+            all_ids = set(self.known_ids)
+            LOGGER.info("Беру id карточек из журнала: %s", len(all_ids))
+        else:
+            with self.stage_timer.span("collect_ids"):
+                all_ids = self._collect_all_ids(page)
+            if self.journal is not None and all_ids:
+                self.journal.write_ids(all_ids)
+                self.journal.mark_ids_complete()
+        self.collected_ids = sorted(all_ids)
+        self.stage_timer.set_progress(0, len(all_ids))
+        if self._ids_only:
+            LOGGER.info("Собраны id для шардирования: %s", len(all_ids))
+            return
+        if self.seen_ids is not None:
+            seen = {org_id for org_id in all_ids if org_id in self.seen_ids}
+            if seen:
+                LOGGER.info("Пропускаю известные по индексу дублей: %s", len(seen))
+                all_ids -= seen
         total = len(all_ids)
         LOGGER.info("Уникальных организаций в списке: %s", total)
         if total == 0:
             LOGGER.info("Результаты не найдены")
             return
 
-        self._reset_list_scroll(page)
         parsed_ids: set[str] = set()
+        if self.skip_ids is not None:
+            parsed_ids.update(org_id for org_id in all_ids if org_id in self.skip_ids)
+            if parsed_ids:
+                LOGGER.info("Пропускаю уже разобранные карточки: %s", len(parsed_ids))
+        yield from self._collect_prepared(all_ids, parsed_ids)
+        if len(parsed_ids) >= total or (self.limit and len(parsed_ids) >= self.limit):
+            return
+
+        if self.card_workers:
+            yield from self._collect_with_pool(page, all_ids, parsed_ids)
+            return
+
+        self._reset_list_scroll(page)
         stalled_rounds = 0
         scroll_step = 1200
 
@@ -287,34 +604,13 @@ class YandexMapsScraper:
                     LOGGER.info("Достигнут лимит: %s", self.limit)
                     return
 
-                if not self._click_list_item_wrapper(item, org_id):
-                    continue
-
-                card_wait_start = time.monotonic()
-                card = self._wait_for_card(page, org_id)
-                if not card:
-                    LOGGER.info(
-                        "Карточка не загрузилась (id=%s, %.2fs)",
-                        org_id,
-                        time.monotonic() - card_wait_start,
-                    )
+                org = self._open_and_parse(page, item, org_id)
+                if org is None:
                     continue
-
-                LOGGER.info(
-                    "Карточка загружена (id=%s, %.2fs)",
-                    org_id,
-                    time.monotonic() - card_wait_start,
-                )
-
-                parse_start = time.monotonic()
-                org = self._parse_card(card, org_id)
-                LOGGER.info(
-                    "Карточка разобрана (id=%s, %.2fs)",
-                    org_id,
-                    time.monotonic() - parse_start,
-                )
                 parsed_ids.add(org_id)
                 parsed_this_round += 1
+                self._record_card(org_id, org)
+                self._report_progress(len(parsed_ids), total)
                 yield org
 
             moved, scroll_info = self._scroll_list(page, scroll_step)
@@ -327,10 +623,220 @@ class YandexMapsScraper:
                 LOGGER.info("Прогресса нет и список больше не листается — завершаю")
                 break
 
-            human_delay(0.2, 0.4)
+            self._politeness()
+
+    def _collect_streaming(self, page) -> Generator[Organization, None, None]:
+        # Один проход: id разбираются сразу после появления в списке,
+        # без предварительной прокрутки до конца и повторного прохода.
+        discovered: set[str] = set()
+        parsed_ids: set[str] = set()
+        seen: set[str] = set()
+        scroll_step = 1200
+        while True:
+            if self.stop_event.is_set():
+                return
+            if self.pause_event.is_set():
+                while self.pause_event.is_set() and not self.stop_event.is_set():
+                    time.sleep(0.1)
+            page = self._ensure_no_captcha(page)
+            if page is None:
+                return
+
+            visible_ids = self._collect_visible_ids(page)
+            new_ids = [org_id for org_id in dict.fromkeys(visible_ids) if org_id not in discovered]
+            if new_ids:
+                discovered.update(new_ids)
+                if self.journal is not None:
+                    self.journal.write_ids(new_ids)
+                if self.skip_ids is not None:
+                    parsed_ids.update(org_id for org_id in new_ids if org_id in self.skip_ids)
+                if self.seen_ids is not None:
+                    seen.update(org_id for org_id in new_ids if org_id in self.seen_ids)
+                LOGGER.info("Найдено карточек: %s (разобрано %s)", len(discovered), len(parsed_ids))
+                self._report_progress(len(parsed_ids), len(discovered) - len(seen))
+
+            for org_id in dict.fromkeys(visible_ids):
+                if self.stop_event.is_set():
+                    return
+                if org_id in parsed_ids or org_id in seen:
+                    continue
+                if self.limit and len(parsed_ids) >= self.limit:
+                    LOGGER.info("Достигнут лимит: %s", self.limit)
+                    return
+                if self.pause_event.is_set():
+                    while self.pause_event.is_set() and not self.stop_event.is_set():
+                        time.sleep(0.1)
+                page = self._ensure_no_captcha(page)
+                if page is None:
+                    return
+                org = self._prepared_card(org_id)
+                if org is None:
+                    item = page.locator(f"{self.list_item_selector}[data-id='{org_id}']").first
+                    org = self._open_and_parse(page, item, org_id)
+                    if org is None:
+                        continue
+                    self._record_card(org_id, org)
+                parsed_ids.add(org_id)
+                self._report_progress(len(parsed_ids), len(discovered) - len(seen))
+                yield org
+
+            if self.limit and len(parsed_ids) >= self.limit:
+                LOGGER.info("Достигнут лимит: %s", self.limit)
+                return
+
+            moved, scroll_info = self._scroll_list(page, scroll_step)
+            if moved or ("ids" in scroll_info and set(scroll_info["ids"]) - discovered):
+                self._politeness()
+                continue
+
+            LOGGER.info("Дошёл до конца списка, жду новые карточки")
+            if self.waiter is not None:
+                grown = self.waiter.wait_for_list_growth(
+                    page, self.list_item_selector, self.max_scroll_idle_time
+                )
+                has_new = bool(set(grown.get("ids") or []) - discovered)
+            else:
+                has_new = False
+                idle_start = time.monotonic()
+                while time.monotonic() - idle_start < self.max_scroll_idle_time:
+                    time.sleep(random.uniform(0.3, 0.5))
+                    if set(self._collect_visible_ids(page)) - discovered:
+                        has_new = True
+                        break
+            if not has_new:
+                LOGGER.info(
+                    "Новых карточек нет — завершаю: найдено %s, разобрано %s",
+                    len(discovered),
+                    len(parsed_ids),
+                )
+                if self.journal is not None:
+                    self.journal.mark_ids_complete()
+                return
+
+    def _open_and_parse(self, page, item, org_id: str) -> Optional[Organization]:
+        if self.governor is not None:
+            self.governor.pace(self.stop_event)
+        if not self._click_list_item_wrapper(item, org_id):
+            return None
+
+        with self.stage_timer.span("card_wait") as span:
+            card = self._wait_for_card(page, org_id)
+        if not card:
+            LOGGER.info("Карточка не загрузилась (id=%s, %.2fs)", org_id, span.seconds)
+            if self.captcha_probe is not None:
+                # Карточка не пришла — возможно, вместо неё капча: проверим перед следующей.
+                self.captcha_probe.mark()
+            return None
+
+        LOGGER.info("Карточка загружена (id=%s, %.2fs)", org_id, span.seconds)
+
+        org = self._parse_card(card, org_id)
+        if self.governor is not None:
+            self.governor.on_card()
+        return org
+
+    def _politeness(self) -> None:
+        scale = self.governor.scale if self.governor is not None else 1.0
+        if self.waiter is not None:
+            self.waiter.politeness(scale)
+        else:
+            human_delay(0.2 * scale, 0.4 * scale)
+
+    def _prepared_card(self, org_id: str) -> Optional[Organization]:
+        # Карточка, которую не нужно открывать: полная запись из API или свежий кэш.
+        collector = self.network_collector
+        if collector is not None:
+            org = collector.get(org_id)
+            if org is not None and collector.is_complete(org):
+                # В кэш не кладём: без карточки нет галочки и награды, а следующий
+                # запуск может фильтровать по ним.
+                if self.journal is not None:
+                    self.journal.write_org(org_id, org)
+                return org
+        if self.card_cache is not None:
+            org = self.card_cache.get(org_id)
+            if org is not None:
+                if self.journal is not None:
+                    self.journal.write_org(org_id, org)
+                return org
+        return None
+
+    def _collect_prepared(self, all_ids: set[str], parsed_ids: set[str]) -> Generator[Organization, None, None]:
+        if self.network_collector is None and self.card_cache is None:
+            return
+        prepared = 0
+        for org_id in list(all_ids):
+            if self.limit and len(parsed_ids) >= self.limit:
+                break
+            if org_id in parsed_ids:
+                continue
+            org = self._prepared_card(org_id)
+            if org is None:
+                continue
+            parsed_ids.add(org_id)
+            prepared += 1
+            self._report_progress(len(parsed_ids), len(all_ids))
+            yield org
+        LOGGER.info(
+            "Без открытия карточки (ответы поиска/кэш): %s из %s",
+            prepared,
+            len(all_ids),
+        )
+
+    def _report_progress(self, parsed: int, total: int) -> None:
+        self.stage_timer.set_progress(parsed, total)
+        if self.progress is None:
+            return
+        try:
+            self.progress(parsed, total)
+        except Exception:
+            LOGGER.debug("Progress callback failed", exc_info=True)
+
+    def _record_card(self, org_id: str, org: Organization) -> None:
+        if self.journal is not None:
+            self.journal.write_org(org_id, org)
+        if self.card_cache is None:
+            return
+        try:
+            self.card_cache.put(org_id, org)
+        except Exception:
+            LOGGER.debug("Failed to store card in cache (id=%s)", org_id, exc_info=True)
+
+    def _collect_with_pool(
+        self, page, all_ids: set[str], parsed_ids: set[str]
+    ) -> Generator[Organization, None, None]:
+        # Порядок фиксирован: при --limit разные запуски берут одни и те же карточки.
+        org_ids = [org_id for org_id in sorted(all_ids) if org_id not in parsed_ids]
+        if self.limit:
+            org_ids = org_ids[: max(0, self.limit - len(parsed_ids))]
+        pool = CardFetchPool(
+            page.context,
+            parse_card=self._parse_card,
+            url_for_id=lambda org_id: card_page_url(self.base_url, org_id),
+            ensure_no_captcha=self._ensure_no_captcha,
+            concurrency=self.card_workers,
+            setup_page=self.card_page_blocker.install,
+            stop_event=self.stop_event,
+            pause_event=self.pause_event,
+            stage_timer=self.stage_timer,
+            governor=self.governor,
+            main_page=page,
+        )
+        self.pool_stats = pool.stats
+        total = len(parsed_ids) + len(org_ids)
+        for org_id, org in pool.fetch(org_ids):
+            if self.governor is not None:
+                self.governor.on_card()
+            parsed_ids.add(org_id)
+            self._record_card(org_id, org)
+            self._report_progress(len(parsed_ids), total)
+            yield org
 
     def _collect_all_ids(self, page) -> set[str]:
-        all_ids = set(self._collect_visible_ids(page))
+        if self.waiter is not None:
+            all_ids = set(self.waiter.wait_for_list_growth(page, self.list_item_selector, 0).get("ids") or [])
+        else:
+            all_ids = set(self._collect_visible_ids(page))
         LOGGER.info("Собираю id карточек: старт=%s", len(all_ids))
         scroll_step = 1200
         last_scroll_move = time.monotonic()
@@ -343,7 +849,10 @@ class YandexMapsScraper:
                 break
 
             moved, scroll_info = self._scroll_list(page, scroll_step)
-            new_ids = self._collect_visible_ids(page)
+            if "ids" in scroll_info:
+                new_ids = scroll_info["ids"]
+            else:
+                new_ids = self._collect_visible_ids(page)
             before_count = len(all_ids)
             all_ids.update(new_ids)
             added = len(all_ids) - before_count
@@ -381,7 +890,12 @@ class YandexMapsScraper:
             idle_start_size = len(all_ids)
             idle_start = time.monotonic()
             LOGGER.info("Дошёл до конца списка, жду новые карточки")
-            while time.monotonic() - idle_start < 10:
+            if self.waiter is not None:
+                grown = self.waiter.wait_for_list_growth(page, self.list_item_selector, 10)
+                all_ids.update(grown.get("ids") or [])
+                if len(all_ids) > idle_start_size:
+                    LOGGER.info("После ожидания загружено новых карточек: %s", len(all_ids) - idle_start_size)
+            while self.waiter is None and time.monotonic() - idle_start < 10:
                 time.sleep(random.uniform(0.3, 0.5))
                 all_ids.update(self._collect_visible_ids(page))
                 if len(all_ids) > idle_start_size:
@@ -396,16 +910,7 @@ class YandexMapsScraper:
 
     def _collect_visible_ids(self, page) -> list[str]:
         try:
-            return page.evaluate(
-                """
-                (selector) => {
-                  return Array.from(document.querySelectorAll(selector))
-                    .map(node => node.dataset.id)
-                    .filter(Boolean);
-                }
-                """,
-                self.list_item_selector,
-            )
+            return page.evaluate(VISIBLE_IDS_SCRIPT, self.list_item_selector)
         except Exception:
             return []
 
@@ -417,6 +922,12 @@ class YandexMapsScraper:
             return ""
         return ""
 
+    def _safe_texts(self, locator) -> list[str]:
+        try:
+            return [sanitize_text(text) for text in locator.all_text_contents()]
+        except Exception:
+            return []
+
     def _safe_attr(self, locator, name: str) -> str:
         try:
             if locator and locator.count() > 0:
@@ -431,10 +942,10 @@ class YandexMapsScraper:
             if wrapper.count() == 0:
                 LOGGER.info("Не нашёл обёртку карточки для клика (id=%s)", org_id)
                 return False
-            click_start = time.monotonic()
-            wrapper.scroll_into_view_if_needed()
-            wrapper.evaluate("el => el.click()")
-            LOGGER.info("Кликнул по карточке (id=%s, %.2fs)", org_id, time.monotonic() - click_start)
+            with self.stage_timer.span("click") as span:
+                wrapper.scroll_into_view_if_needed()
+                wrapper.evaluate("el => el.click()")
+            LOGGER.info("Кликнул по карточке (id=%s, %.2fs)", org_id, span.seconds)
             return True
         except Exception:
             LOGGER.info("Ошибка клика по карточке (id=%s)", org_id)
@@ -442,89 +953,142 @@ class YandexMapsScraper:
 
     def _wait_for_card(self, page, org_id: str):
         selector = f"aside.sidebar-view._shown div.business-card-view[data-id='{org_id}']"
+        fallback = "aside.sidebar-view._shown div.business-card-view[data-id]"
+        if self.waiter is not None:
+            matched = self.waiter.wait_for_card(page, selector, fallback)
+            if matched == "exact":
+                return page.locator(selector).first
+            if matched == "fallback":
+                return page.locator(fallback).first
+            return None
         try:
             page.wait_for_selector(selector, timeout=2000)
             return page.locator(selector).first
         except PlaywrightTimeoutError:
             try:
-                fallback = "aside.sidebar-view._shown div.business-card-view[data-id]"
                 page.wait_for_selector(fallback, timeout=2000)
                 return page.locator(fallback).first
             except PlaywrightTimeoutError:
                 return None
 
     def _parse_card(self, card_root, org_id: str) -> Organization:
+        with self.stage_timer.span("parse") as span:
+            org = self._parse_card_raw(card_root, org_id)
+        LOGGER.info("Карточка разобрана (id=%s, %.2fs)", org_id, span.seconds)
+        return org
+
+    def _parse_card_raw(self, card_root, org_id: str) -> Organization:
+        raw = None
+        if self.card_extraction == "evaluate":
+            raw = self._read_card_payload(card_root)
+            if raw is None:
+                LOGGER.debug("Разбор карточки через evaluate не удался, читаю локаторами (id=%s)", org_id)
+        if raw is None:
+            raw = self._read_card_locators(card_root)
+        org = self._organization_from_raw(raw, org_id)
+        if self.network_collector is not None:
+            network_org = self.network_collector.get(org_id)
+            if network_org is not None:
+                org = merge_organizations(network_org, org)
+        return org
+
+    def _read_card_payload(self, card_root) -> Optional[dict]:
+        try:
+            payload = card_root.evaluate(CARD_PAYLOAD_SCRIPT)
+        except Exception:
+            return None
+        return self._raw_from_payload(payload)
+
+    @staticmethod
+    def _raw_from_payload(payload) -> Optional[dict]:
+        if not isinstance(payload, dict):
+            return None
+        raw = {
+            key: sanitize_text(payload.get(key) or "")
+            for key in (
+                "title",
+                "title_href",
+                "rating_text",
+                "count_text",
+                "award",
+                "website_href",
+                "website_text",
+            )
+        }
+        raw["hrefs"] = [sanitize_text(href) for href in payload.get("hrefs") or []]
+        raw["phone_texts"] = [sanitize_text(text) for text in payload.get("phone_texts") or []]
+        raw["badge_prioritized"] = bool(payload.get("badge_prioritized"))
+        raw["badge_fills"] = payload.get("badge_fills")
+        return raw
+
+    def _read_card_locators(self, card_root) -> dict:
         title_link = card_root.locator(
             "h1.card-title-view__title a.card-title-view__title-link"
         ).first
-        name = self._safe_text(title_link)
-        href = self._safe_attr(title_link, "href")
-        card_url = self._normalize_card_url(href, org_id)
-
-        rating_text = self._safe_text(
-            card_root.locator(".business-rating-badge-view__rating-text").first
-        )
-        rating = normalize_rating(rating_text)
-        count_text = self._safe_text(
-            card_root.locator(".business-header-rating-view__text").first
-        )
-        rating_count = extract_count(count_text)
-
-        phone_text = self._safe_text(card_root.locator("span[itemprop='telephone']").first)
-        phone = self._normalize_phone(phone_text)
-
-        verified = self._extract_verified(card_root)
-
-        award = self._safe_text(
-            card_root.locator(".business-header-awards-view__award-text").first
-        )
-
-        vk = ""
-        telegram = ""
-        whatsapp = ""
         links = card_root.locator("a[href]")
-        for i in range(links.count()):
-            href = self._safe_attr(links.nth(i), "href")
-            lower_href = href.lower()
-            if not vk and "vk.com" in lower_href:
-                vk = href
-            if not telegram and ("t.me" in lower_href or "telegram.me" in lower_href):
-                telegram = href
-            if not whatsapp and (
-                "wa.me" in lower_href
-                or "api.whatsapp.com" in lower_href
-                or "whatsapp.com" in lower_href
-            ):
-                whatsapp = href
-
-        website = self._extract_website(card_root)
+        hrefs = [self._safe_attr(links.nth(i), "href") for i in range(links.count())]
+        badge_prioritized, badge_fills = self._read_verified_badge(card_root)
+        return {
+            "title": self._safe_text(title_link),
+            "title_href": self._safe_attr(title_link, "href"),
+            "rating_text": self._safe_text(
+                card_root.locator(".business-rating-badge-view__rating-text").first
+            ),
+            "count_text": self._safe_text(
+                card_root.locator(".business-header-rating-view__text").first
+            ),
+            "phone_texts": self._safe_texts(card_root.locator("span[itemprop='telephone']")),
+            "award": self._safe_text(
+                card_root.locator(".business-header-awards-view__award-text").first
+            ),
+            "website_href": self._safe_attr(
+                card_root.locator("a.business-urls-view__link[href]").first, "href"
+            ),
+            "website_text": self._safe_text(
+                card_root.locator(".business-urls-view__text").first
+            ),
+            "hrefs": hrefs,
+            "badge_prioritized": badge_prioritized,
+            "badge_fills": badge_fills,
+        }
+
+    @classmethod
+    def _organization_from_raw(cls, raw: dict, org_id: str) -> Organization:
+        links = classify_links(raw["hrefs"], website=raw["website_href"] or raw["website_text"])
+        phones = card_phones(raw["phone_texts"])
 
         return Organization(
-            name=name,
-            phone=phone,
-            verified=verified,
-            award=award,
-            vk=vk,
-            telegram=telegram,
-            whatsapp=whatsapp,
-            website=website,
-            card_url=card_url,
-            rating=rating,
-            rating_count=rating_count,
+            name=raw["title"],
+            phone=phones.phone,
+            verified=cls._classify_verified(raw["badge_prioritized"], raw["badge_fills"]),
+            award=raw["award"],
+            vk=links.vk,
+            telegram=links.telegram,
+            whatsapp=links.whatsapp,
+            website=links.website,
+            card_url=cls._normalize_card_url(raw["title_href"], org_id),
+            rating=normalize_rating(raw["rating_text"]),
+            rating_count=extract_count(raw["count_text"]),
+            viber=links.viber,
+            ok=links.ok,
+            youtube=links.youtube,
+            instagram=links.instagram,
+            phones=phones.phones,
+            mobile_phone=phones.mobile_phone,
         )
 
-    def _extract_verified(self, card_root) -> str:
+    def _read_verified_badge(self, card_root) -> tuple[bool, Optional[list]]:
         prioritized = card_root.locator(
             "h1.card-title-view__title span.business-verified-badge._prioritized"
         )
         if prioritized.count() > 0:
-            return "зелёная"
+            return True, None
 
         badge = card_root.locator(
             "h1.card-title-view__title span.business-verified-badge"
         )
         if badge.count() == 0:
-            return ""
+            return False, None
 
         try:
             fill_colors = badge.first.evaluate(
@@ -532,24 +1096,23 @@ class YandexMapsScraper:
                 .map((path) => (path.getAttribute('fill') || '').trim().toLowerCase())"""
             )
         except Exception:
-            return ""
+            return False, None
+        return False, fill_colors
 
+    @staticmethod
+    def _classify_verified(prioritized: bool, fill_colors) -> str:
+        if prioritized:
+            return "зелёная"
         if isinstance(fill_colors, list):
             if any(color == "#3bb300" for color in fill_colors):
                 return "зелёная"
             if any(color == "#196dff" for color in fill_colors):
                 return "синяя"
-
         return ""
 
     @staticmethod
     def _normalize_phone(raw_phone: str) -> str:
-        digits = "".join(ch for ch in raw_phone if ch.isdigit())
-        if len(digits) != 11 or digits[0] not in {"7", "8"}:
-            return ""
-        if digits[0] == "8":
-            digits = "7" + digits[1:]
-        return f"+{digits}"
+        return normalize_phone(raw_phone)
 
     @staticmethod
     def _normalize_card_url(href: str, org_id: str) -> str:
@@ -568,50 +1131,28 @@ class YandexMapsScraper:
             return ""
         return f"https://yandex.ru/maps/org/{match.group('org_id')}/"
 
-    def _extract_website(self, card_root) -> str:
-        link = self._safe_attr(
-            card_root.locator("a.business-urls-view__link[href]").first, "href"
-        )
-        if link:
-            return self._normalize_website(link)
-        text = self._safe_text(
-            card_root.locator(".business-urls-view__text").first
-        )
-        return self._normalize_website(text)
-
     @staticmethod
     def _normalize_website(raw_url: str) -> str:
         if not raw_url:
             return ""
-        url = sanitize_text(raw_url)
-        if not url:
-            return ""
-        if url.startswith("http://") or url.startswith("https://"):
-            return url
-        if url.startswith("//"):
-            return f"https:{url}"
-        return f"https://{url}"
+        return canonical_website(sanitize_text(raw_url))
 
     def _scroll_list(self, page, step: int) -> tuple[bool, dict]:
+        with self.stage_timer.span("scroll"):
+            return self._scroll_list_once(page, step)
+
+    def _scroll_list_once(self, page, step: int) -> tuple[bool, dict]:
         try:
-            result = page.evaluate(
-                """
-                ({selector, scrollStep}) => {
-                  const container = document.querySelector(selector);
-                  if (!container) {
-                    return { moved: false, scrollTop: 0 };
-                  }
-                  const prevTop = container.scrollTop;
-                  const maxTop = container.scrollHeight - container.clientHeight;
-                  const nextTop = Math.min(prevTop + scrollStep, maxTop);
-                  container.scrollTop = nextTop;
-                  container.dispatchEvent(new Event("scroll", { bubbles: true }));
-                  return { moved: nextTop > prevTop, scrollTop: nextTop, maxTop };
-                }
-                """,
-                {"selector": self.scroll_container_selector, "scrollStep": step},
-            )
-            time.sleep(random.uniform(0.15, 0.25))
+            if self.waiter is not None:
+                result = self.waiter.scroll_and_wait(
+                    page, self.scroll_container_selector, self.list_item_selector, step
+                )
+            else:
+                result = page.evaluate(
+                    SCROLL_LIST_SCRIPT,
+                    {"selector": self.scroll_container_selector, "scrollStep": step},
+                )
+                time.sleep(random.uniform(0.15, 0.25))
             moved = bool(result and result.get("moved"))
             if result:
                 LOGGER.info(
@@ -627,19 +1168,6 @@ class YandexMapsScraper:
 
     def _reset_list_scroll(self, page) -> None:
         try:
-            page.evaluate(
-                """
-                (selector) => {
-                  const container = document.querySelector(selector);
-                  if (!container) {
-                    return false;
-                  }
-                  container.scrollTop = 0;
-                  container.dispatchEvent(new Event("scroll", { bubbles: true }));
-                  return true;
-                }
-                """,
-                self.scroll_container_selector,
-            )
+            page.evaluate(RESET_SCROLL_SCRIPT, self.scroll_container_selector)
         except Exception:
             LOGGER.info("Не удалось сбросить прокрутку списка")
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import csv
+import logging
+import re
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+
+LOGGER = logging.getLogger(__name__)
+
+MOBILE = "mobile"
+LANDLINE = "landline"
+TOLLFREE = "tollfree"
+UNKNOWN = ""
+
+# Обычные разделители удаляются str.replace по всему пакету (translate на не-ASCII
+# строке втрое медленнее), всё прочее («доб.», «ext», «вн.», текст в скобках)
+# сворачивается в маркер «#»: цифры после первого «#» — добавочный номер.
+SEPARATORS = (" ", "(", ")", "-", ".", "\t", "\u00a0", "\u2010", "\u2011", "\u2012", "\u2013", "\u2014")
+JUNK_RE = re.compile(r"[^\d+\n]+")
+MAX_EXT_DIGITS = 6
+# Короткий городской номер: 5–7 цифр без кода города.
+SHORT_LOCAL_SIZES = range(5, 8)
+# Несколько номеров в одной строке: «+7 495 …, +7 495 …» или через «;». Делим, только
+# если дальше начинается номер: «+7 495 …, доб. 123» — один номер с добавочным.
+SPLIT_RE = re.compile(r"\s*[,;]\s*(?=[+(\d])|\n")
+
+# Грубая разметка национальных номеров +7 по первым цифрам: ABC — городские,
+# DEF 9xx — мобильные; 7xx — Казахстан. Точные диапазоны — реестр Россвязи (load_registry).
+DEFAULT_RANGES = (
+    (3000000000, 3999999999, LANDLINE),
+    (4000000000, 4999999999, LANDLINE),
+    (7000000000, 7089999999, MOBILE),
+    (7100000000, 7299999999, LANDLINE),
+    (7470000000, 7479999999, MOBILE),
+    (7710000000, 7719999999, MOBILE),
+    (7750000000, 7789999999, MOBILE),
+    (8000000000, 8009999999, TOLLFREE),
+    (8100000000, 8799999999, LANDLINE),
+    (9000000000, 9999999999, MOBILE),
+)
+
+
+@dataclass(slots=True)
+class CardPhones:
+    # phone — первый российский (+7) номер в E.164 без добавочного, как и раньше
+    # (по нему ищутся дубли); зарубежные номера есть только в phones.
+    # phones — все номера карточки в E.164; короткий номер с неизвестным кодом
+    # города остаётся как в карточке («12-34-56»), чтобы не потерять его.
+    # mobile_phone — первый мобильный.
+    phone: str = ""
+    phones: str = ""
+    mobile_phone: str = ""
+
+
+class PhoneIndex:
+    # Непересекающиеся интервалы [start, end] отсортированы по start: поиск — один bisect.
+    # area_codes — известные коды городов (3–5 цифр после +7): только по ним
+    # короткий номер достраивается кодом соседнего номера карточки.
+    def __init__(self, ranges: Iterable[tuple[int, int, str]], area_codes: Iterable[str] = ()) -> None:
+        self.area_codes = frozenset(area_codes)
+        self.starts = array("q")
+        self.ends = array("q")
+        self.kinds: list[str] = []
+        for start, end, kind in _merge_ranges(ranges):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.kinds.append(kind)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def kind(self, national: int) -> str:
+        position = bisect_right(self.starts, national) - 1
+        if position >= 0 and national <= self.ends[position]:
+            return self.kinds[position]
+        return UNKNOWN
+
+    def classify(self, number: str) -> str:
+        # Только российский план нумерации (+7 и 10 цифр), добавочный не влияет.
+        digits = number.partition(";")[0]
+        if len(digits) != 12 or not digits.startswith("+7"):
+            return UNKNOWN
+        return self.kind(int(digits[2:]))
+
+    def classify_many(self, numbers: Sequence[str]) -> list[str]:
+        classify = self.classify
+        return [classify(number) for number in numbers]
+
+
+def _merge_ranges(ranges: Iterable[tuple[int, int, str]]) -> list[tuple[int, int, str]]:
+    merged: list[tuple[int, int, str]] = []
+    for start, end, kind in sorted(ranges):
+        if merged:
+            last_start, last_end, last_kind = merged[-1]
+            if start <= last_end + 1 and kind == last_kind:
+                merged[-1] = (last_start, max(last_end, end), kind)
+                continue
+            if start <= last_end:
+                # Пересечение разных видов: оставляем первый, хвост отдаём следующему.
+                start = last_end + 1
+                if start > end:
+                    continue
+        merged.append((start, end, kind))
+    return merged
+
+
+def load_registry(paths: Iterable[Path]) -> PhoneIndex:
+    # Выгрузки Россвязи ABC-3xx.csv, ABC-4xx.csv, ABC-8xx.csv, DEF-9xx.csv:
+    # «АВС/ DEF;От;До;Емкость;Оператор;Регион», кодировка utf-8 или cp1251.
+    # Списки кодов городов — строки «код;город» (например «8342;Саранск»).
+    ranges: list[tuple[int, int, str]] = []
+    area_codes: set[str] = set()
+    for path in paths:
+        path = Path(path)
+        raw = path.read_bytes()
+        try:
+            text = raw.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            text = raw.decode("cp1251")
+        for row in csv.reader(text.splitlines(), delimiter=";"):
+            cells = [cell.strip() for cell in row]
+            if len(cells) < 2 or not cells[0].isdigit():
+                continue
+            if not cells[1].isdigit():
+                if 3 <= len(cells[0]) <= 5:
+                    area_codes.add(cells[0])
+                continue
+            if len(cells) < 3:
+                continue
+            code, start, end = cells[:3]
+            if not end.isdigit():
+                continue
+            base = int(code) * 10_000_000
+            kind = MOBILE if code.startswith("9") else TOLLFREE if code == "800" else LANDLINE
+            ranges.append((base + int(start), base + int(end), kind))
+        LOGGER.info("Реестр номеров: %s (%s диапазонов, %s кодов городов)", path.name, len(ranges), len(area_codes))
+    return PhoneIndex(ranges or DEFAULT_RANGES, area_codes)
+
+
+_default_index = PhoneIndex(DEFAULT_RANGES)
+
+
+def default_index() -> PhoneIndex:
+    return _default_index
+
+
+def set_default_index(index: PhoneIndex) -> None:
+    global _default_index
+    _default_index = index
+
+
+def _clean_batch(raws: Sequence[str]) -> list[str]:
+    # Весь список — одна строка: два прохода скомпилированных выражений вместо цикла по символам.
+    text = "\n".join(raw.replace("\n", " ") for raw in raws)
+    for separator in SEPARATORS:
+        text = text.replace(separator, "")
+    return JUNK_RE.sub("#", text).split("\n")
+
+
+def _to_e164(cleaned: str, area_code: str = "") -> str:
+    number, _, ext = cleaned.strip("#").partition("#")
+    plus = number.startswith("+")
+    digits = number.replace("+", "")
+    size = len(digits)
+    if size == 11 and (digits[0] == "7" or (digits[0] == "8" and not plus)):
+        result = f"+7{digits[1:]}"
+    elif size == 10 and not plus and digits[0] in "3489":
+        result = f"+7{digits}"
+    elif plus and 8 <= size <= 15 and digits[0] not in "07":
+        result = f"+{digits}"
+    elif area_code and 5 <= size <= 7 and len(area_code) + size == 10:
+        # Короткий городской номер: код города берём у соседнего номера той же карточки.
+        result = f"+7{area_code}{digits}"
+    else:
+        return ""
+    ext = ext.partition("#")[0]
+    return f"{result};ext={ext}" if ext.isdigit() and len(ext) <= MAX_EXT_DIGITS else result
+
+
+def normalize_phone(raw: str, area_code: str = "") -> str:
+    if not raw:
+        return ""
+    return _to_e164(_clean_batch((raw,))[0], area_code)
+
+
+def normalize_many(raws: Sequence[str], area_code: str = "") -> list[str]:
+    if not raws:
+        return []
+    return [_to_e164(cleaned, area_code) for cleaned in _clean_batch(raws)]
+
+
+def _short_digits(cleaned: str) -> str:
+    number = cleaned.strip("#").partition("#")[0]
+    return number if number.isdigit() and len(number) in SHORT_LOCAL_SIZES else ""
+
+
+def _area_code(digits: str, numbers: Iterable[str], index: PhoneIndex) -> str:
+    # Длина кода задана длиной короткого номера (вместе — 10 цифр); код берём у
+    # российского номера карточки, только если такой код города известен.
+    length = 10 - len(digits)
+    for number in numbers:
+        if number.startswith("+7"):
+            code = number[2:2 + length]
+            if code in index.area_codes:
+                return code
+    return ""
+
+
+def extract_phones(texts: Iterable[str], index: Optional[PhoneIndex] = None) -> list[str]:
+    # Все номера карточки по порядку, без повторов. Короткий номер достраивается
+    # кодом города, если код известен (index.area_codes), иначе остаётся как в карточке.
+    index = index or _default_index
+    parts = [part for text in texts if text for part in SPLIT_RE.split(text) if part]
+    if not parts:
+        return []
+    cleaned = _clean_batch(parts)
+    numbers = [_to_e164(value) for value in cleaned]
+    if not all(numbers):
+        resolved = [number for number in numbers if number]
+        for position, number in enumerate(numbers):
+            if number:
+                continue
+            digits = _short_digits(cleaned[position])
+            if not digits:
+                continue
+            code = _area_code(digits, resolved, index)
+            numbers[position] = _to_e164(cleaned[position], code) if code else parts[position].strip()
+    return list(dict.fromkeys(number for number in numbers if number))
+
+
+def card_phones(texts: Iterable[str], index: Optional[PhoneIndex] = None) -> CardPhones:
+    index = index or _default_index
+    numbers = extract_phones(texts, index)
+    if not numbers:
+        return CardPhones()
+    plain = next((number.partition(";")[0] for number in numbers if number.startswith("+7")), "")
+    mobile = next((number for number in numbers if index.classify(number) == MOBILE), "")
+    return CardPhones(phone=plain, phones=", ".join(numbers), mobile_phone=mobile)
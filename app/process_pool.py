@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from app.batch_runner import QueryResult, unique_queries
+from app.checkpoint import RunJournal, journal_path_for
+from app.excel_writer import ExcelWriter
+from app.organization import organization_from_dict, organization_to_dict
+from app.stopwords import passes_filters
+from app.utils import build_result_paths, split_query
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkItem:
+    key: str
+    query: str
+    kind: str = "parse"  # "parse" или "collect" (только id для шардирования)
+    output_path: Optional[Path] = None
+    limit: Optional[int] = None
+    known_ids: Optional[list[str]] = None
+    shard: int = 0
+
+
+@dataclass
+class _QueryState:
+    result: QueryResult
+    writer: object = None
+    pending: int = 1
+    started: float = field(default_factory=time.monotonic)
+
+
+def default_workers() -> int:
+    return max(1, os.cpu_count() or 1)
+
+
+def split_shards(ids: list[str], shards: int) -> list[list[str]]:
+    shards = max(1, min(shards, len(ids)))
+    return [ids[index::shards] for index in range(shards)]
+
+
+# Каждый процесс — свой Playwright и свой браузер; в главный процесс уходят только
+# словари организаций. Писатель (ExcelWriter/приёмники) живёт в главном процессе.
+class ProcessOrchestrator:
+    def __init__(
+        self,
+        queries: Iterable[str],
+        settings,
+        results_dir: Path,
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        shard_ids: bool = False,
+        writer_factory: Callable[[Path], object] = ExcelWriter,
+        stop_event=None,
+        pause_event=None,
+        captcha_resume_event=None,
+        captcha_hook=None,
+        on_org: Optional[Callable[[str, object], None]] = None,
+        on_stats: Optional[Callable[[tuple, dict], None]] = None,
+        scraper_kwargs: Optional[dict] = None,
+        worker_options: Optional[dict] = None,
+    ) -> None:
+        self.queries = unique_queries(queries)
+        self.settings = settings
+        self.results_dir = Path(results_dir)
+        self.workers = workers if workers and workers > 0 else default_workers()
+        self.limit = limit
+        self.shard_ids = shard_ids
+        self.writer_factory = writer_factory
+        self._mp = multiprocessing.get_context("spawn")
+        self.stop_event = stop_event or self._mp.Event()
+        self.pause_event = pause_event or self._mp.Event()
+        # captcha_resume_event — общее «продолжить» от пользователя; у каждого процесса
+        # своё событие, и одно нажатие снимает с капчи один процесс (ждущий дольше всех).
+        self.captcha_resume_event = captcha_resume_event or self._mp.Event()
+        # captcha_hook(stage, None) вызывается в главном процессе по сообщениям воркеров.
+        self.captcha_hook = captcha_hook
+        self._resume_events: list = []
+        self._captcha_waiting: deque[int] = deque()
+        # on_org(query, org) вызывается в главном процессе после записи (индекс дублей и т.п.).
+        self.on_org = on_org
+        # on_stats(key, snapshot) — снимки StageTimer воркеров (app.metrics.timer_snapshot) раз в секунду.
+        self.on_stats = on_stats
+        # scraper_kwargs уходят в дочерние процессы — только значения, которые можно pickle.
+        self.scraper_kwargs = scraper_kwargs or {}
+        # worker_options: card_cache_path/cache_ttl/refresh_cache, dedup_path, phone_registry,
+        # captcha_budget (на весь запуск, делится между процессами) — открываются в воркере.
+        self.worker_options = worker_options or {}
+        self.results: list[QueryResult] = []
+
+    def run(self) -> list[QueryResult]:
+        self.results = []
+        if not self.queries:
+            return self.results
+        work_queue = self._mp.Queue()
+        result_queue = self._mp.Queue()
+        log_queue = self._mp.Queue()
+        listener = logging.handlers.QueueListener(
+            log_queue, *logging.getLogger().handlers, respect_handler_level=True
+        )
+        listener.start()
+
+        states: dict[str, _QueryState] = {}
+        shard_mode = self.shard_ids and len(self.queries) == 1
+        for query in self.queries:
+            niche, city = split_query(query)
+            output_path, _folder = build_result_paths(niche=niche, city=city, results_dir=self.results_dir)
+            states[query] = _QueryState(result=QueryResult(query=query, output_path=output_path))
+            kind = "collect" if shard_mode else "parse"
+            work_queue.put(WorkItem(key=query, query=query, kind=kind, output_path=output_path, limit=self.limit))
+
+        worker_count = min(self.workers, len(self.queries)) if not shard_mode else self.workers
+        LOGGER.info("Запускаю процессы: %s (запросов=%s)", worker_count, len(self.queries))
+        worker_options = self._worker_options(worker_count)
+        self._resume_events = [self._mp.Event() for _ in range(worker_count)]
+        self._captcha_waiting.clear()
+        processes = [
+            self._mp.Process(
+                target=_worker_main,
+                args=(
+                    number,
+                    work_queue,
+                    result_queue,
+                    log_queue,
+                    self.stop_event,
+                    self.pause_event,
+                    self._resume_events[number],
+                    self.scraper_kwargs,
+                    worker_options,
+                    logging.getLogger().getEffectiveLevel(),
+                ),
+                name=f"scraper-{number}",
+                daemon=True,
+            )
+            for number in range(worker_count)
+        ]
+        for process in processes:
+            process.start()
+        if not shard_mode:
+            for _ in processes:
+                work_queue.put(None)
+
+        try:
+            self._drain(result_queue, work_queue, processes, states, shard_mode)
+        finally:
+            for state in states.values():
+                self._finish_query(state)
+            for process in processes:
+                process.join(timeout=10)
+                if process.is_alive():
+                    LOGGER.warning("Процесс %s не завершился — останавливаю", process.name)
+                    process.terminate()
+            listener.stop()
+        self.results = [states[query].result for query in self.queries]
+        return self.results
+
+    def _drain(self, result_queue, work_queue, processes, states: dict[str, _QueryState], shard_mode: bool) -> None:
+        alive = len(processes)
+        dispatched = not shard_mode
+        while alive:
+            self._forward_resume()
+            try:
+                message = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    LOGGER.warning("Все процессы завершились, не прислав итог")
+                    return
+                continue
+            kind = message[0]
+            if kind == "exit":
+                alive -= 1
+                if not dispatched:
+                    # Процесс со сбором id упал — остальных больше нечем занять.
+                    dispatched = True
+                    for _ in processes:
+                        work_queue.put(None)
+            elif kind == "ids":
+                _kind, key, ids = message
+                dispatched = True
+                self._dispatch_shards(work_queue, states[key], key, ids, len(processes))
+            elif kind == "org":
+                _kind, key, data = message
+                self._write(states[key], data)
+            elif kind == "captcha":
+                _kind, number, stage = message
+                self._on_captcha(number, stage)
+            elif kind == "stats":
+                _kind, key, snapshot = message
+                if self.on_stats is not None:
+                    self.on_stats(key, snapshot)
+            elif kind == "done":
+                _kind, key, error = message
+                state = states[key]
+                if error and not state.result.error:
+                    state.result.error = error
+                state.pending -= 1
+                if state.pending <= 0:
+                    self._finish_query(state, ensure_output=True)
+
+    def _worker_options(self, worker_count: int) -> dict:
+        options = dict(self.worker_options)
+        if options.get("captcha_budget"):
+            # Регулятор у каждого процесса свой — бюджет делится на реально запущенные.
+            options["captcha_budget"] = options["captcha_budget"] / max(1, worker_count)
+        if self.on_stats is not None:
+            options["report_stats"] = True
+        return options
+
+    def _on_captcha(self, number: int, stage: str) -> None:
+        if stage == "detected":
+            if number not in self._captcha_waiting:
+                self._captcha_waiting.append(number)
+        elif number in self._captcha_waiting:
+            self._captcha_waiting.remove(number)
+        if self.captcha_hook is not None:
+            try:
+                self.captcha_hook(stage, None)
+            except Exception:
+                LOGGER.debug("Captcha hook failed", exc_info=True)
+
+    def _forward_resume(self) -> None:
+        if not self.captcha_resume_event.is_set():
+            return
+        self.captcha_resume_event.clear()
+        if self._captcha_waiting:
+            number = self._captcha_waiting.popleft()
+            LOGGER.info("Продолжаю процесс %s после капчи", number)
+            self._resume_events[number].set()
+
+    def _dispatch_shards(self, work_queue, state: _QueryState, key: str, ids: list[str], workers: int) -> None:
+        if self.worker_options.get("dedup_path"):
+            # Известные по индексу дублей воркеры всё равно пропустят — в limit их не считаем.
+            from app.dedup import DedupIndex
+
+            index = DedupIndex(Path(self.worker_options["dedup_path"]))
+            try:
+                fresh = [org_id for org_id in ids if org_id not in index]
+            finally:
+                index.close()
+            if len(fresh) < len(ids):
+                LOGGER.info("Пропускаю известные по индексу дублей: %s", len(ids) - len(fresh))
+            ids = fresh
+        if self.limit:
+            ids = ids[: self.limit]
+        shards = [shard for shard in split_shards(ids, workers) if shard]
+        LOGGER.info("Делю %s id на %s частей", len(ids), len(shards))
+        state.pending = len(shards) or 1
+        for number, shard in enumerate(shards):
+            work_queue.put(
+                WorkItem(key=key, query=key, output_path=state.result.output_path, known_ids=shard, shard=number + 1)
+            )
+        if not shards:
+            state.pending = 0
+            self._finish_query(state, ensure_output=True)
+        for _ in range(workers):
+            work_queue.put(None)
+
+    def _write(self, state: _QueryState, data: dict) -> None:
+        if state.writer is None:
+            state.writer = self.writer_factory(state.result.output_path)
+        org = organization_from_dict(data)
+        state.writer.append(org, include_in_potential=passes_filters(org, self.settings))
+        state.result.count += 1
+        if self.on_org is not None:
+            self.on_org(state.result.query, org)
+
+    def _finish_query(self, state: _QueryState, ensure_output: bool = False) -> None:
+        if state.writer is None and ensure_output and not state.result.seconds:
+            # Пустая выдача — как и в последовательном режиме, файл результата всё равно создаётся.
+            state.writer = self.writer_factory(state.result.output_path)
+        if state.writer is not None:
+            try:
+                state.writer.close()
+            finally:
+                state.writer = None
+                state.result.seconds = time.monotonic() - state.started
+                LOGGER.info(
+                    "Запрос готов: %s — %s организаций за %.1fs",
+                    state.result.query,
+                    state.result.count,
+                    state.result.seconds,
+                )
+        elif not state.result.seconds:
+            state.result.seconds = time.monotonic() - state.started
+
+
+@contextmanager
+def _report_stats(result_queue, key: tuple, timer, query: str, interval: float = 1.0):
+    from app.metrics import timer_snapshot
+
+    done = threading.Event()
+
+    def loop() -> None:
+        while not done.wait(interval):
+            result_queue.put(("stats", key, timer_snapshot(timer, query)))
+
+    thread = threading.Thread(target=loop, name="stats", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+        result_queue.put(("stats", key, timer_snapshot(timer, query, active=False)))
+
+
+def _worker_main(
+    number: int,
+    work_queue,
+    result_queue,
+    log_queue,
+    stop_event,
+    pause_event,
+    captcha_resume_event,
+    scraper_kwargs: dict,
+    worker_options: dict,
+    log_level: int,
+) -> None:
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(log_level)
+    try:
+        _worker_loop(
+            number,
+            work_queue,
+            result_queue,
+            stop_event,
+            pause_event,
+            captcha_resume_event,
+            scraper_kwargs,
+            worker_options,
+        )
+    except Exception:
+        LOGGER.exception("Процесс %s завершился с ошибкой", number)
+    finally:
+        result_queue.put(("exit", number))
+
+
+def _worker_loop(
+    number: int,
+    work_queue,
+    result_queue,
+    stop_event,
+    pause_event,
+    captcha_resume_event,
+    scraper_kwargs: dict,
+    worker_options: dict,
+) -> None:
+    from playwright.sync_api import sync_playwright
+
+    from app.browser_pool import BrowserPool
+    from app.pacser_maps import YandexMapsScraper, new_browser_context
+    from app.request_blocking import RequestBlocker
+    from app.timing import StageTimer
+
+    kwargs = dict(scraper_kwargs)
+    # Один блокировщик на процесс: маршруты ставит фабрика контекстов пула.
+    kwargs["request_blocker"] = RequestBlocker(kwargs.get("block_preset", "off"))
+    if worker_options.get("phone_registry"):
+        from app.phones import load_registry, set_default_index
+
+        set_default_index(load_registry(Path(path) for path in worker_options["phone_registry"]))
+    if worker_options.get("captcha_budget"):
+        from app.captcha_governor import CaptchaGovernor
+
+        kwargs["captcha_governor"] = CaptchaGovernor(budget=worker_options["captcha_budget"])
+    card_cache = None
+    if worker_options.get("card_cache_path"):
+        from app.card_cache import CardCache
+
+        # SQLite в режиме WAL: несколько процессов читают и пишут один файл кэша.
+        card_cache = CardCache(
+            Path(worker_options["card_cache_path"]),
+            ttl_seconds=worker_options.get("cache_ttl", 24 * 3600),
+            refresh=worker_options.get("refresh_cache", False),
+        )
+        kwargs["card_cache"] = card_cache
+    dedup_index = None
+    if worker_options.get("dedup_path"):
+        from app.dedup import DedupIndex
+
+        dedup_index = DedupIndex(Path(worker_options["dedup_path"]))
+        kwargs["seen_ids"] = dedup_index
+
+    def captcha_hook(stage: str, _page: object) -> None:
+        if stage == "detected":
+            # Старое «продолжить», пришедшее после прошлой капчи, не должно снять новую.
+            captcha_resume_event.clear()
+        result_queue.put(("captcha", number, stage))
+
+    def make_scraper(item: WorkItem, pool, journal=None, stage_timer=None) -> YandexMapsScraper:
+        options = dict(kwargs)
+        if item.known_ids is not None:
+            # Шард — это прямые переходы на страницы карточек, без прокрутки списка.
+            options["card_workers"] = max(1, int(options.get("card_workers") or 0))
+        return YandexMapsScraper(
+            query=item.query,
+            limit=item.limit,
+            stop_event=stop_event,
+            pause_event=pause_event,
+            captcha_resume_event=captcha_resume_event,
+            captcha_hook=captcha_hook,
+            browser_pool=pool,
+            journal=journal,
+            known_ids=item.known_ids,
+            stage_timer=stage_timer,
+            **options,
+        )
+
+    with sync_playwright() as p:
+        pool = BrowserPool(
+            p,
+            context_factory=lambda browser: new_browser_context(browser, kwargs["request_blocker"]),
+            launch_args=YandexMapsScraper.launch_args(kwargs.get("block_preset", "off")),
+            max_leases=1,
+        )
+        try:
+            while not stop_event.is_set():
+                try:
+                    item = work_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    break
+                if item.kind == "collect":
+                    ids: list[str] = []
+                    try:
+                        ids = make_scraper(item, pool).collect_ids()
+                    except Exception:
+                        LOGGER.exception("Не удалось собрать id: %s", item.query)
+                    result_queue.put(("ids", item.key, ids))
+                    continue
+                journal = None
+                if item.known_ids is None and item.output_path is not None:
+                    journal = RunJournal(journal_path_for(item.output_path))
+                    journal.write_header(item.query, item.output_path, item.limit)
+                error = ""
+                timer = StageTimer()
+                stats = (
+                    _report_stats(result_queue, (number, item.key, item.shard), timer, item.query)
+                    if worker_options.get("report_stats")
+                    else nullcontext()
+                )
+                try:
+                    with stats:
+                        for org in make_scraper(item, pool, journal, timer).run():
+                            result_queue.put(("org", item.key, organization_to_dict(org)))
+                except Exception as exc:
+                    LOGGER.exception("Запрос завершился с ошибкой: %s", item.query)
+                    error = str(exc) or exc.__class__.__name__
+                finally:
+                    if journal is not None:
+                        journal.close()
+                result_queue.put(("done", item.key, error))
+        finally:
+            pool.close()
+            if card_cache is not None:
+                card_cache.close()
+            if dedup_index is not None:
+                dedup_index.close()
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable
+
+
+LOGGER = logging.getLogger(__name__)
+
+ANALYTICS_PATTERNS = (
+    r"mc\.yandex\.(ru|com)",
+    r"an\.yandex\.ru",
+    r"yandex\.ru/clck/",
+    r"yandex\.ru/ads/",
+    r"awaps\.yandex\.net",
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+)
+MAP_TILE_PATTERNS = (
+    r"core-renderer-tiles\.maps\.yandex\.net",
+    r"core-sat\.maps\.yandex\.net",
+    r"core-jams-rdr-cache\.maps\.yandex\.net",
+    r"core-stv-renderer\.maps\.yandex\.net",
+    r"tiles\.api-maps\.yandex\.ru",
+    r"/tiles\?",
+)
+
+# Размер заблокированного ответа неизвестен — оцениваем по типичным значениям.
+ESTIMATED_BYTES = {
+    "image": 25_000,
+    "media": 400_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 60_000,
+    "xhr": 15_000,
+    "fetch": 15_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# Картинки отключаем через route, а не флагом Chrome: капчу с картинкой
+# человек должен видеть.
+LIGHT_LAUNCH_ARGS = (
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-remote-fonts",
+)
+
+
+@dataclass(frozen=True)
+class BlockPreset:
+    name: str
+    resource_types: frozenset = frozenset()
+    url_patterns: tuple = ()
+    launch_args: tuple = ()
+
+
+BLOCK_PRESETS = {
+    "off": BlockPreset("off"),
+    # Список выдачи: нужен JS и разметка, карта и медиа не нужны.
+    "list-only": BlockPreset(
+        "list-only",
+        resource_types=frozenset({"image", "media", "font"}),
+        url_patterns=ANALYTICS_PATTERNS + MAP_TILE_PATTERNS,
+        launch_args=LIGHT_LAUNCH_ARGS,
+    ),
+    # Вкладки с прямыми ссылками на карточки: читаем только DOM, стили не нужны.
+    "card-only": BlockPreset(
+        "card-only",
+        resource_types=frozenset({"image", "media", "font", "stylesheet"}),
+        url_patterns=ANALYTICS_PATTERNS + MAP_TILE_PATTERNS,
+        launch_args=LIGHT_LAUNCH_ARGS,
+    ),
+}
+
+
+def get_preset(name: str) -> BlockPreset:
+    try:
+        return BLOCK_PRESETS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный пресет блокировки: {name}") from None
+
+
+class RequestBlocker:
+    def __init__(self, preset: str | BlockPreset = "off", extra_patterns: Iterable[str] = ()) -> None:
+        self.preset = get_preset(preset) if isinstance(preset, str) else preset
+        patterns = [*self.preset.url_patterns, *extra_patterns]
+        self._url_re = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self.blocked = 0
+        self.allowed = 0
+        self.estimated_bytes_saved = 0
+        self.blocked_by_type: Counter = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.preset.resource_types or self._url_re)
+
+    def should_block(self, url: str, resource_type: str, frame_url: str = "") -> bool:
+        if "captcha" in url or "captcha" in frame_url:
+            return False
+        if resource_type in self.preset.resource_types:
+            return True
+        return self._url_re is not None and self._url_re.search(url) is not None
+
+    def install(self, target) -> None:
+        # target — BrowserContext или Page: у обоих одинаковый route().
+        if self.enabled:
+            target.route("**/*", self._handle)
+
+    def _handle(self, route) -> None:
+        request = route.request
+        resource_type = request.resource_type
+        try:
+            frame_url = request.frame.url
+        except Exception:
+            frame_url = ""
+        if not self.should_block(request.url, resource_type, frame_url):
+            with self._lock:
+                self.allowed += 1
+            route.continue_()
+            return
+        with self._lock:
+            self.blocked += 1
+            self.blocked_by_type[resource_type] += 1
+            self.estimated_bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        try:
+            route.abort("blockedbyclient")
+        except Exception:
+            LOGGER.debug("Failed to abort request %s", request.url, exc_info=True)
+
+    def summary(self) -> str:
+        by_type = ", ".join(f"{kind}={count}" for kind, count in self.blocked_by_type.most_common())
+        return (
+            f"пресет={self.preset.name}, заблокировано={self.blocked}, пропущено={self.allowed}, "
+            f"сэкономлено≈{self.estimated_bytes_saved / 1_048_576:.1f} МБ"
+            + (f" ({by_type})" if by_type else "")
+        )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.links import classify_links
+from app.pacser_maps import Organization, YandexMapsScraper, merge_organizations
+from app.phones import card_phones
+from app.utils import extract_count, normalize_rating, sanitize_text
+
+
+LOGGER = logging.getLogger(__name__)
+
+SEARCH_URL_PATTERN = re.compile(r"/maps/api/search\b|/web-maps/api/search\b")
+ORG_ID_PATTERN = re.compile(r"(?:oid=|/org/(?:[^/]+/)?)(\d+)")
+
+# Галочка и награда в поисковой выдаче не приходят — их даёт только карточка.
+CARD_ONLY_FIELDS = ("verified", "award")
+# Поля, без которых запись из ответа API не заменяет разбор карточки в DOM.
+# По умолчанию карточка нужна всегда: фильтры «потенциальных» смотрят галочку и награду.
+DEFAULT_REQUIRED_FIELDS = ("name", "phone", "website", *CARD_ONLY_FIELDS)
+
+
+def required_fields_for(potential_filters) -> tuple[str, ...]:
+    # Поля только из карточки нужны, лишь когда по ним фильтруют «потенциальных».
+    required = ["name", "phone", "website"]
+    if potential_filters.exclude_blue_checkmark or potential_filters.exclude_green_checkmark:
+        required.append("verified")
+    if potential_filters.exclude_good_place:
+        required.append("award")
+    return tuple(required)
+
+
+def is_search_response(url: str) -> bool:
+    return bool(url) and SEARCH_URL_PATTERN.search(url) is not None
+
+
+def _iter_items(data) -> Iterable[dict]:
+    # Формат ответа: {"data": {"items": [...]}}; организации — элементы с type == "business"
+    # (см. tests/fixtures/search_api, свежие ответы пишет --record-search).
+    if not isinstance(data, dict):
+        return
+    payload = data.get("data")
+    items = payload.get("items") if isinstance(payload, dict) else None
+    for item in items or []:
+        if isinstance(item, dict) and item.get("type", "business") == "business":
+            yield item
+
+
+def _item_id(item: dict) -> str:
+    raw_id = str(item.get("id") or "")
+    if raw_id.isdigit():
+        return raw_id
+    match = ORG_ID_PATTERN.search(str(item.get("uri") or raw_id))
+    return match.group(1) if match else ""
+
+
+def _item_hrefs(item: dict) -> list[str]:
+    hrefs: list[str] = []
+    for link in item.get("socialLinks") or item.get("links") or []:
+        if isinstance(link, dict):
+            href = link.get("href") or link.get("url") or ""
+        else:
+            href = str(link)
+        if href:
+            hrefs.append(sanitize_text(href))
+    return hrefs
+
+
+def _item_phone_texts(item: dict) -> list[str]:
+    texts = []
+    for phone in item.get("phones") or item.get("Phones") or []:
+        number = phone.get("number") or phone.get("formatted") if isinstance(phone, dict) else phone
+        if number:
+            texts.append(sanitize_text(str(number)))
+    return texts
+
+
+def _item_website(item: dict) -> str:
+    urls = item.get("urls") or []
+    if isinstance(item.get("url"), str):
+        urls = [item["url"], *urls]
+    for url in urls:
+        href = url.get("value") or url.get("url") if isinstance(url, dict) else url
+        website = YandexMapsScraper._normalize_website(str(href or ""))
+        if website:
+            return website
+    return ""
+
+
+def parse_search_payload(data) -> dict[str, Organization]:
+    result: dict[str, Organization] = {}
+    for item in _iter_items(data):
+        org_id = _item_id(item)
+        if not org_id:
+            continue
+        rating_data = item.get("ratingData") or {}
+        links = classify_links(_item_hrefs(item))
+        phones = card_phones(_item_phone_texts(item))
+        rating_value = rating_data.get("ratingValue")
+        rating_count = rating_data.get("ratingCount") or rating_data.get("reviewCount")
+        result[org_id] = Organization(
+            name=sanitize_text(str(item.get("title") or "")),
+            phone=phones.phone,
+            vk=links.vk,
+            telegram=links.telegram,
+            whatsapp=links.whatsapp,
+            website=_item_website(item),
+            card_url=YandexMapsScraper._normalize_card_url("", org_id),
+            rating=normalize_rating(str(rating_value)) if rating_value is not None else "",
+            rating_count=extract_count(str(rating_count)) if rating_count is not None else "",
+            viber=links.viber,
+            ok=links.ok,
+            youtube=links.youtube,
+            instagram=links.instagram,
+            phones=phones.phones,
+            mobile_phone=phones.mobile_phone,
+        )
+    return result
+
+
+class SearchResponseCollector:
+    def __init__(
+        self,
+        required_fields: Iterable[str] = DEFAULT_REQUIRED_FIELDS,
+        record_dir: Optional[Path] = None,
+    ) -> None:
+        self.required_fields = tuple(required_fields)
+        # Записи из API никогда не содержат полей карточки — с ними нужен DOM.
+        self.needs_card = any(name in CARD_ONLY_FIELDS for name in self.required_fields)
+        # record_dir — куда сохранять сырые ответы поиска (фикстуры для тестов и стенда).
+        self.record_dir = Path(record_dir) if record_dir else None
+        self.records: dict[str, Organization] = {}
+        self.responses = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def attach(self, page) -> None:
+        page.on("response", self._on_response)
+
+    def _on_response(self, response) -> None:
+        if not is_search_response(response.url):
+            return
+        try:
+            body = response.text()
+            data = json.loads(body)
+        except Exception:
+            self.failures += 1
+            LOGGER.debug("Failed to read search response %s", response.url, exc_info=True)
+            return
+        if self.record_dir is not None:
+            self._record(body)
+        self.feed(data)
+
+    def _record(self, body: str) -> None:
+        try:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+            path = self.record_dir / f"search_{os.getpid()}_{self.responses + 1:03d}.json"
+            path.write_text(body, encoding="utf-8")
+        except OSError:
+            LOGGER.debug("Failed to record search response", exc_info=True)
+
+    def feed(self, data) -> int:
+        parsed = parse_search_payload(data)
+        with self._lock:
+            self.responses += 1
+            for org_id, org in parsed.items():
+                known = self.records.get(org_id)
+                self.records[org_id] = merge_organizations(org, known) if known else org
+        return len(parsed)
+
+    def get(self, org_id: str) -> Optional[Organization]:
+        with self._lock:
+            return self.records.get(org_id)
+
+    def is_complete(self, org: Organization) -> bool:
+        if self.needs_card:
+            return False
+        return all(getattr(org, name) for name in self.required_fields)
+
+    def summary(self) -> str:
+        return f"ответов={self.responses}, записей={len(self.records)}, ошибок={self.failures}"
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, Protocol
+
+from app.organization import Organization, organization_columns
+
+
+LOGGER = logging.getLogger(__name__)
+
+POTENTIAL_COLUMN = "potential"
+SINK_EXTENSIONS = (".xlsx", ".csv", ".jsonl", ".json")
+
+
+# Протокол, а не базовый класс: приёмники (и ExcelWriter) подходят по форме
+# и его не наследуют.
+class OutputSink(Protocol):
+    def append(self, org: Organization, include_in_potential: bool = False) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class CsvSink:
+    # utf-8-sig — чтобы Excel открыл кириллицу без мастера импорта.
+    def __init__(self, path: Path, flush_every: int = 100) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.columns = organization_columns()
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self._file = open(self.path, "w", encoding="utf-8-sig", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([*self.columns, POTENTIAL_COLUMN])
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        self._writer.writerow(
+            [*(getattr(org, column) for column in self.columns), int(bool(include_in_potential))]
+        )
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            LOGGER.info("Сохранил файл: %s", self.path)
+
+
+class JsonlSink:
+    def __init__(self, path: Path, flush_every: int = 100) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.columns = organization_columns()
+        self.flush_every = max(1, flush_every)
+        self._pending = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        record = {column: getattr(org, column) for column in self.columns}
+        record[POTENTIAL_COLUMN] = bool(include_in_potential)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+            LOGGER.info("Сохранил файл: %s", self.path)
+
+
+class ColumnarJsonSink:
+    # {"columns": {"name": [...], "phone": [...], ...}} без Parquet. Каждая колонка
+    # пишется во временный файл по мере поступления и склеивается в close().
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.columns = [*organization_columns(), POTENTIAL_COLUMN]
+        self.rows = 0
+        self._tmp_dir = Path(tempfile.mkdtemp(prefix="columns_", dir=self.path.parent))
+        self._parts = {
+            column: open(self._tmp_dir / f"{index}.part", "w", encoding="utf-8")
+            for index, column in enumerate(self.columns)
+        }
+        self._closed = False
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        separator = "," if self.rows else ""
+        for column, part in self._parts.items():
+            value = bool(include_in_potential) if column == POTENTIAL_COLUMN else getattr(org, column)
+            part.write(separator + json.dumps(value, ensure_ascii=False))
+        self.rows += 1
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        for part in self._parts.values():
+            part.close()
+        try:
+            with open(self.path, "w", encoding="utf-8") as out:
+                out.write(f'{{"rows": {self.rows}, "columns": {{')
+                for index, column in enumerate(self.columns):
+                    out.write(("," if index else "") + json.dumps(column) + ": [")
+                    with open(self._parts[column].name, encoding="utf-8") as part:
+                        shutil.copyfileobj(part, out)
+                    out.write("]")
+                out.write("}}\n")
+        finally:
+            shutil.rmtree(self._tmp_dir, ignore_errors=True)
+        LOGGER.info("Сохранил файл: %s", self.path)
+
+
+class MultiSink:
+    def __init__(self, sinks: Iterable[OutputSink]) -> None:
+        self.sinks = list(sinks)
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        for sink in self.sinks:
+            sink.append(org, include_in_potential=include_in_potential)
+
+    def close(self) -> None:
+        # Закрываем все, даже если один из приёмников упал: данные остальных ценнее.
+        errors = []
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as exc:
+                LOGGER.exception("Не удалось закрыть вывод %s", getattr(sink, "path", sink))
+                errors.append(exc)
+        if errors:
+            raise errors[0]
+
+
+def open_sink(path: Path, excel_stream: bool = False) -> OutputSink:
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return CsvSink(path)
+    if suffix == ".jsonl":
+        return JsonlSink(path)
+    if suffix == ".json":
+        return ColumnarJsonSink(path)
+    if suffix == ".xlsx":
+        if excel_stream:
+            from app.excel_stream import StreamingExcelWriter
+
+            return StreamingExcelWriter(path)
+        from app.excel_writer import ExcelWriter
+
+        return ExcelWriter(path)
+    raise ValueError(f"Неизвестный формат вывода: {path} (поддерживаются {', '.join(SINK_EXTENSIONS)})")
+
+
+def open_sinks(paths: Iterable[Path], excel_stream: bool = False) -> OutputSink:
+    sinks: list[OutputSink] = []
+    try:
+        for path in dict.fromkeys(Path(path) for path in paths):
+            sinks.append(open_sink(path, excel_stream=excel_stream))
+    except Exception:
+        for sink in sinks:
+            sink.close()
+        raise
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
+
+
+def resolve_output_paths(outs: Iterable[str], default_path: Path, per_query: bool = False) -> list[Path]:
+    # «.jsonl» — рядом с результатом по умолчанию; полный путь — как есть.
+    # В пакетном режиме у каждого запроса свой файл: имя и папка из --out
+    # отбрасываются, от него остаётся только расширение.
+    default_path = Path(default_path)
+    paths: list[Path] = []
+    for out in outs:
+        out = out.strip()
+        if not out:
+            continue
+        candidate = Path(out)
+        if out.startswith(".") and candidate.suffix == "" and candidate.name.count(".") == 1:
+            paths.append(default_path.with_suffix(candidate.name))
+        elif per_query:
+            paths.append(default_path.with_suffix(candidate.suffix or default_path.suffix))
+        else:
+            paths.append(candidate)
+    return paths or [default_path]
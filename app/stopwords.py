@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import copy
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Скобки в списке — пометки для человека («палата (общественная)»,
+# «управляющая компания (если не звонишь ЖКХ-сегменту)»): в названиях их нет,
+# поэтому сравнивается фраза без пометки.
+NOTE_RE = re.compile(r"\([^)]*\)")
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def strip_notes(phrase: str) -> str:
+    return " ".join(NOTE_RE.sub(" ", phrase).split())
+
+
+def normalize_phrase(text: str) -> str:
+    # Регистр, «ё» и пунктуация не различаются: «Мин.» = «мин», «контрольно-счётная» = «контрольно счетная».
+    return " ".join(NON_WORD_RE.sub(" ", text.lower().replace("ё", "е")).split())
+
+
+def split_phrases(raw: str) -> list[str]:
+    phrases = (normalize_phrase(strip_notes(part)) for part in re.split(r"[,\n;]", raw or ""))
+    # Длинные фразы первыми: «общественная организация» раньше «общественная».
+    return sorted({phrase for phrase in phrases if phrase}, key=lambda phrase: (-len(phrase), phrase))
+
+
+def _compile(phrases: Iterable[str]) -> Optional[re.Pattern]:
+    # Подстрока, как в app.filters, а не целое слово: «фонд» находится и в «Фондовой».
+    alternation = "|".join(re.escape(phrase) for phrase in phrases)
+    return re.compile(alternation) if alternation else None
+
+
+def _org_text(org) -> str:
+    # Все строковые поля: матчер не решает, какие из них смотрит app.filters.
+    names = getattr(org, "__dataclass_fields__", None) or vars(org)
+    return " ".join(
+        value for value in (getattr(org, name, "") for name in names) if isinstance(value, str) and value
+    )
+
+
+def _filters_state(filters) -> tuple:
+    names = getattr(filters, "__dataclass_fields__", None) or vars(filters)
+    return tuple(getattr(filters, name, None) for name in names)
+
+
+def _with_stop_words(settings, stop_words: str):
+    filters = copy.copy(settings.potential_filters)
+    filters.stop_words = stop_words
+    changed = copy.copy(settings)
+    changed.potential_filters = filters
+    return changed
+
+
+class StopWordMatcher:
+    # Быстрая предпроверка перед passes_potential_filters: если ни одна фраза не
+    # встречается ни в одном поле, список стоп-слов app.filters можно не проходить.
+    # Совпадение — только кандидат: окончательно решает app.filters (белый список,
+    # набор полей), но уже по фразам без пометок в скобках.
+    def __init__(self, stop_words: str = "") -> None:
+        self.stop_phrases = split_phrases(stop_words)
+        self._stop_re = _compile(self.stop_phrases)
+        self.filter_stop_words = ",".join(
+            strip_notes(part) if "(" in part else part for part in (stop_words or "").split(",")
+        )
+        self._settings_copies: Optional[tuple] = None
+
+    def find_stop_word(self, text: str) -> str:
+        if self._stop_re is None or not text:
+            return ""
+        match = self._stop_re.search(normalize_phrase(text))
+        return match.group(0) if match else ""
+
+    def is_candidate(self, org) -> bool:
+        return bool(self.find_stop_word(_org_text(org)))
+
+    def filter_settings(self, settings, candidate: bool):
+        # Копии настроек собираются один раз на матчер, а не на каждую организацию;
+        # пересборка — только если сменились сами настройки или их поля фильтров.
+        filters = settings.potential_filters
+        state = _filters_state(filters)
+        cached = self._settings_copies
+        if cached is None or cached[0] is not settings or cached[1] is not filters or cached[2] != state:
+            cached = (
+                settings,
+                filters,
+                state,
+                _with_stop_words(settings, ""),
+                _with_stop_words(settings, self.filter_stop_words),
+            )
+            self._settings_copies = cached
+        return cached[4] if candidate else cached[3]
+
+
+@lru_cache(maxsize=8)
+def compile_matcher(stop_words: str) -> StopWordMatcher:
+    return StopWordMatcher(stop_words)
+
+
+def matcher_for(settings) -> StopWordMatcher:
+    # Кэш по самой строке настроек: после автосохранения с новым списком
+    # ключ меняется и матчер пересобирается, старые версии вытесняет LRU.
+    filters = getattr(settings, "potential_filters", settings)
+    return compile_matcher(getattr(filters, "stop_words", "") or "")
+
+
+def passes_filters(org, settings) -> bool:
+    from app.filters import passes_potential_filters
+
+    matcher = matcher_for(settings)
+    if not matcher.stop_phrases:
+        return passes_potential_filters(org, settings)
+    return passes_potential_filters(org, matcher.filter_settings(settings, matcher.is_candidate(org)))
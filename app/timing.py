@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+class LatencyHistogram:
+    # Хранит до max_samples замеров (reservoir sampling), этого хватает для перцентилей.
+    def __init__(self, max_samples: int = 10_000) -> None:
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+        self._samples: list[float] = []
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            if self.count == 1 or seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+            if len(self._samples) < self.max_samples:
+                self._samples.append(seconds)
+            else:
+                index = random.randrange(self.count)
+                if index < self.max_samples:
+                    self._samples[index] = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        rank = min(len(samples) - 1, max(0, round(percent / 100 * (len(samples) - 1))))
+        return samples[rank]
+
+    def summary(self) -> str:
+        if not self.count:
+            return "n=0"
+        return (
+            f"n={self.count}, p50={self.percentile(50) * 1000:.0f}ms, "
+            f"p95={self.percentile(95) * 1000:.0f}ms, max={self.max * 1000:.0f}ms"
+        )
+
+
+STAGES = (
+    "navigate",
+    "popup_close",
+    "results_wait",
+    "captcha_wait",
+    "collect_ids",
+    "scroll",
+    "click",
+    "card_wait",
+    "parse",
+)
+
+
+class Span:
+    __slots__ = ("stage", "seconds")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.seconds = 0.0
+
+
+class StageTimer:
+    # Именованные этапы → гистограммы; в конце запуска — profile.json.
+    def __init__(self, max_samples: int = 10_000) -> None:
+        self.max_samples = max_samples
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self.cards = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        # Живое состояние для метрик: текущий этап и прогресс по id выдачи.
+        self.current_stage = ""
+        self.ids_total = 0
+        self.ids_parsed = 0
+        self.last_progress_at = self.started_at
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[Span]:
+        span = Span(stage)
+        previous, self.current_stage = self.current_stage, stage
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - started
+            self.current_stage = previous
+            self.record(stage, span.seconds)
+
+    def record(self, stage: str, seconds: float) -> None:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.max_samples))
+        histogram.record(seconds)
+
+    def count_card(self, count: int = 1) -> None:
+        with self._lock:
+            self.cards += count
+            self.last_progress_at = time.monotonic()
+
+    def set_progress(self, parsed: int, total: int) -> None:
+        with self._lock:
+            if parsed != self.ids_parsed:
+                self.last_progress_at = time.monotonic()
+            self.ids_parsed = parsed
+            self.ids_total = max(total, parsed)
+
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def cards_per_minute(self) -> float:
+        elapsed = self.elapsed
+        return self.cards * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def profile(self) -> dict:
+        ordered = [stage for stage in STAGES if stage in self.histograms]
+        ordered += sorted(stage for stage in self.histograms if stage not in STAGES)
+        stages = {}
+        for stage in ordered:
+            histogram = self.histograms[stage]
+            stages[stage] = {
+                "count": histogram.count,
+                "total_s": round(histogram.total, 3),
+                "mean_ms": round(histogram.mean * 1000, 1),
+                "p50_ms": round(histogram.percentile(50) * 1000, 1),
+                "p95_ms": round(histogram.percentile(95) * 1000, 1),
+                "p99_ms": round(histogram.percentile(99) * 1000, 1),
+                "max_ms": round(histogram.max * 1000, 1),
+            }
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "cards": self.cards,
+            "cards_per_minute": round(self.cards_per_minute(), 2),
+            "stages": stages,
+        }
+
+    def write_profile(self, path: Path, **extra) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {**extra, **self.profile()}
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def summary(self) -> str:
+        parts = [f"карточек={self.cards}", f"{self.cards_per_minute():.1f} карточек/мин"]
+        for stage, data in self.profile()["stages"].items():
+            parts.append(f"{stage}: p50={data['p50_ms']:.0f}ms p95={data['p95_ms']:.0f}ms n={data['count']}")
+        return "; ".join(parts)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+from collections import defaultdict
+from typing import Optional
+
+from app.timing import LatencyHistogram
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Новые id в списке: ждём MutationObserver, а не фиксированную паузу.
+# window.__parserSeenIds переживает вызовы, поэтому «новый» значит
+# «ещё не отданный в Python», даже если виртуальный список удалил верхние элементы.
+LIST_GROWTH_SCRIPT = """
+({selector, timeoutMs}) => new Promise((resolve) => {
+  const seen = window.__parserSeenIds || (window.__parserSeenIds = new Set());
+  const collect = () => {
+    const ids = Array.from(document.querySelectorAll(selector))
+      .map((node) => node.dataset.id)
+      .filter(Boolean);
+    let grew = false;
+    for (const id of ids) {
+      if (!seen.has(id)) {
+        seen.add(id);
+        grew = true;
+      }
+    }
+    return { ids, grew };
+  };
+  const initial = collect();
+  if (initial.grew || timeoutMs <= 0) {
+    resolve(initial);
+    return;
+  }
+  let timer = null;
+  const observer = new MutationObserver(() => {
+    const current = collect();
+    if (current.grew) {
+      observer.disconnect();
+      clearTimeout(timer);
+      resolve(current);
+    }
+  });
+  observer.observe(document.body, { childList: true, subtree: true });
+  timer = setTimeout(() => {
+    observer.disconnect();
+    resolve(collect());
+  }, timeoutMs);
+})
+"""
+
+# Прокрутка и ожидание за один вызов: вдали от конца списка достаточно кадра
+# отрисовки, у конца — ждём подгрузку новых элементов до timeoutMs.
+SCROLL_AND_WAIT_SCRIPT = """
+({containerSelector, itemSelector, scrollStep, timeoutMs}) => new Promise((resolve) => {
+  const container = document.querySelector(containerSelector);
+  if (!container) {
+    resolve({ moved: false, scrollTop: 0, ids: [], grew: false });
+    return;
+  }
+  const prevTop = container.scrollTop;
+  const maxTop = container.scrollHeight - container.clientHeight;
+  const nextTop = Math.min(prevTop + scrollStep, maxTop);
+  container.scrollTop = nextTop;
+  container.dispatchEvent(new Event("scroll", { bubbles: true }));
+  const base = { moved: nextTop > prevTop, scrollTop: nextTop, maxTop };
+  const seen = window.__parserSeenIds || (window.__parserSeenIds = new Set());
+  const collect = () => {
+    const ids = Array.from(document.querySelectorAll(itemSelector))
+      .map((node) => node.dataset.id)
+      .filter(Boolean);
+    let grew = false;
+    for (const id of ids) {
+      if (!seen.has(id)) {
+        seen.add(id);
+        grew = true;
+      }
+    }
+    return { ...base, ids, grew };
+  };
+  const nearEnd = maxTop - nextTop <= container.clientHeight;
+  if (!nearEnd) {
+    requestAnimationFrame(() => resolve(collect()));
+    return;
+  }
+  let timer = null;
+  const observer = new MutationObserver(() => {
+    const current = collect();
+    if (current.grew) {
+      observer.disconnect();
+      clearTimeout(timer);
+      resolve(current);
+    }
+  });
+  observer.observe(container, { childList: true, subtree: true });
+  timer = setTimeout(() => {
+    observer.disconnect();
+    resolve(collect());
+  }, timeoutMs);
+})
+"""
+
+# Карточка: точный data-id сразу, общий селектор — только после fallbackAfterMs,
+# как в прежнем двухступенчатом ожидании.
+CARD_SHOWN_SCRIPT = """
+({exactSelector, fallbackSelector, fallbackAfterMs, timeoutMs}) => new Promise((resolve) => {
+  const started = performance.now();
+  const check = () => {
+    if (document.querySelector(exactSelector)) {
+      return "exact";
+    }
+    if (performance.now() - started >= fallbackAfterMs && document.querySelector(fallbackSelector)) {
+      return "fallback";
+    }
+    return null;
+  };
+  const immediate = check();
+  if (immediate) {
+    resolve(immediate);
+    return;
+  }
+  let timer = null;
+  let fallbackTimer = null;
+  const finish = (result) => {
+    observer.disconnect();
+    clearTimeout(timer);
+    clearTimeout(fallbackTimer);
+    resolve(result);
+  };
+  const observer = new MutationObserver(() => {
+    const result = check();
+    if (result) {
+      finish(result);
+    }
+  });
+  observer.observe(document.body, { childList: true, subtree: true, attributes: true, attributeFilter: ["class", "data-id"] });
+  fallbackTimer = setTimeout(() => {
+    const result = check();
+    if (result) {
+      finish(result);
+    }
+  }, fallbackAfterMs);
+  timer = setTimeout(() => finish(check()), timeoutMs);
+})
+"""
+
+
+class AdaptiveWaiter:
+    def __init__(
+        self,
+        # Как прежний human_delay(0.2, 0.4) между карточками: ожидания стали короче,
+        # а пауза «вежливости» — нет.
+        politeness: tuple[float, float] = (0.2, 0.4),
+        scroll_timeout: float = 1.5,
+    ) -> None:
+        self.politeness_range = politeness
+        self.scroll_timeout = scroll_timeout
+        self.histograms: dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+
+    def _timed_evaluate(self, name: str, page, script: str, arg: dict):
+        started = time.monotonic()
+        try:
+            return page.evaluate(script, arg)
+        finally:
+            self.histograms[name].record(time.monotonic() - started)
+
+    def scroll_and_wait(self, page, container_selector: str, item_selector: str, step: int) -> dict:
+        return self._timed_evaluate(
+            "scroll",
+            page,
+            SCROLL_AND_WAIT_SCRIPT,
+            {
+                "containerSelector": container_selector,
+                "itemSelector": item_selector,
+                "scrollStep": step,
+                "timeoutMs": int(self.scroll_timeout * 1000),
+            },
+        ) or {}
+
+    def wait_for_list_growth(self, page, item_selector: str, timeout: float) -> dict:
+        try:
+            return self._timed_evaluate(
+                "list_growth",
+                page,
+                LIST_GROWTH_SCRIPT,
+                {"selector": item_selector, "timeoutMs": int(timeout * 1000)},
+            ) or {}
+        except Exception:
+            LOGGER.debug("List growth wait failed", exc_info=True)
+            return {}
+
+    def wait_for_card(
+        self,
+        page,
+        exact_selector: str,
+        fallback_selector: str,
+        fallback_after: float = 2.0,
+        timeout: float = 4.0,
+    ) -> Optional[str]:
+        try:
+            return self._timed_evaluate(
+                "card",
+                page,
+                CARD_SHOWN_SCRIPT,
+                {
+                    "exactSelector": exact_selector,
+                    "fallbackSelector": fallback_selector,
+                    "fallbackAfterMs": int(fallback_after * 1000),
+                    "timeoutMs": int(timeout * 1000),
+                },
+            )
+        except Exception:
+            LOGGER.debug("Card wait failed", exc_info=True)
+            return None
+
+    def politeness(self, scale: float = 1.0) -> None:
+        # scale — множитель регулятора темпа (app.captcha_governor).
+        low, high = self.politeness_range
+        if high <= 0:
+            return
+        delay = random.uniform(low, high) * scale
+        time.sleep(delay)
+        self.histograms["politeness"].record(delay)
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{name}: {histogram.summary()}" for name, histogram in sorted(self.histograms.items())
+        )
@@ -0,0 +1,185 @@
+"""Captcha governor vs fixed pacing under a simulated antibot.
+
+"sim" replays the stand-in's CaptchaRules on a virtual clock: each card costs
+--card-time seconds plus the pacing pause, a captcha costs --solve-time
+seconds of a human and a fresh session. It compares fixed pause multipliers
+with CaptchaGovernor at --budget captchas/hour and prints cards/hour and
+captchas/hour for each. "--live" runs YandexMapsScraper through a
+BrowserPool against benchmarks.maps_standin with captcha injection enabled.
+
+Run from the repo root:
+    python -m benchmarks.bench_captcha [--hours 8] [--rate 40] [--session-limit 400] [--budget 2]
+    python -m benchmarks.bench_captcha --live [--cards 300] [--queries 3]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.captcha_governor import CaptchaGovernor  # noqa: E402
+from benchmarks.maps_standin import CaptchaRules, MapsStandIn, StandInConfig  # noqa: E402
+
+FIXED_SCALES = (0.25, 1.0, 4.0, 8.0)
+
+
+class VirtualClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(args: argparse.Namespace, scale: float = 1.0, governed: bool = False) -> dict:
+    rng = random.Random(args.seed)
+    clock = VirtualClock()
+    rules = CaptchaRules(rate=args.rate, window=args.window, session_limit=args.session_limit)
+    governor = CaptchaGovernor(budget=args.budget, card_pause=tuple(args.pause), clock=clock) if governed else None
+    sessions = 1
+    session = "s1"
+    cards = captchas = rotations = 0
+    query_cards = 0
+    if governor is not None:
+        governor.start_session()
+
+    def new_session() -> str:
+        nonlocal sessions
+        sessions += 1
+        if governor is not None:
+            governor.start_session()
+        return f"s{sessions}"
+
+    deadline = args.hours * 3600.0
+    while clock.now < deadline:
+        if governor is not None:
+            pause = governor.next_delay()
+        else:
+            pause = rng.uniform(*args.pause) * scale
+        clock.now += pause + rng.uniform(0.5, 1.5) * args.card_time
+        if not rules.card(session, clock.now):
+            # Человек решает капчу, пул выбрасывает контекст — дальше новая сессия.
+            captchas += 1
+            clock.now += args.solve_time
+            if governor is not None:
+                governor.on_captcha(args.solve_time)
+            session = new_session()
+            query_cards = 0
+            continue
+        cards += 1
+        query_cards += 1
+        if governor is not None:
+            governor.on_card()
+        if query_cards >= args.query_size:
+            # Конец запроса пакета: здесь BrowserPool может сменить контекст.
+            query_cards = 0
+            if governor is not None and governor.should_rotate():
+                governor.rotated()
+                rotations += 1
+                clock.now += args.rotate_time
+                session = new_session()
+    hours = clock.now / 3600.0
+    return {
+        "cards_h": cards / hours,
+        "captchas_h": captchas / hours,
+        "scale": governor.scale if governor is not None else scale,
+        "rotations": rotations,
+    }
+
+
+def run_sim(args: argparse.Namespace) -> None:
+    print(
+        f"antibot: >{args.rate} cards/{args.window:.0f}s or >{args.session_limit} cards/session; "
+        f"card {args.card_time}s, solve {args.solve_time}s, budget {args.budget}/h, {args.hours}h"
+    )
+    print(f"{'pacing':<16} {'cards/h':>9} {'captchas/h':>11} {'scale':>7} {'rotations':>10}")
+    rows = [(f"fixed x{scale:g}", simulate(args, scale=scale)) for scale in FIXED_SCALES]
+    rows.append(("governor", simulate(args, governed=True)))
+    for label, row in rows:
+        print(
+            f"{label:<16} {row['cards_h']:>9.0f} {row['captchas_h']:>11.2f} "
+            f"{row['scale']:>7.2f} {row['rotations']:>10}"
+        )
+
+
+def run_live(args: argparse.Namespace) -> None:
+    from playwright.sync_api import sync_playwright
+
+    from app.browser_pool import BrowserPool
+    from app.pacser_maps import YandexMapsScraper, new_browser_context
+
+    config = StandInConfig(
+        cards=args.cards,
+        list_latency=(0.02, 0.05),
+        card_latency=(0.02, 0.08),
+        captcha_rate=args.rate,
+        captcha_window=args.window,
+        captcha_session_limit=args.session_limit,
+        captcha_solve_after=args.live_solve_after,
+    )
+    print(f"{'pacing':<10} {'cards':>6} {'time, s':>8} {'cards/h':>8} {'captchas':>9} {'sessions':>9}")
+    for governed in (False, True):
+        governor = CaptchaGovernor(budget=args.budget, card_pause=tuple(args.pause)) if governed else None
+        with MapsStandIn(config) as standin, sync_playwright() as p:
+            pool = BrowserPool(
+                p,
+                context_factory=new_browser_context,
+                launch_args=YandexMapsScraper.launch_args(),
+            )
+            started = time.perf_counter()
+            count = 0
+            try:
+                for number in range(args.queries):
+                    scraper = YandexMapsScraper(
+                        query=f"кафе {number}",
+                        limit=args.cards,
+                        base_url=standin.base_url,
+                        browser_pool=pool,
+                        captcha_governor=governor,
+                    )
+                    count += sum(1 for _ in scraper.run())
+            finally:
+                pool.close()
+            elapsed = time.perf_counter() - started
+            print(
+                f"{'governor' if governed else 'fixed':<10} {count:>6} {elapsed:>8.1f} "
+                f"{count * 3600 / elapsed:>8.0f} {standin.requests['captcha']:>9} {standin.sessions:>9}"
+            )
+            if governor is not None:
+                print(f"  {governor.summary()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="Drive the real scraper against the stand-in")
+    parser.add_argument("--rate", type=int, default=40, help="Antibot: captcha after N cards per window")
+    parser.add_argument("--window", type=float, default=60.0)
+    parser.add_argument("--session-limit", type=int, default=400, help="Antibot: captcha after N cards per session")
+    parser.add_argument("--budget", type=float, default=2.0, help="Captchas per hour for the governor")
+    parser.add_argument("--pause", type=float, nargs=2, default=[0.1, 0.3], metavar=("MIN", "MAX"))
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--card-time", type=float, default=0.8, help="Seconds to open and parse one card")
+    parser.add_argument("--solve-time", type=float, default=60.0, help="Seconds a human needs for a captcha")
+    parser.add_argument("--rotate-time", type=float, default=3.0, help="Seconds to open a fresh context")
+    parser.add_argument("--query-size", type=int, default=100, help="Cards per query (rotation happens between)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cards", type=int, default=300, help="--live: cards per query")
+    parser.add_argument("--queries", type=int, default=3, help="--live: queries per pacing mode")
+    parser.add_argument("--live-solve-after", type=float, default=2.0, help="--live: captcha page solves itself")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if args.live:
+        run_live(args)
+    else:
+        run_sim(args)
+
+
+if __name__ == "__main__":
+    main()
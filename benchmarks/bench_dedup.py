@@ -0,0 +1,60 @@
+"""Dedup index: insert rate and per-card lookup time as the index grows.
+
+Run from the repo root: python -m benchmarks.bench_dedup [--rows 100000 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.dedup import DedupIndex  # noqa: E402
+from app.organization import Organization  # noqa: E402
+
+
+def make_org(index: int) -> Organization:
+    return Organization(
+        name=f"Организация {index}",
+        phone=f"+7812{index % 5_000_000:07d}",
+        website=f"https://org{index}.ru",
+        card_url=f"https://yandex.ru/maps/org/{1000000 + index}/",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+    print(f"{'rows':>9} {'insert/s':>10} {'lookup, us':>11} {'miss, us':>9} {'file, MB':>9}")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            index = DedupIndex(Path(tmp) / "dedup.sqlite3")
+            started = time.perf_counter()
+            for row in range(rows):
+                index.add(make_org(row), query="бенчмарк")
+            insert_rate = rows / (time.perf_counter() - started)
+
+            hits = [str(1000000 + random.randrange(rows)) for _ in range(args.lookups)]
+            started = time.perf_counter()
+            assert all(org_id in index for org_id in hits)
+            hit_us = (time.perf_counter() - started) * 1e6 / args.lookups
+
+            misses = [str(9000000000 + row) for row in range(args.lookups)]
+            started = time.perf_counter()
+            assert not any(org_id in index for org_id in misses)
+            miss_us = (time.perf_counter() - started) * 1e6 / args.lookups
+
+            index.close()
+            size = sum(path.stat().st_size for path in Path(tmp).iterdir()) / 1_048_576
+            print(f"{rows:>9} {insert_rate:>10.0f} {hit_us:>11.1f} {miss_us:>9.1f} {size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
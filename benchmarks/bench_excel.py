@@ -0,0 +1,97 @@
+"""Excel output: ExcelWriter vs StreamingExcelWriter, time and peak Python memory.
+
+InMemoryWorkbook — the same rows in a regular (not write-only) openpyxl
+workbook, for reference; it also runs where app.excel_writer is missing.
+
+Run from the repo root: python -m benchmarks.bench_excel [--rows 10000 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from openpyxl import Workbook  # noqa: E402
+
+from app.excel_stream import StreamingExcelWriter  # noqa: E402
+from app.organization import Organization, organization_columns  # noqa: E402
+
+
+class InMemoryWorkbook:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.columns = organization_columns()
+        self.workbook = Workbook()
+        self.all_sheet = self.workbook.active
+        self.potential_sheet = self.workbook.create_sheet("potential")
+        self.all_sheet.append(self.columns)
+        self.potential_sheet.append(self.columns)
+
+    def append(self, org: Organization, include_in_potential: bool = False) -> None:
+        row = [getattr(org, column) for column in self.columns]
+        self.all_sheet.append(row)
+        if include_in_potential:
+            self.potential_sheet.append(row)
+
+    def close(self) -> None:
+        self.workbook.save(self.path)
+
+
+def make_org(index: int) -> Organization:
+    return Organization(
+        name=f"Организация {index}",
+        phone=f"+7812{index:07d}",
+        verified="синяя" if index % 7 == 0 else "",
+        award="Хорошее место" if index % 11 == 0 else "",
+        vk=f"https://vk.com/org{index}",
+        website=f"https://org{index}.ru",
+        card_url=f"https://yandex.ru/maps/org/{1000000 + index}/",
+        rating="4.8",
+        rating_count=str(index % 500),
+    )
+
+
+def measure(writer_cls, rows: int, folder: Path) -> tuple[float, float, int]:
+    path = folder / f"{writer_cls.__name__}_{rows}.xlsx"
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    writer = writer_cls(path)
+    for index in range(rows):
+        writer.append(make_org(index), include_in_potential=index % 3 == 0)
+    writer.close()
+    elapsed = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1_048_576, path.stat().st_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    writers = [InMemoryWorkbook, StreamingExcelWriter]
+    try:
+        from app.excel_writer import ExcelWriter
+    except ImportError:
+        print("app.excel_writer is not available: ExcelWriter is skipped")
+    else:
+        writers.insert(0, ExcelWriter)
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        print(f"{'writer':<22} {'rows':>8} {'time, s':>9} {'peak, MB':>9} {'file, KB':>9}")
+        for rows in args.rows:
+            for writer_cls in writers:
+                elapsed, peak_mb, size = measure(writer_cls, rows, folder)
+                print(f"{writer_cls.__name__:<22} {rows:>8} {elapsed:>9.2f} {peak_mb:>9.1f} {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Card link classification: substring chain vs app.links on a synthetic href mix.
+
+The legacy chain only detects vk/telegram/whatsapp and returns hrefs as is;
+app.links also parses, unwraps redirects and canonicalizes, so the comparison
+shows what the extra work costs per URL. "cold" clears the lru_cache first,
+"cards" runs classify_links over 25-href lists as they come from evaluate.
+
+Run from the repo root: python -m benchmarks.bench_links [--count 1000000] [--distinct 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.links import classify_links, classify_url  # noqa: E402
+
+TEMPLATES = [
+    "/maps/org/{n}/reviews/",
+    "/maps/?ll=37.6,55.7&z={n}",
+    "#tab-{n}",
+    "tel:+7999{n:07d}",
+    "https://yandex.ru/maps/org/cafe/{n}/",
+    "https://vk.com/club{n}?utm_source=yandex",
+    "https://m.vk.com/id{n}",
+    "https://vk.com/share.php?url=https://yandex.ru/maps/org/{n}/",
+    "https://t.me/shop{n}",
+    "https://api.whatsapp.com/send?phone=7999{n:07d}&text=hi",
+    "https://wa.me/7999{n:07d}",
+    "viber://chat?number=%2B7999{n:07d}",
+    "https://ok.ru/group/{n}",
+    "https://www.youtube.com/channel/UC{n}?si=share",
+    "https://www.instagram.com/brand{n}/?igshid=abc",
+    "https://site{n}.ru/?utm_source=yandex&utm_medium=maps",
+    "http://www.shop{n}.com/catalog",
+    "https://clck.yandex.ru/redir/dtype=stred/*https://org{n}.ru/",
+]
+
+
+def legacy_classify(hrefs) -> tuple[str, str, str]:
+    # Цепочка проверок подстрок, как в _parse_card до app.links.
+    vk = telegram = whatsapp = ""
+    for href in hrefs:
+        lower_href = href.lower()
+        if not vk and "vk.com" in lower_href:
+            vk = href
+        if not telegram and ("t.me" in lower_href or "telegram.me" in lower_href):
+            telegram = href
+        if not whatsapp and (
+            "wa.me" in lower_href or "api.whatsapp.com" in lower_href or "whatsapp.com" in lower_href
+        ):
+            whatsapp = href
+    return vk, telegram, whatsapp
+
+
+def timed(label: str, count: int, func) -> float:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed:>7.3f}s {count / elapsed:>12,.0f} urls/s {elapsed / count * 1e6:>7.2f} us/url")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=200_000, help="Distinct numbers substituted into templates")
+    parser.add_argument("--card-size", type=int, default=25)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    urls = [rng.choice(TEMPLATES).format(n=rng.randrange(args.distinct)) for _ in range(args.count)]
+    cards = [urls[index:index + args.card_size] for index in range(0, len(urls), args.card_size)]
+    print(f"urls: {len(urls)}, distinct: {len(set(urls))}, cards: {len(cards)}")
+
+    timed("legacy per-url", len(urls), lambda: [legacy_classify((url,)) for url in urls])
+    classify_url.cache_clear()
+    timed("classify_url cold", len(urls), lambda: [classify_url(url) for url in urls])
+    timed("classify_url warm", len(urls), lambda: [classify_url(url) for url in urls])
+    timed("legacy cards", len(urls), lambda: [legacy_classify(card) for card in cards])
+    classify_url.cache_clear()
+    timed("classify_links cards", len(urls), lambda: [classify_links(card) for card in cards])
+
+    kinds = Counter(classify_url(url)[0] or "-" for url in urls)
+    print("kinds:", ", ".join(f"{kind}={count}" for kind, count in kinds.most_common()))
+    info = classify_url.cache_info()
+    print(f"cache: hits={info.hits} misses={info.misses} size={info.currsize}/{info.maxsize}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Offline scraper benchmark against the local Yandex Maps stand-in.
+
+Runs YandexMapsScraper with base_url pointed at benchmarks.maps_standin and
+reports cards/s, Playwright IPC calls per card and peak RSS for each mode.
+
+Run from the repo root:
+    python -m benchmarks.bench_offline [--cards 200] [--modes click locators fixed pool4]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.pacser_maps import YandexMapsScraper  # noqa: E402
+from benchmarks.maps_standin import MapsStandIn, StandInConfig  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = {
+    "click": {},
+    "locators": {"card_extraction": "locators"},
+    "fixed": {"adaptive_waits": False},
+    "stream": {"stream_ids": True},
+    "pool4": {"card_workers": 4},
+}
+
+
+class IpcCounter:
+    # Каждый вызов sync API — сообщение драйверу Playwright; считаем их на уровне соединения.
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._original = None
+        self._connection_cls = None
+
+    def install(self) -> bool:
+        try:
+            from playwright._impl._connection import Connection
+        except ImportError:
+            return False
+        original = getattr(Connection, "send_message_to_server", None)
+        if original is None:
+            return False
+        counter = self
+
+        def send_message_to_server(self, *args, **kwargs):
+            with counter._lock:
+                counter.calls += 1
+            return original(self, *args, **kwargs)
+
+        self._connection_cls = Connection
+        self._original = original
+        Connection.send_message_to_server = send_message_to_server
+        return True
+
+    def uninstall(self) -> None:
+        if self._connection_cls is not None:
+            self._connection_cls.send_message_to_server = self._original
+
+    def reset(self) -> int:
+        with self._lock:
+            calls, self.calls = self.calls, 0
+        return calls
+
+
+def peak_rss_mb() -> tuple[float, float]:
+    if resource is None:
+        return 0.0, 0.0
+    # ru_maxrss: КБ в Linux, байты в macOS. Дети — самый тяжёлый завершившийся процесс браузера.
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / 1_048_576
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own, children
+
+
+def run_mode(base_url: str, cards: int, options: dict, politeness: tuple[float, float]) -> tuple[int, float]:
+    scraper = YandexMapsScraper(
+        query="кафе в Стенде",
+        limit=cards,
+        base_url=base_url,
+        politeness=politeness,
+        **options,
+    )
+    started = time.perf_counter()
+    count = sum(1 for _ in scraper.run())
+    return count, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.2], metavar=("MIN", "MAX"))
+    parser.add_argument("--politeness", type=float, nargs=2, default=[0.2, 0.4], metavar=("MIN", "MAX"))
+    parser.add_argument("--snapshots", default="", help="Folder with list_item.html / card.html")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    config = StandInConfig(
+        cards=args.cards,
+        page_size=args.page_size,
+        list_latency=tuple(args.latency),
+        card_latency=tuple(args.latency),
+        snapshot_dir=Path(args.snapshots) if args.snapshots else None,
+    )
+    counter = IpcCounter()
+    counting = counter.install()
+    try:
+        with MapsStandIn(config) as standin:
+            print(f"stand-in: {standin.base_url}, cards={args.cards}, latency={args.latency}")
+            print(
+                f"{'mode':<10} {'cards':>6} {'time, s':>8} {'cards/s':>8} "
+                f"{'IPC/card':>9} {'RSS py, MB':>11} {'RSS browser, MB':>16}"
+            )
+            for mode in args.modes:
+                counter.reset()
+                count, elapsed = run_mode(standin.base_url, args.cards, MODES[mode], tuple(args.politeness))
+                calls = counter.reset()
+                own, children = peak_rss_mb()
+                ipc = f"{calls / count:.1f}" if counting and count else "n/a"
+                rate = count / elapsed if elapsed > 0 else 0.0
+                print(
+                    f"{mode:<10} {count:>6} {elapsed:>8.1f} {rate:>8.2f} "
+                    f"{ipc:>9} {own:>11.0f} {children:>16.0f}"
+                )
+            print(f"server requests: {standin.requests}")
+    finally:
+        counter.uninstall()
+
+
+if __name__ == "__main__":
+    main()
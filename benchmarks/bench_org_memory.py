@@ -0,0 +1,94 @@
+"""Memory of large result sets: plain dataclass vs slotted Organization.
+
+Run from the repo root: python -m benchmarks.bench_org_memory [--rows 100000 500000]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.organization import Organization  # noqa: E402
+
+
+# Копия прежнего Organization без slots — точка отсчёта.
+@dataclass
+class PlainOrganization:
+    name: str = ""
+    phone: str = ""
+    verified: str = ""
+    award: str = ""
+    vk: str = ""
+    telegram: str = ""
+    whatsapp: str = ""
+    website: str = ""
+    card_url: str = ""
+    rating: str = ""
+    rating_count: str = ""
+
+
+def fresh(value: str) -> str:
+    # Строки со страницы приходят отдельными объектами, литералы же разделяются.
+    return (value + " ")[:-1]
+
+
+def make_fields(index: int) -> dict:
+    return dict(
+        name=f"Организация {index}",
+        phone=f"+7812{index % 50_000:07d}",
+        verified=fresh("синяя" if index % 7 == 0 else ""),
+        award=fresh("Хорошее место" if index % 11 == 0 else ""),
+        vk=f"https://vk.com/org{index}",
+        website=f"https://org{index % 20_000}.ru",
+        card_url=f"https://yandex.ru/maps/org/{1000000 + index}/",
+        rating=f"{3 + index % 20 / 10:.1f}",
+        rating_count=str(index % 500),
+    )
+
+
+def measure(build, rows: int) -> tuple[float, float, object]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(rows)
+    elapsed = time.perf_counter() - started
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current / 1_048_576, result
+
+
+def build_plain(rows: int):
+    return [PlainOrganization(**make_fields(index)) for index in range(rows)]
+
+
+def build_slotted(rows: int):
+    return [Organization(**make_fields(index)) for index in range(rows)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 500_000])
+    args = parser.parse_args()
+    print(f"{'container':<20} {'rows':>8} {'build, s':>9} {'retained, MB':>13} {'B/row':>7}")
+    for rows in args.rows:
+        for label, build in (
+            ("plain dataclass", build_plain),
+            ("slots dataclass", build_slotted),
+        ):
+            elapsed, retained, result = measure(build, rows)
+            print(
+                f"{label:<20} {rows:>8} {elapsed:>9.2f} {retained:>13.1f} "
+                f"{retained * 1_048_576 / rows:>7.0f}"
+            )
+            del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Phone normalization and classification on large batches.
+
+Compares the per-char normalization that used to live in
+YandexMapsScraper._normalize_phone with app.phones: normalize_phone per item,
+normalize_many over the whole list, and PhoneIndex.classify_many.
+
+Run from the repo root: python -m benchmarks.bench_phones [--count 1000000] [--registry DEF-9xx.csv ...]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.phones import default_index, extract_phones, load_registry, normalize_many, normalize_phone  # noqa: E402
+
+FORMATS = [
+    "+7 ({a}) {b}-{c}-{d}",
+    "8 ({a}) {b}-{c}-{d}",
+    "+7{a}{b}{c}{d}",
+    "8 {a} {b} {c} {d}",
+    "+7 ({a}) {b}-{c}-{d} доб. {e}",
+    "{b}-{c}-{d}",
+    "+375 29 {b}-{c}-{d}",
+    "8 800 {b}-{c}-{d}",
+]
+CODES = ["495", "499", "812", "343", "383", "916", "921", "999", "903", "7172", "701"]
+
+
+def legacy_normalize(raw_phone: str) -> str:
+    # Прежний YandexMapsScraper._normalize_phone: цикл по символам, только 11 цифр на 7/8.
+    digits = "".join(ch for ch in raw_phone if ch.isdigit())
+    if len(digits) != 11 or digits[0] not in {"7", "8"}:
+        return ""
+    if digits[0] == "8":
+        digits = "7" + digits[1:]
+    return f"+{digits}"
+
+
+def make_phone(rng: random.Random) -> str:
+    code = rng.choice(CODES)
+    body = f"{rng.randrange(10_000_000):07d}"[: 10 - len(code)]
+    return rng.choice(FORMATS).format(
+        a=code, b=body[:-4], c=body[-4:-2], d=body[-2:], e=rng.randrange(1, 999)
+    )
+
+
+def timed(label: str, count: int, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<26} {elapsed:>7.3f}s {count / elapsed:>12,.0f} phones/s {elapsed / count * 1e6:>6.2f} us/phone")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--card-size", type=int, default=3)
+    parser.add_argument("--registry", nargs="+", default=[], help="Numbering plan CSVs for the interval index")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    raws = [make_phone(rng) for _ in range(args.count)]
+    index = load_registry(Path(path) for path in args.registry) if args.registry else default_index()
+    print(f"phones: {len(raws)}, index ranges: {len(index)}")
+
+    legacy = timed("legacy per-char", len(raws), lambda: [legacy_normalize(raw) for raw in raws])
+    timed("normalize_phone per item", len(raws), lambda: [normalize_phone(raw) for raw in raws])
+    numbers = timed("normalize_many", len(raws), lambda: normalize_many(raws))
+    kinds = timed("classify_many", len(raws), lambda: index.classify_many(numbers))
+    cards = [raws[start:start + args.card_size] for start in range(0, len(raws), args.card_size)]
+    timed("extract_phones per card", len(raws), lambda: [extract_phones(card, index) for card in cards])
+
+    print(f"valid: legacy={sum(map(bool, legacy))}, new={sum(map(bool, numbers))}")
+    print("kinds:", ", ".join(f"{kind or 'unknown'}={count}" for kind, count in Counter(kinds).most_common()))
+
+
+if __name__ == "__main__":
+    main()
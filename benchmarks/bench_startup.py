@@ -0,0 +1,117 @@
+"""CLI startup cost: -X importtime breakdown and time-to-first-navigation.
+
+Import part: python -X importtime -c "import main" and the slowest modules.
+Navigation part: starts main.py --cli against the local stand-in
+(benchmarks/maps_standin.py) and measures the time until the first list
+request reaches the server, with and without --fast-start.
+
+Run from the repo root: python -m benchmarks.bench_startup [--runs 3] [--top 15]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.maps_standin import MapsStandIn, StandInConfig  # noqa: E402
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    # Строки вида "import time:   self [us] | cumulative | imported package".
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(statement: str) -> list[tuple[str, int, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def time_to_navigation(base_url: str, standin: MapsStandIn, fast_start: bool, timeout: float) -> float:
+    standin.first_request_at.pop("list", None)
+    command = [
+        sys.executable,
+        str(ROOT / "main.py"),
+        "--cli",
+        "--query",
+        "кафе в Стенде",
+        "--limit",
+        "1",
+        "--base-url",
+        base_url,
+    ]
+    if fast_start:
+        command.append("--fast-start")
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            reached = standin.first_request_at.get("list")
+            if reached is not None:
+                return reached - started
+            if process.poll() is not None:
+                return float("nan")
+            time.sleep(0.005)
+        return float("nan")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--skip-navigation", action="store_true")
+    args = parser.parse_args()
+
+    rows = import_profile("import main")
+    main_row = next((row for row in rows if row[0].strip() == "main"), None)
+    print(f"import main: {main_row[2] / 1000 if main_row else float('nan'):.1f} ms cumulative")
+    print(f"{'module':<50} {'self, ms':>9} {'cumul., ms':>11}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[: args.top]:
+        print(f"{name[:50]:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>11.1f}")
+
+    if args.skip_navigation:
+        return
+    config = StandInConfig(cards=20, list_latency=(0.0, 0.0), card_latency=(0.0, 0.0))
+    with MapsStandIn(config) as standin:
+        print(f"\ntime to first navigation ({args.runs} runs, stand-in {standin.base_url})")
+        for fast_start in (False, True):
+            samples = [
+                time_to_navigation(standin.base_url, standin, fast_start, args.timeout)
+                for _ in range(args.runs)
+            ]
+            valid = [sample for sample in samples if sample == sample]
+            label = "--fast-start" if fast_start else "default"
+            if not valid:
+                print(f"{label:<14} no navigation (main.py exited or timed out)")
+                continue
+            print(
+                f"{label:<14} median={statistics.median(valid):.2f}s "
+                f"min={min(valid):.2f}s max={max(valid):.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Stop-word check: per-org split + scan vs the compiled pre-check in front of it.
+
+The naive scan stands in for the stop-word loop of app.filters (substring
+search after re-splitting the list). With the pre-check only candidates
+reach that loop; "missed" counts names the scan blocks but the pre-check
+let through and must be 0.
+
+Run from the repo root: python -m benchmarks.bench_stopwords [--count 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from app.stopwords import compile_matcher, normalize_phrase, strip_notes  # noqa: E402
+
+WORDS = [
+    "английский", "школа", "центр", "студия", "курсы", "языков", "детский", "клуб", "english",
+    "academy", "сервис", "автомойка", "фонд", "мастерская", "салон", "красоты", "ремонт", "пушкин",
+    "кофейня", "пекарня", "барбершоп", "цветы", "шиномонтаж", "стоматология", "ветклиника",
+]
+
+
+def naive_blocked(name: str, stop_words: str) -> bool:
+    # Список режется заново для каждой организации, поиск — подстрокой.
+    text = normalize_phrase(name)
+    stop = [phrase for phrase in (normalize_phrase(strip_notes(p)) for p in stop_words.split(",")) if phrase]
+    return any(phrase in text for phrase in stop)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    settings = json.loads((ROOT / "config" / "settings.json").read_text(encoding="utf-8"))
+    stop_words = settings["potential_filters"]["stop_words"]
+    rng = random.Random(42)
+    names = [" ".join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(args.count)]
+
+    started = time.perf_counter()
+    naive = [naive_blocked(name, stop_words) for name in names]
+    naive_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matcher = compile_matcher(stop_words)
+    candidates = [bool(matcher.find_stop_word(name)) for name in names]
+    checked = [naive_blocked(name, stop_words) if candidate else False for name, candidate in zip(names, candidates)]
+    compiled_s = time.perf_counter() - started
+
+    missed = sum(blocked and not candidate for blocked, candidate in zip(naive, candidates))
+    assert checked == naive
+    print(f"phrases: {len(matcher.stop_phrases)}, names: {len(names)}, candidates: {sum(candidates)}")
+    print(f"naive:     {naive_s:.3f}s ({len(names) / naive_s:,.0f} names/s)")
+    print(f"pre-check: {compiled_s:.3f}s ({len(names) / compiled_s:,.0f} names/s)")
+    print(f"speedup:   x{naive_s / compiled_s:.1f}, blocked={sum(naive)}, missed={missed}")
+
+
+if __name__ == "__main__":
+    main()
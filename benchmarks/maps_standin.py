@@ -0,0 +1,547 @@
+"""Local Yandex Maps stand-in for offline benchmarks.
+
+Serves a search list inside div.scroll__container that lazy-loads more
+snippets on scroll, and business cards both in the sidebar
+(aside.sidebar-view._shown) and as standalone /maps/org/<id>/ pages.
+Markup comes from built-in templates or from saved snapshots
+(list_item.html, card.html, search_item.json with string.Template
+placeholders). Every list page is also answered by /maps/api/search in the
+search API shape, for --collect network.
+With --captcha-rate / --captcha-session-limit it plays an antibot: a session
+(cookie) that opens cards too fast is redirected to /showcaptcha, which
+solves itself after --captcha-solve-after seconds.
+
+Standalone: python -m benchmarks.maps_standin [--cards 500] [--port 8765] [--captcha-rate 40]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from string import Template
+from typing import Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+LIST_ITEM_TEMPLATE = """\
+<li class="search-snippet-view" style="height: 96px">
+  <div class="search-snippet-view__body" data-object="search-list-item" data-id="$id">
+    <div class="search-snippet-view__body-button-wrapper" role="button" tabindex="0">
+      <div class="search-business-snippet-view__title">$name</div>
+      <div class="search-business-snippet-view__address">ул. Тестовая, $index</div>
+    </div>
+  </div>
+</li>
+"""
+
+CARD_TEMPLATE = """\
+<div class="business-card-view" data-id="$id">
+  <h1 class="card-title-view__title">
+    <a class="card-title-view__title-link" href="/maps/org/$slug/$id/">$name</a>$badge
+  </h1>
+  <div class="business-header-rating-view">
+    <span class="business-rating-badge-view__rating-text">$rating</span>
+    <span class="business-header-rating-view__text">$count оценок</span>
+  </div>
+  <div class="business-header-awards-view__award-text">$award</div>
+  <div class="card-phones-view__phone-number"><span itemprop="telephone">$phone</span></div>
+  <div class="business-urls-view">
+    <a class="business-urls-view__link" href="$website"><span class="business-urls-view__text">$website_text</span></a>
+  </div>
+  <div class="business-contacts-view__social-links">$socials</div>
+</div>
+"""
+
+# Элемент data.items ответа /maps/api/search; значения подставляются уже в JSON.
+SEARCH_ITEM_TEMPLATE = """\
+{
+  "type": "business",
+  "id": $id_json,
+  "title": $name_json,
+  "uri": $uri_json,
+  "address": $address_json,
+  "phones": [{"type": "phone", "number": $phone_json}],
+  "urls": $urls_json,
+  "socialLinks": $social_links_json,
+  "ratingData": {"ratingValue": $rating_value, "ratingCount": $count, "reviewCount": $count}
+}
+"""
+
+BADGE_TEMPLATES = (
+    "",
+    '<span class="business-verified-badge"><svg><path fill="#196dff"></path></svg></span>',
+    '<span class="business-verified-badge _prioritized"><svg><path fill="#3bb300"></path></svg></span>',
+)
+
+LIST_PAGE = """\
+<!doctype html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>$query — Яндекс Карты (стенд)</title>
+<style>
+  body { margin: 0; font: 14px sans-serif; display: flex; height: 100vh; }
+  div.scroll__container { width: 420px; height: 100vh; overflow-y: auto; }
+  ul { list-style: none; margin: 0; padding: 0; }
+  aside.sidebar-view { flex: 1; padding: 16px; }
+</style>
+</head>
+<body>
+<div class="scroll__container"><ul class="search-list-view__list">$items</ul></div>
+<aside class="sidebar-view"></aside>
+<script>
+(() => {
+  const container = document.querySelector("div.scroll__container");
+  const list = container.querySelector("ul");
+  const aside = document.querySelector("aside.sidebar-view");
+  const query = $query_json;
+  let offset = $offset;
+  let done = $done;
+  let loading = false;
+  // Настоящая выдача параллельно ходит в API поиска — его слушает --collect network.
+  const search = (skip) => fetch(
+    "/maps/api/search?text=" + encodeURIComponent(query) + "&skip=" + skip + "&results=$page_size"
+  ).catch(() => {});
+  search(0);
+  container.addEventListener("scroll", () => {
+    if (done || loading) return;
+    if (container.scrollTop + container.clientHeight < container.scrollHeight - 300) return;
+    loading = true;
+    fetch("/api/list?offset=" + offset + "&text=" + encodeURIComponent(query))
+      .then((response) => (toCaptcha(response) ? null : response.json()))
+      .then((data) => {
+        if (!data) return;
+        search(offset);
+        list.insertAdjacentHTML("beforeend", data.html);
+        offset += data.count;
+        done = data.done;
+      })
+      .finally(() => { loading = false; });
+  });
+  // Как у Яндекса: капча — переход всей страницы на /showcaptcha.
+  const toCaptcha = (response) => {
+    if (!response.redirected || !response.url.includes("showcaptcha")) return false;
+    window.location.assign(response.url);
+    return true;
+  };
+  let cardRequest = 0;
+  document.addEventListener("click", (event) => {
+    const wrapper = event.target.closest("div.search-snippet-view__body-button-wrapper");
+    if (!wrapper) return;
+    const id = wrapper.closest("[data-id]").dataset.id;
+    const request = ++cardRequest;
+    aside.classList.remove("_shown");
+    fetch("/api/card/" + id)
+      .then((response) => (toCaptcha(response) ? null : response.text()))
+      .then((html) => {
+        if (html === null || request !== cardRequest) return;
+        aside.innerHTML = html;
+        aside.classList.add("_shown");
+      });
+  });
+})();
+</script>
+</body>
+</html>
+"""
+
+CARD_PAGE = """\
+<!doctype html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>$name — Яндекс Карты (стенд)</title></head>
+<body>$card</body>
+</html>
+"""
+
+CAPTCHA_PAGE = """\
+<!doctype html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>Ой! (стенд)</title></head>
+<body>
+<div class="CheckboxCaptcha">
+  <form id="checkbox-captcha-form" method="get" action="/checkcaptcha">
+    <input type="hidden" name="retpath" value="$retpath">
+    <button type="submit">Я не робот</button>
+  </form>
+</div>
+<script>
+  const solveAfterMs = $solve_after_ms;
+  if (solveAfterMs > 0) setTimeout(() => document.forms[0].submit(), solveAfterMs);
+</script>
+</body>
+</html>
+"""
+
+
+class _Session:
+    __slots__ = ("hits", "cards", "blocked")
+
+    def __init__(self) -> None:
+        self.hits: deque[float] = deque()
+        self.cards = 0
+        self.blocked = False
+
+
+# Правила антибота отдельно от HTTP: их же гоняет офлайн-симуляция
+# benchmarks.bench_captcha с виртуальными часами.
+@dataclass
+class CaptchaRules:
+    # Больше rate карточек за window секунд или session_limit карточек
+    # с одной сессии после последней капчи — капча; 0 — правило выключено.
+    rate: int = 0
+    window: float = 60.0
+    session_limit: int = 0
+    _sessions: dict[str, _Session] = field(default_factory=dict, init=False, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.session_limit > 0
+
+    def blocked(self, session_id: str) -> bool:
+        session = self._sessions.get(session_id)
+        return session is not None and session.blocked
+
+    def card(self, session_id: str, now: float) -> bool:
+        # True — запрос карточки пропущен, False — сессия получила капчу.
+        session = self._sessions.setdefault(session_id, _Session())
+        if session.blocked:
+            return False
+        while session.hits and now - session.hits[0] > self.window:
+            session.hits.popleft()
+        session.hits.append(now)
+        session.cards += 1
+        if (self.rate and len(session.hits) > self.rate) or (
+            self.session_limit and session.cards > self.session_limit
+        ):
+            session.blocked = True
+            return False
+        return True
+
+    def solve(self, session_id: str) -> None:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.blocked = False
+            session.hits.clear()
+            session.cards = 0
+
+
+@dataclass
+class StandInConfig:
+    cards: int = 500
+    page_size: int = 20
+    # Задержки ответа сервера, секунды: (min, max).
+    list_latency: tuple[float, float] = (0.05, 0.15)
+    card_latency: tuple[float, float] = (0.05, 0.2)
+    seed: int = 1
+    snapshot_dir: Optional[Path] = None
+    captcha_rate: int = 0
+    captcha_window: float = 60.0
+    captcha_session_limit: int = 0
+    # Страница капчи отправляет форму сама через столько секунд; 0 — ждёт нажатия.
+    captcha_solve_after: float = 2.0
+
+
+class MapsStandIn:
+    def __init__(self, config: Optional[StandInConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or StandInConfig()
+        self.item_template = Template(self._load_snapshot("list_item.html", LIST_ITEM_TEMPLATE))
+        self.search_template = Template(self._load_snapshot("search_item.json", SEARCH_ITEM_TEMPLATE))
+        self.card_template = Template(self._load_snapshot("card.html", CARD_TEMPLATE))
+        self.ids = [str(1_000_000_000 + index) for index in range(self.config.cards)]
+        self._positions = {org_id: index for index, org_id in enumerate(self.ids)}
+        self.requests = {"list": 0, "list_api": 0, "search_api": 0, "card_api": 0, "card_page": 0, "captcha": 0}
+        self.rules = CaptchaRules(
+            rate=self.config.captcha_rate,
+            window=self.config.captcha_window,
+            session_limit=self.config.captcha_session_limit,
+        )
+        self.sessions = 0
+        self._session_ids = itertools.count(1)
+        # time.perf_counter() первого запроса каждого вида — для замера времени до навигации.
+        self.first_request_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/web-maps/"
+
+    def start(self) -> "MapsStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MapsStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.first_request_at.setdefault(kind, time.perf_counter())
+
+    def new_session(self) -> str:
+        with self._lock:
+            self.sessions += 1
+            return f"s{next(self._session_ids)}"
+
+    def card_allowed(self, session_id: str) -> bool:
+        if not self.rules.enabled:
+            return True
+        with self._lock:
+            if self.rules.blocked(session_id):
+                return False
+            allowed = self.rules.card(session_id, time.monotonic())
+        if not allowed:
+            self.count("captcha")
+        return allowed
+
+    def blocked(self, session_id: str) -> bool:
+        with self._lock:
+            return self.rules.blocked(session_id)
+
+    def solve(self, session_id: str) -> None:
+        with self._lock:
+            self.rules.solve(session_id)
+
+    def fields_for(self, index: int) -> dict:
+        org_id = self.ids[index]
+        rng = random.Random(self.config.seed * 1_000_003 + index)
+        social_links = []
+        if index % 2 == 0:
+            social_links.append(("vkontakte", "VK", f"https://vk.com/standin{index}"))
+        if index % 5 == 0:
+            social_links.append(("telegram", "Telegram", f"https://t.me/standin{index}"))
+        if index % 7 == 0:
+            social_links.append(("whatsapp", "WhatsApp", f"https://wa.me/7999{index:07d}"))
+        has_site = index % 3 != 0
+        return {
+            "id": org_id,
+            "index": index,
+            "slug": f"standin_{index}",
+            "name": f"Организация {index}",
+            "phone": f"+7 (812) {index % 1000:03d}-{index // 1000 % 100:02d}-{rng.randrange(100):02d}",
+            "rating": f"{rng.uniform(3.5, 5.0):.1f}".replace(".", ","),
+            "count": rng.randrange(1, 900),
+            "award": "Хорошее место 2024" if index % 11 == 0 else "",
+            "badge": BADGE_TEMPLATES[index % len(BADGE_TEMPLATES)],
+            "website": f"https://standin{index}.example" if has_site else "",
+            "website_text": f"standin{index}.example" if has_site else "",
+            "socials": "".join(f'<a href="{href}">{label}</a>' for _, label, href in social_links),
+            "social_links": [{"type": kind, "href": href} for kind, _, href in social_links],
+        }
+
+    def search_item(self, index: int) -> dict:
+        fields = self.fields_for(index)
+        values = {
+            "id_json": json.dumps(fields["id"]),
+            "name_json": json.dumps(fields["name"], ensure_ascii=False),
+            "uri_json": json.dumps(f"ymapsbm1://org?oid={fields['id']}"),
+            "address_json": json.dumps(f"ул. Тестовая, {index}", ensure_ascii=False),
+            "phone_json": json.dumps(fields["phone"]),
+            "urls_json": json.dumps([fields["website"]] if fields["website"] else []),
+            "social_links_json": json.dumps(fields["social_links"]),
+            "rating_value": fields["rating"].replace(",", "."),
+            "count": fields["count"],
+        }
+        return json.loads(self.search_template.safe_substitute(values))
+
+    def search_payload(self, skip: int, results: int) -> dict:
+        end = min(len(self.ids), skip + max(0, results))
+        return {
+            "data": {
+                "items": [self.search_item(index) for index in range(skip, end)],
+                "totalResultCount": len(self.ids),
+            }
+        }
+
+    def list_items(self, offset: int) -> tuple[str, int, bool]:
+        end = min(len(self.ids), offset + self.config.page_size)
+        html = "".join(self.item_template.safe_substitute(self.fields_for(index)) for index in range(offset, end))
+        return html, end - offset, end >= len(self.ids)
+
+    def card_html(self, org_id: str) -> Optional[str]:
+        index = self._positions.get(org_id)
+        if index is None:
+            return None
+        return self.card_template.safe_substitute(self.fields_for(index))
+
+    def _load_snapshot(self, name: str, default: str) -> str:
+        folder = self.config.snapshot_dir
+        if folder is not None and (Path(folder) / name).exists():
+            return (Path(folder) / name).read_text(encoding="utf-8")
+        return default
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                parts = urlsplit(self.path)
+                params = parse_qs(parts.query)
+                path = parts.path
+                self._cookie = ""
+                session_id = self._session_id()
+                if not session_id:
+                    session_id = standin.new_session()
+                    self._cookie = f"standin_session={session_id}; Path=/"
+                if path == "/showcaptcha":
+                    retpath = (params.get("retpath") or ["/web-maps/"])[0]
+                    page = Template(CAPTCHA_PAGE).safe_substitute(
+                        retpath=retpath.replace('"', "&quot;"),
+                        solve_after_ms=int(standin.config.captcha_solve_after * 1000),
+                    )
+                    self._send(200, page, "text/html")
+                elif path == "/checkcaptcha":
+                    standin.solve(session_id)
+                    self._redirect((params.get("retpath") or ["/web-maps/"])[0])
+                elif standin.blocked(session_id):
+                    self._to_captcha(self.path)
+                elif path.rstrip("/") == "/web-maps":
+                    standin.count("list")
+                    query = (params.get("text") or [""])[0]
+                    html, count, done = standin.list_items(0)
+                    page = Template(LIST_PAGE).safe_substitute(
+                        query=query,
+                        query_json=json.dumps(query, ensure_ascii=False),
+                        items=html,
+                        offset=count,
+                        page_size=standin.config.page_size,
+                        done="true" if done else "false",
+                    )
+                    self._delay(standin.config.list_latency)
+                    self._send(200, page, "text/html")
+                elif path == "/api/list":
+                    standin.count("list_api")
+                    offset = int((params.get("offset") or ["0"])[0])
+                    html, count, done = standin.list_items(offset)
+                    self._delay(standin.config.list_latency)
+                    self._send(200, json.dumps({"html": html, "count": count, "done": done}), "application/json")
+                elif path == "/maps/api/search":
+                    standin.count("search_api")
+                    skip = int((params.get("skip") or ["0"])[0])
+                    results = int((params.get("results") or [str(standin.config.page_size)])[0])
+                    payload = json.dumps(standin.search_payload(skip, results), ensure_ascii=False)
+                    self._delay(standin.config.list_latency)
+                    self._send(200, payload, "application/json")
+                elif path.startswith("/api/card/"):
+                    standin.count("card_api")
+                    if not standin.card_allowed(session_id):
+                        self._to_captcha(self.path)
+                        return
+                    card = standin.card_html(path.rsplit("/", 1)[-1])
+                    self._delay(standin.config.card_latency)
+                    self._send(200 if card else 404, card or "", "text/html")
+                elif path.startswith("/maps/org/"):
+                    standin.count("card_page")
+                    if not standin.card_allowed(session_id):
+                        self._to_captcha(self.path)
+                        return
+                    org_id = [part for part in path.split("/") if part][-1]
+                    card = standin.card_html(org_id)
+                    self._delay(standin.config.card_latency)
+                    if card is None:
+                        self._send(404, "", "text/html")
+                    else:
+                        self._send(200, Template(CARD_PAGE).safe_substitute(name=org_id, card=card), "text/html")
+                else:
+                    self._send(404, "", "text/plain")
+
+            def _session_id(self) -> str:
+                for part in (self.headers.get("Cookie") or "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == "standin_session":
+                        return value
+                return ""
+
+            def _to_captcha(self, path: str) -> None:
+                # fetch() со страницы списка возвращаемся на сам список, а не на /api.
+                if path.startswith("/api/"):
+                    referer = urlsplit(self.headers.get("Referer") or "")
+                    path = referer.path + (f"?{referer.query}" if referer.query else "") or "/web-maps/"
+                self._redirect(f"/showcaptcha?retpath={quote(path, safe='')}")
+
+            def _redirect(self, location: str) -> None:
+                self.send_response(302)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.send_header("Cache-Control", "no-store")
+                if self._cookie:
+                    self.send_header("Set-Cookie", self._cookie)
+                self.end_headers()
+
+            def _delay(self, latency: tuple[float, float]) -> None:
+                low, high = latency
+                if high > 0:
+                    time.sleep(random.uniform(low, high))
+
+            def _send(self, status: int, body: str, content_type: str) -> None:
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("Cache-Control", "no-store")
+                if self._cookie:
+                    self.send_header("Set-Cookie", self._cookie)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args) -> None:  # noqa: A002
+                return
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, nargs=2, default=[0.05, 0.2], metavar=("MIN", "MAX"))
+    parser.add_argument("--snapshots", default="", help="Folder with list_item.html / card.html")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--captcha-rate", type=int, default=0, help="Captcha after N cards per window per session")
+    parser.add_argument("--captcha-window", type=float, default=60.0)
+    parser.add_argument("--captcha-session-limit", type=int, default=0, help="Captcha after N cards per session")
+    parser.add_argument("--captcha-solve-after", type=float, default=2.0, help="Seconds; 0 waits for a click")
+    args = parser.parse_args()
+    config = StandInConfig(
+        cards=args.cards,
+        page_size=args.page_size,
+        list_latency=tuple(args.latency),
+        card_latency=tuple(args.latency),
+        snapshot_dir=Path(args.snapshots) if args.snapshots else None,
+        captcha_rate=args.captcha_rate,
+        captcha_window=args.captcha_window,
+        captcha_session_limit=args.captcha_session_limit,
+        captcha_solve_after=args.captcha_solve_after,
+    )
+    with MapsStandIn(config, port=args.port) as standin:
+        print(f"Стенд запущен: {standin.base_url}?text=кафе (Ctrl+C — выход)", flush=True)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -9,25 +9,176 @@ import sys
 import threading
 from pathlib import Path
 
-from app.playwright_utils import chrome_not_found_message, is_chrome_missing_error
-
 SCRIPT_DIR = Path(__file__).resolve().parent
 RESULTS_DIR = SCRIPT_DIR / "results"
 REQUIREMENTS_FILE = SCRIPT_DIR / "requirements.txt"
 PLAYWRIGHT_MARKER = SCRIPT_DIR / ".playwright_installed"
+DEPENDENCY_CACHE_FILE = SCRIPT_DIR / ".dependencies_ok"
+CARD_CACHE_FILE = RESULTS_DIR / "cards_cache.sqlite3"
+DEDUP_INDEX_FILE = RESULTS_DIR / "dedup_index.sqlite3"
 
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Yandex Maps scraper")
     parser.add_argument("--query", help="Search query like 'ниша в город'")
     parser.add_argument("--limit", type=int, default=0, help="Limit number of organizations")
+    parser.add_argument("--batch", default="", help="File with one query per line (batch mode)")
+    parser.add_argument("--queries", nargs="+", default=[], help="Several queries for batch mode")
+    parser.add_argument(
+        "--reuse-context",
+        action="store_true",
+        help="Batch mode: keep one warmed browser context for all queries",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Run queries in N worker processes, each with its own browser (0 = one per CPU core)",
+    )
+    parser.add_argument(
+        "--shard-ids",
+        action="store_true",
+        help="With --processes and a single query: split its organizations across the processes",
+    )
+    parser.add_argument(
+        "--context-max-pages",
+        type=int,
+        default=300,
+        help="Batch mode: recycle a browser context after this many pages",
+    )
+    parser.add_argument(
+        "--context-max-minutes",
+        type=float,
+        default=20.0,
+        help="Batch mode: recycle a browser context after this many minutes",
+    )
     parser.add_argument(
         "--mode",
         default="slow",
         choices=["slow", "fast"],
         help="Parser mode: slow (maps scraper) or fast (search parser)",
     )
-    parser.add_argument("--out", default="result.xlsx", help="Output Excel file")
+    parser.add_argument(
+        "--card-workers",
+        type=int,
+        default=0,
+        help="Open cards by direct URL in N parallel tabs (slow mode, 0 = click the list)",
+    )
+    parser.add_argument(
+        "--collect",
+        default="dom",
+        choices=["dom", "network"],
+        help="Slow mode: read organizations from the DOM or from intercepted search API responses",
+    )
+    parser.add_argument(
+        "--record-search",
+        default="",
+        help="With --collect network: save raw search API responses to this folder (test/stand-in fixtures)",
+    )
+    parser.add_argument(
+        "--block",
+        default="off",
+        choices=["off", "list-only", "card-only"],
+        help="Slow mode: block images, fonts, map tiles and analytics requests",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Slow mode: parse cards in a single pass as soon as they appear in the list",
+    )
+    parser.add_argument(
+        "--fixed-waits",
+        action="store_true",
+        help="Slow mode: use the old fixed sleeps instead of DOM-driven adaptive waits",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=0.0,
+        help="Reuse parsed cards from the local cache for N hours, e.g. 24 (default 0: cache off)",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached cards and re-parse them, updating the cache",
+    )
+    parser.add_argument(
+        "--resume",
+        default="",
+        help="Continue an interrupted slow-mode run from its *.journal.jsonl checkpoint",
+    )
+    parser.add_argument(
+        "--excel-stream",
+        action="store_true",
+        help="Write Excel in constant memory (write-only workbook saved once at the end)",
+    )
+    parser.add_argument(
+        "--out",
+        action="append",
+        default=[],
+        help=(
+            "Output file: .xlsx, .csv, .jsonl or .json (columnar); repeat for several outputs. "
+            "A bare extension like .csv is written next to the default result. "
+            "In batch mode only the extension is used: each query writes next to its own result"
+        ),
+    )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Skip organizations already exported by earlier runs (persistent cross-run index)",
+    )
+    parser.add_argument(
+        "--dedup-index",
+        default=str(DEDUP_INDEX_FILE),
+        help="Dedup index file used by --dedup and --master-out",
+    )
+    parser.add_argument(
+        "--master-out",
+        default="",
+        help="Write all organizations from the dedup index, duplicates merged, to this file",
+    )
+    parser.add_argument(
+        "--fast-start",
+        action="store_true",
+        help="Skip the dependency check when requirements.txt and the interpreter are unchanged",
+    )
+    parser.add_argument(
+        "--base-url",
+        default="",
+        help="Override the maps URL (e.g. a local stand-in from benchmarks/maps_standin.py)",
+    )
+    parser.add_argument(
+        "--metrics",
+        default="",
+        help="Serve Prometheus metrics at HOST:PORT (e.g. 127.0.0.1:9108) or unix:/path/to.sock",
+    )
+    parser.add_argument(
+        "--phone-registry",
+        nargs="+",
+        default=[],
+        help=(
+            "Numbering plan CSVs (ABC-3xx.csv, DEF-9xx.csv, ...) for exact mobile/landline classification; "
+            "'code;city' CSVs list area codes used to complete short local numbers"
+        ),
+    )
+    parser.add_argument(
+        "--captcha-budget",
+        type=float,
+        default=0.0,
+        help=(
+            "Allowed captchas per hour: pace cards, card workers and session rotation to stay under it "
+            "(0 keeps the fixed pacing)"
+        ),
+    )
+    parser.add_argument(
+        "--captcha-recheck",
+        type=int,
+        default=0,
+        help=(
+            "Experimental: watch navigation/DOM for captcha and run the full check only every N cards "
+            "(default 0: full check before every card)"
+        ),
+    )
     parser.add_argument("--log", default="", help="Optional log file path")
     parser.add_argument(
         "--cli",
@@ -180,11 +331,42 @@ def _close_chrome_processes() -> None:
         subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
 
-def ensure_dependencies() -> None:
+def _dependency_cache_key() -> str:
+    import hashlib
+
+    # Проверка зависит только от requirements.txt, интерпретатора и установленного браузера.
+    digest = hashlib.sha256()
+    try:
+        digest.update(REQUIREMENTS_FILE.read_bytes())
+    except OSError:
+        pass
+    digest.update(sys.executable.encode("utf-8", "replace"))
+    digest.update(sys.version.encode("utf-8", "replace"))
+    digest.update(b"browser" if PLAYWRIGHT_MARKER.exists() else b"")
+    return digest.hexdigest()
+
+
+def _dependencies_cached() -> bool:
+    try:
+        return DEPENDENCY_CACHE_FILE.read_text(encoding="utf-8").strip() == _dependency_cache_key()
+    except OSError:
+        return False
+
+
+def _remember_dependencies() -> None:
+    try:
+        DEPENDENCY_CACHE_FILE.write_text(_dependency_cache_key(), encoding="utf-8")
+    except OSError:
+        logging.debug("Failed to write dependency cache", exc_info=True)
+
+
+def ensure_dependencies(fast_start: bool = False) -> None:
     # В "замороженной" сборке (cx_Freeze) зависимости уже упакованы.
     # Пытаться делать pip install / playwright install из .exe нельзя.
     if getattr(sys, "frozen", False):
         return
+    if fast_start and _dependencies_cached():
+        return
     modules = _parse_required_modules(REQUIREMENTS_FILE)
     if not modules:
         return
@@ -197,16 +379,117 @@ def ensure_dependencies() -> None:
         raise RuntimeError(f"Не удалось установить зависимости: {', '.join(remaining)}")
     if "playwright" in modules:
         _ensure_playwright_browser_installed()
+    _remember_dependencies()
+
+
+def open_output(args: argparse.Namespace, output_path: Path, per_query: bool = False):
+    from app.sinks import open_sinks, resolve_output_paths
+
+    paths = resolve_output_paths(args.out, output_path, per_query=per_query)
+    return open_sinks(paths, excel_stream=args.excel_stream)
+
+
+def log_progress(parsed: int, total: int) -> None:
+    logging.info("Прогресс: %s/%s", parsed, total)
+
+
+def load_phone_registry(args: argparse.Namespace) -> None:
+    if not args.phone_registry:
+        return
+    from app.phones import load_registry, set_default_index
+
+    set_default_index(load_registry(Path(path) for path in args.phone_registry))
+
+
+def network_options(args: argparse.Namespace, settings) -> dict:
+    if args.collect != "network":
+        return {}
+    from app.search_api import required_fields_for
+
+    return {
+        "network_required_fields": required_fields_for(settings.potential_filters),
+        "record_search_dir": Path(args.record_search) if args.record_search else None,
+    }
+
+
+def start_metrics(args: argparse.Namespace):
+    if not args.metrics:
+        return None
+    from app.metrics import MetricsServer
+
+    try:
+        return MetricsServer(args.metrics).start()
+    except (OSError, ValueError) as exc:
+        logging.warning("Не удалось запустить эндпоинт метрик %s: %s", args.metrics, exc)
+        return None
+
+
+def make_governor(args: argparse.Namespace, metrics=None):
+    if args.captcha_budget <= 0:
+        return None
+    from app.captcha_governor import CaptchaGovernor
+
+    governor = CaptchaGovernor(budget=args.captcha_budget)
+    if metrics is not None:
+        metrics.governor = governor
+    return governor
+
+
+def open_card_cache(args: argparse.Namespace):
+    if args.cache_ttl <= 0:
+        return None
+    from app.card_cache import CardCache
+
+    return CardCache(
+        CARD_CACHE_FILE,
+        ttl_seconds=args.cache_ttl * 3600,
+        refresh=args.refresh_cache,
+    )
+
+
+def open_dedup_index(args: argparse.Namespace):
+    if not args.dedup and not args.master_out:
+        return None
+    from app.dedup import DedupIndex
+
+    return DedupIndex(Path(args.dedup_index))
+
+
+def export_master(args: argparse.Namespace, dedup_index, settings) -> None:
+    if dedup_index is None:
+        return
+    logging.info("Индекс дублей: %s", dedup_index.summary())
+    if not args.master_out:
+        return
+    from app.sinks import open_sink
+    from app.stopwords import passes_filters
+
+    writer = open_sink(Path(args.master_out), excel_stream=args.excel_stream)
+    try:
+        count = dedup_index.export_master(
+            writer, include_in_potential=lambda org: passes_filters(org, settings)
+        )
+    finally:
+        writer.close()
+    logging.info("Общий файл без дублей: %s организаций → %s", count, args.master_out)
 
 
 def run_cli(args: argparse.Namespace) -> None:
-    from app.excel_writer import ExcelWriter
-    from app.filters import passes_potential_filters
     from app.notifications import notify_sound
     from app.parser_search import run_fast_parser
     from app.settings_store import load_settings
+    from app.stopwords import passes_filters
     from app.utils import build_result_paths, configure_logging, split_query
     from app.pacser_maps import YandexMapsScraper
+    from app.checkpoint import RunJournal, journal_path_for
+
+    resume_state = None
+    if args.resume:
+        resume_state = RunJournal.load(Path(args.resume))
+        args.query = resume_state.query or args.query
+        args.mode = "slow"
+        if args.limit <= 0 and resume_state.limit:
+            args.limit = resume_state.limit
 
     if not args.query:
         args.query = prompt_query()
@@ -218,6 +501,9 @@ def run_cli(args: argparse.Namespace) -> None:
         city=city,
         results_dir=RESULTS_DIR,
     )
+    if resume_state is not None and resume_state.output_path:
+        output_path = resume_state.output_path
+        results_folder = output_path.parent
     configure_logging(
         settings.program.log_level,
         Path(args.log) if args.log else None,
@@ -246,7 +532,25 @@ def run_cli(args: argparse.Namespace) -> None:
         notify_sound("finish", settings)
         return
 
-    writer = ExcelWriter(output_path)
+    limit = args.limit if args.limit > 0 else None
+    journal = RunJournal(Path(args.resume) if args.resume else journal_path_for(output_path))
+    writer = open_output(args, output_path)
+    if resume_state is None:
+        journal.write_header(args.query, output_path, limit)
+    else:
+        logging.info(
+            "Продолжаю запуск: уже разобрано %s из %s",
+            len(resume_state.orgs),
+            len(resume_state.known_ids or ()) or "?",
+        )
+        for org in resume_state.orgs.values():
+            writer.append(org, include_in_potential=passes_filters(org, settings))
+    load_phone_registry(args)
+    card_cache = open_card_cache(args)
+    dedup_index = open_dedup_index(args)
+    metrics = start_metrics(args)
+    governor = make_governor(args, metrics)
+    skip_ids = set(resume_state.orgs) if resume_state else None
     stop_event = threading.Event()
     pause_event = threading.Event()
     captcha_event = threading.Event()
@@ -257,25 +561,222 @@ def run_cli(args: argparse.Namespace) -> None:
 
     scraper = YandexMapsScraper(
         query=args.query,
-        limit=args.limit if args.limit > 0 else None,
+        limit=limit,
         stop_event=stop_event,
         pause_event=pause_event,
         captcha_resume_event=captcha_event,
         captcha_hook=_captcha_hook,
         log=logging.info,
+        card_workers=args.card_workers,
+        collect_strategy=args.collect,
+        block_preset=args.block,
+        adaptive_waits=not args.fixed_waits,
+        stream_ids=args.stream,
+        progress=log_progress,
+        card_cache=card_cache,
+        journal=journal,
+        known_ids=resume_state.known_ids if resume_state else None,
+        skip_ids=skip_ids,
+        seen_ids=dedup_index if args.dedup else None,
+        profile_path=results_folder / "profile.json",
+        base_url=args.base_url or None,
+        metrics=metrics,
+        captcha_governor=governor,
+        captcha_recheck_every=args.captcha_recheck,
+        **network_options(args, settings),
     )
 
     try:
         for org in scraper.run():
-            include = passes_potential_filters(org, settings)
+            include = passes_filters(org, settings)
             writer.append(org, include_in_potential=include)
+            if dedup_index is not None:
+                dedup_index.add(org, query=args.query)
     finally:
         writer.close()
+        journal.close()
+        if card_cache is not None:
+            card_cache.close()
+        if dedup_index is not None:
+            try:
+                export_master(args, dedup_index, settings)
+            finally:
+                dedup_index.close()
+        if metrics is not None:
+            metrics.close()
         if settings.program.open_result:
             open_file(results_folder)
         notify_sound("finish", settings)
 
 
+def run_batch(args: argparse.Namespace) -> None:
+    from app.batch_runner import BatchRunner, format_summary, read_queries
+    from app.notifications import notify_sound
+    from app.settings_store import load_settings
+
+    queries = list(args.queries)
+    if args.batch:
+        queries.extend(read_queries(Path(args.batch)))
+    settings = load_settings()
+    load_phone_registry(args)
+    card_cache = open_card_cache(args)
+    dedup_index = open_dedup_index(args)
+    metrics = start_metrics(args)
+    governor = make_governor(args, metrics)
+    stop_event = threading.Event()
+    pause_event = threading.Event()
+    captcha_event = threading.Event()
+
+    def _captcha_hook(stage: str, _page: object) -> None:
+        if stage == "detected":
+            notify_sound("captcha", settings)
+
+    runner = BatchRunner(
+        queries,
+        settings=settings,
+        results_dir=RESULTS_DIR,
+        limit=args.limit if args.limit > 0 else None,
+        reuse_context=args.reuse_context,
+        extra_log_path=Path(args.log) if args.log else None,
+        writer_factory=lambda path: open_output(args, path, per_query=True),
+        stop_event=stop_event,
+        pause_event=pause_event,
+        captcha_resume_event=captcha_event,
+        captcha_hook=_captcha_hook,
+        log=logging.info,
+        dedup_index=dedup_index,
+        skip_known=args.dedup,
+        context_max_pages=args.context_max_pages,
+        context_max_minutes=args.context_max_minutes,
+        scraper_kwargs={
+            "card_workers": args.card_workers,
+            "collect_strategy": args.collect,
+            "block_preset": args.block,
+            "adaptive_waits": not args.fixed_waits,
+            "stream_ids": args.stream,
+            "progress": log_progress,
+            "card_cache": card_cache,
+            "base_url": args.base_url or None,
+            "metrics": metrics,
+            "captcha_governor": governor,
+            "captcha_recheck_every": args.captcha_recheck,
+            **network_options(args, settings),
+        },
+    )
+    try:
+        results = runner.run()
+    finally:
+        if card_cache is not None:
+            card_cache.close()
+        if dedup_index is not None:
+            try:
+                export_master(args, dedup_index, settings)
+            finally:
+                dedup_index.close()
+        if metrics is not None:
+            metrics.close()
+        notify_sound("finish", settings)
+    summary = format_summary(results)
+    logging.info("Итоги пакета:\n%s", summary)
+    print(summary, flush=True)
+    if settings.program.open_result:
+        open_file(RESULTS_DIR)
+
+
+def run_processes(args: argparse.Namespace) -> None:
+    import multiprocessing
+
+    from app.batch_runner import format_summary, read_queries
+    from app.notifications import notify_sound
+    from app.process_pool import ProcessOrchestrator
+    from app.settings_store import load_settings
+    from app.utils import configure_logging
+
+    queries = [args.query] if args.query else []
+    queries.extend(args.queries)
+    if args.batch:
+        queries.extend(read_queries(Path(args.batch)))
+    if not queries:
+        queries.append(prompt_query())
+    settings = load_settings()
+    configure_logging(
+        settings.program.log_level,
+        Path(args.log) if args.log else None,
+        RESULTS_DIR / "log.txt",
+    )
+    dedup_index = open_dedup_index(args)
+    worker_options = {}
+    if args.cache_ttl > 0:
+        worker_options.update(
+            card_cache_path=str(CARD_CACHE_FILE),
+            cache_ttl=args.cache_ttl * 3600,
+            refresh_cache=args.refresh_cache,
+        )
+    if args.dedup:
+        worker_options["dedup_path"] = args.dedup_index
+    if args.phone_registry:
+        worker_options["phone_registry"] = list(args.phone_registry)
+    if args.captcha_budget > 0:
+        # Регулятор у каждого процесса свой: оркестратор делит бюджет между запущенными воркерами.
+        worker_options["captcha_budget"] = args.captcha_budget
+    # Этапы идут в дочерних процессах: воркеры присылают снимки таймеров (on_stats).
+    metrics = start_metrics(args)
+
+    def _captcha_hook(stage: str, _page: object) -> None:
+        if stage == "detected":
+            notify_sound("captcha", settings)
+
+    def _on_org(query: str, org) -> None:
+        dedup_index.add(org, query=query)
+
+    mp = multiprocessing.get_context("spawn")
+    orchestrator = ProcessOrchestrator(
+        queries,
+        settings=settings,
+        results_dir=RESULTS_DIR,
+        workers=args.processes,
+        limit=args.limit if args.limit > 0 else None,
+        shard_ids=args.shard_ids,
+        writer_factory=lambda path: open_output(args, path, per_query=True),
+        stop_event=mp.Event(),
+        pause_event=mp.Event(),
+        captcha_resume_event=mp.Event(),
+        captcha_hook=_captcha_hook,
+        on_org=_on_org if dedup_index is not None else None,
+        on_stats=metrics.update_remote if metrics is not None else None,
+        scraper_kwargs={
+            "card_workers": args.card_workers,
+            "collect_strategy": args.collect,
+            "block_preset": args.block,
+            "adaptive_waits": not args.fixed_waits,
+            "stream_ids": args.stream,
+            "base_url": args.base_url or None,
+            "captcha_recheck_every": args.captcha_recheck,
+            **network_options(args, settings),
+        },
+        worker_options=worker_options,
+    )
+    try:
+        results = orchestrator.run()
+    except KeyboardInterrupt:
+        orchestrator.stop_event.set()
+        raise
+    finally:
+        if dedup_index is not None:
+            try:
+                export_master(args, dedup_index, settings)
+            finally:
+                dedup_index.close()
+        if metrics is not None:
+            metrics.close()
+        notify_sound("finish", settings)
+    summary = format_summary(results)
+    logging.info("Итоги:\n%s", summary)
+    print(summary, flush=True)
+    if settings.program.open_result:
+        open_file(RESULTS_DIR)
+
+
 def run_gui() -> None:
     from app.gui import main as gui_main
 
@@ -283,13 +784,25 @@ def run_gui() -> None:
 
 
 def main() -> None:
+    if getattr(sys, "frozen", False):
+        import multiprocessing
+
+        # Процессы-воркеры (--processes) в собранном .exe запускаются через spawn.
+        multiprocessing.freeze_support()
     parser = build_parser()
     args = parser.parse_args()
     if args.cli:
-        ensure_dependencies()
+        ensure_dependencies(fast_start=args.fast_start)
         try:
-            run_cli(args)
+            if args.processes is not None:
+                run_processes(args)
+            elif args.batch or args.queries:
+                run_batch(args)
+            else:
+                run_cli(args)
         except Exception as exc:
+            from app.playwright_utils import chrome_not_found_message, is_chrome_missing_error
+
             if is_chrome_missing_error(exc):
                 print(chrome_not_found_message(), flush=True)
                 return
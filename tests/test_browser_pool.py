@@ -0,0 +1,64 @@
+"""BrowserPool context lifecycle with a fake browser."""
+import pytest
+
+browser_pool = pytest.importorskip("app.browser_pool")
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+        self.closed = False
+
+    def on(self, _event, _handler):
+        pass
+
+    def close(self):
+        self.closed = True
+        self.browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def new_context(self):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(browser_pool, "launch_chrome", lambda _playwright, args=None: FakeBrowser())
+    pool = browser_pool.BrowserPool(None, context_factory=lambda browser: browser.new_context())
+    yield pool
+    pool.close()
+
+
+def test_release_does_not_warm_a_new_context(pool):
+    pool.max_leases = 1
+    pool.warm()
+    entry = pool.acquire()
+    pool.release(entry)
+
+    assert entry.context.closed
+    assert pool.created == 1
+    assert pool.recycled == 1
+
+
+def test_acquire_reuses_healthy_context(pool):
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+    pool.release(second, evict=True)
+
+    assert second.context is first.context
+    assert pool.created == 1
+    assert second.context.closed
@@ -0,0 +1,124 @@
+"""CaptchaGovernor and CaptchaProbe on a virtual clock, without a browser."""
+import pytest
+
+from app.captcha_governor import CaptchaGovernor, CaptchaProbe
+from benchmarks.maps_standin import CaptchaRules
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+def test_captcha_multiplies_and_doubles_over_budget(clock):
+    governor = CaptchaGovernor(budget=1, backoff=2.0, clock=clock)
+
+    governor.on_captcha()
+    assert governor.scale == 2.0
+    clock.now += 60
+    governor.on_captcha()
+    assert governor.scale == 8.0
+    governor.on_captcha()
+    assert governor.scale == governor.max_scale
+
+
+def test_clean_cards_step_down_only_under_budget(clock):
+    governor = CaptchaGovernor(budget=1, step=0.5, clean_cards=10, clock=clock)
+    governor.on_captcha()
+    assert governor.scale == 2.0
+
+    for _ in range(30):
+        governor.on_card()
+    assert governor.scale == 2.0
+
+    clock.now += governor.window + 1
+    for _ in range(20):
+        governor.on_card()
+    assert governor.scale == 1.0
+    for _ in range(100):
+        governor.on_card()
+    assert governor.scale == governor.min_scale
+
+
+def test_budget_window_slides(clock):
+    governor = CaptchaGovernor(budget=2, window=3600.0, clock=clock)
+    governor.on_captcha()
+    clock.now += 1800
+    governor.on_captcha()
+
+    assert governor.captchas_in_window() == 2
+    assert governor.over_budget()
+    clock.now += 1801
+    assert governor.captchas_in_window() == 1
+    assert not governor.over_budget()
+    assert governor.captcha_total == 2
+
+
+def test_should_rotate_before_learned_session_length(clock):
+    governor = CaptchaGovernor(rotate_margin=0.8, clock=clock)
+    governor.start_session()
+    for _ in range(100):
+        governor.on_card()
+    assert not governor.should_rotate()
+    governor.on_captcha()
+    assert governor.cards_per_session == 100
+    assert not governor.should_rotate()
+
+    governor.start_session()
+    for _ in range(79):
+        governor.on_card()
+    assert not governor.should_rotate()
+    governor.on_card()
+    assert governor.should_rotate()
+    governor.rotated()
+    assert governor.rotations == 1
+
+    governor.start_session()
+    for _ in range(50):
+        governor.on_card()
+    governor.on_captcha()
+    assert governor.cards_per_session == pytest.approx(0.7 * 100 + 0.3 * 50)
+
+
+def test_governor_keeps_standin_rules_within_budget(clock):
+    rules = CaptchaRules(session_limit=120)
+    governor = CaptchaGovernor(budget=1, card_pause=(0.0, 0.0), clock=clock)
+    session = 0
+    governor.start_session()
+    captchas = 0
+    for _ in range(2000):
+        clock.now += 1.0
+        if not rules.card(f"s{session}", clock.now):
+            captchas += 1
+            governor.on_captcha()
+        else:
+            governor.on_card()
+            if not governor.should_rotate():
+                continue
+            governor.rotated()
+        session += 1
+        governor.start_session()
+
+    assert captchas == 1
+    assert governor.rotations > 10
+
+
+def test_probe_skips_until_signal_or_recheck():
+    page = object()
+    probe = CaptchaProbe(recheck_every=3)
+    probe.page = page
+    probe.dirty = False
+
+    assert [probe.due(page) for _ in range(4)] == [False, False, False, True]
+    probe._on_signal()
+    assert probe.due(page)
+    assert probe.due(object())
+    assert probe.checks == 3 and probe.skipped == 3 and probe.signals == 1
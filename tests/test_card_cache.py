@@ -0,0 +1,47 @@
+"""CardCache TTL, refresh flag and hit/miss counters."""
+from app.card_cache import CardCache
+from app.organization import Organization
+
+
+def make_cache(tmp_path, **kwargs) -> CardCache:
+    return CardCache(tmp_path / "cards.sqlite", **kwargs)
+
+
+def test_hit_after_put_and_miss_for_unknown(tmp_path):
+    cache = make_cache(tmp_path)
+    org = Organization(name="Кофейня", phone="+74951234567")
+    cache.put("1", org)
+
+    assert cache.get("1") == org
+    assert cache.get("2") is None
+    assert (cache.hits, cache.misses, cache.writes) == (1, 1, 1)
+    cache.close()
+
+
+def test_expired_entry_is_a_miss_and_purged(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    now = 1_000_000.0
+    monkeypatch.setattr("app.card_cache.time.time", lambda: now)
+    cache.put("1", Organization(name="Аптека"))
+
+    now += 61
+    assert cache.get("1") is None
+    assert cache.misses == 1
+    assert cache.purge_expired() == 1
+    cache.close()
+
+
+def test_refresh_skips_reads_but_keeps_writes(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("1", Organization(name="Старое"))
+    cache.close()
+
+    refreshing = make_cache(tmp_path, refresh=True)
+    assert refreshing.get("1") is None
+    refreshing.put("1", Organization(name="Новое"))
+    refreshing.close()
+
+    cache = make_cache(tmp_path)
+    assert cache.get("1").name == "Новое"
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
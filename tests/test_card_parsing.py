@@ -0,0 +1,146 @@
+"""Card parsing: recorded evaluate payloads, locator fallback and browser parity."""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+# pacser_maps тянет Playwright и app.utils; без них проверять нечего.
+pacser_maps = pytest.importorskip("app.pacser_maps")
+
+FIXTURES = Path(__file__).parent / "fixtures" / "cards"
+CARDS = ("blue_card", "green_card")
+
+TITLE = "h1.card-title-view__title a.card-title-view__title-link"
+BADGE = "h1.card-title-view__title span.business-verified-badge"
+
+# Таблица «селектор → узлы» для локаторного пути: evaluate здесь не повторяется.
+BLUE_NODES = {
+    TITLE: [{"text": "Кофейня «Зерно»", "attrs": {"href": "/maps/org/zerno/1234567890/"}}],
+    ".business-rating-badge-view__rating-text": [{"text": "4,8"}],
+    ".business-header-rating-view__text": [{"text": "152 оценки"}],
+    "span[itemprop='telephone']": [{"text": "+7 (495) 123-45-67"}, {"text": "8 916 765-43-21"}],
+    ".business-header-awards-view__award-text": [{"text": "Хорошее место 2024"}],
+    "a.business-urls-view__link[href]": [{"attrs": {"href": "https://zerno.example/?utm_source=yandex"}}],
+    ".business-urls-view__text": [{"text": "zerno.example"}],
+    "a[href]": [
+        {"attrs": {"href": "/maps/org/zerno/1234567890/"}},
+        {"attrs": {"href": "https://zerno.example/?utm_source=yandex"}},
+        {"attrs": {"href": "https://vk.com/zerno"}},
+        {"attrs": {"href": "https://t.me/zerno_coffee"}},
+        {"attrs": {"href": "https://wa.me/79167654321"}},
+    ],
+    BADGE: [{"fills": ["#ffffff", "#196dff"]}],
+}
+
+
+class FakeLocator:
+    def __init__(self, nodes: list[dict]) -> None:
+        self.nodes = nodes
+
+    @property
+    def first(self) -> "FakeLocator":
+        return FakeLocator(self.nodes[:1])
+
+    def nth(self, index: int) -> "FakeLocator":
+        return FakeLocator(self.nodes[index:index + 1])
+
+    def count(self) -> int:
+        return len(self.nodes)
+
+    def text_content(self) -> str:
+        return self.nodes[0].get("text", "")
+
+    def get_attribute(self, name: str):
+        return self.nodes[0].get("attrs", {}).get(name)
+
+    def all_text_contents(self) -> list[str]:
+        return [node.get("text", "") for node in self.nodes]
+
+    def evaluate(self, script: str):
+        # Единственный evaluate локаторного пути — цвета заливки значка.
+        return self.nodes[0].get("fills", [])
+
+
+class FakeCardRoot:
+    # evaluate всегда падает: так проверяется только откат на локаторы.
+    def __init__(self, nodes: dict) -> None:
+        self.nodes = nodes
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(self.nodes.get(selector, []))
+
+    def evaluate(self, script: str):
+        raise RuntimeError("Execution context was destroyed")
+
+
+def load_payload(name: str) -> dict:
+    return json.loads((FIXTURES / f"{name}.payload.json").read_text(encoding="utf-8"))
+
+
+def from_payload(name: str, org_id: str):
+    raw = pacser_maps.YandexMapsScraper._raw_from_payload(load_payload(name))
+    return pacser_maps.YandexMapsScraper._organization_from_raw(raw, org_id)
+
+
+def test_blue_card_payload():
+    org = from_payload("blue_card", "1234567890")
+    assert org.name == "Кофейня «Зерно»"
+    assert org.verified == "синяя"
+    assert org.award == "Хорошее место 2024"
+    assert org.vk == "https://vk.com/zerno"
+    assert org.telegram == "https://t.me/zerno_coffee"
+    assert org.whatsapp == "https://wa.me/79167654321"
+    assert org.phone == "+74951234567"
+    assert org.card_url == "https://yandex.ru/maps/org/1234567890/"
+
+
+def test_green_card_payload():
+    org = from_payload("green_card", "987")
+    assert org.verified == "зелёная"
+    assert org.viber.startswith("viber://")
+    assert org.phone == ""
+
+
+def test_malformed_payload_is_rejected():
+    assert pacser_maps.YandexMapsScraper._raw_from_payload(None) is None
+    assert pacser_maps.YandexMapsScraper._raw_from_payload(["not", "a", "dict"]) is None
+
+
+def test_failed_evaluate_falls_back_to_locators():
+    scraper = pacser_maps.YandexMapsScraper("кафе", card_extraction="evaluate")
+    org = scraper._parse_card_raw(FakeCardRoot(BLUE_NODES), "1234567890")
+    assert org == from_payload("blue_card", "1234567890")
+
+
+@pytest.fixture(scope="module")
+def browser_page():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    with sync_api.sync_playwright() as playwright:
+        try:
+            browser = playwright.chromium.launch(headless=True)
+        except Exception as exc:
+            pytest.skip(f"Chromium недоступен: {exc}")
+        page = browser.new_page()
+        yield page
+        browser.close()
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_script_matches_recorded_payload(browser_page, name):
+    browser_page.set_content((FIXTURES / f"{name}.html").read_text(encoding="utf-8"))
+    card_root = browser_page.locator("div.business-card-view[data-id]").first
+    assert card_root.evaluate(pacser_maps.CARD_PAYLOAD_SCRIPT) == load_payload(name)
+
+
+@pytest.mark.parametrize("name", CARDS)
+def test_evaluate_and_locators_agree_in_browser(browser_page, name):
+    browser_page.set_content((FIXTURES / f"{name}.html").read_text(encoding="utf-8"))
+    card_root = browser_page.locator("div.business-card-view[data-id]").first
+    org_id = card_root.get_attribute("data-id")
+    results = [
+        pacser_maps.YandexMapsScraper("кафе", card_extraction=mode)._parse_card_raw(card_root, org_id)
+        for mode in ("evaluate", "locators")
+    ]
+    assert results[0] == results[1]
@@ -0,0 +1,123 @@
+"""CardFetchPool round-robin, retry and captcha handling with fake pages."""
+import pytest
+
+card_pool = pytest.importorskip("app.card_pool")
+
+
+class FakeLocator:
+    def __init__(self, found: bool) -> None:
+        self.found = found
+
+    @property
+    def first(self) -> "FakeLocator":
+        return self
+
+    def count(self) -> int:
+        return 1 if self.found else 0
+
+
+class FakePage:
+    # outcomes: org_id -> список исходов по попыткам ("ok", "hang", "captcha").
+    def __init__(self, outcomes: dict) -> None:
+        self.outcomes = outcomes
+        self.url = "about:blank"
+        self.ready_id = ""
+        self.visited: list[str] = []
+        self.closed = False
+
+    def set_default_timeout(self, _timeout) -> None:
+        pass
+
+    def evaluate(self, _script, url) -> None:
+        org_id = url.rstrip("/").rsplit("/", 1)[-1]
+        self.visited.append(org_id)
+        attempts = self.outcomes.get(org_id) or ["ok"]
+        outcome = attempts.pop(0) if len(attempts) > 1 else attempts[0]
+        self.ready_id = org_id if outcome == "ok" else ""
+        self.url = "https://yandex.ru/showcaptcha?retpath=x" if outcome == "captcha" else url
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(bool(self.ready_id) and (self.ready_id in selector or selector == card_pool.CardFetchPool.card_selector))
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, outcomes: dict | None = None) -> None:
+        self.outcomes = outcomes or {}
+        self.pages: list[FakePage] = []
+
+    def new_page(self) -> FakePage:
+        page = FakePage(self.outcomes)
+        self.pages.append(page)
+        return page
+
+
+def make_pool(context, ensure_no_captcha=lambda page: page, **kwargs):
+    pool = card_pool.CardFetchPool(
+        context,
+        parse_card=lambda _card, org_id: f"org-{org_id}",
+        url_for_id=lambda org_id: f"https://yandex.ru/maps/org/{org_id}/",
+        ensure_no_captcha=ensure_no_captcha,
+        progress_every=0,
+        **kwargs,
+    )
+    pool.poll_interval = 0
+    return pool
+
+
+def test_cards_are_spread_over_all_pages():
+    context = FakeContext()
+    pool = make_pool(context, concurrency=2)
+
+    results = dict(pool.fetch(["1", "2", "3", "4"]))
+
+    assert results == {org_id: f"org-{org_id}" for org_id in ("1", "2", "3", "4")}
+    assert len(context.pages) == 2
+    assert all(len(page.visited) == 2 for page in context.pages)
+    assert all(page.closed for page in context.pages)
+    assert pool.stats.parsed == 4
+
+
+def test_hanging_card_is_retried_then_dropped():
+    context = FakeContext({"1": ["hang", "ok"], "2": ["hang"]})
+    pool = make_pool(context, concurrency=1, card_timeout=0)
+
+    results = dict(pool.fetch(["1", "2"]))
+
+    assert results == {"1": "org-1"}
+    assert pool.stats.retries == 2
+    assert pool.stats.failed == 1
+    assert context.pages[0].visited == ["1", "1", "2", "2"]
+
+
+def test_captcha_is_resolved_and_card_reloaded():
+    context = FakeContext({"1": ["captcha", "ok"]})
+    solved_on = []
+    pool = make_pool(context, ensure_no_captcha=lambda page: solved_on.append(page) or page, concurrency=1)
+
+    results = dict(pool.fetch(["1"]))
+
+    assert results == {"1": "org-1"}
+    assert pool.stats.captcha_hits == 1
+    assert solved_on == context.pages
+
+
+def test_unresolved_captcha_stops_the_pool():
+    context = FakeContext({"1": ["captcha"]})
+    pool = make_pool(context, ensure_no_captcha=lambda page: None, concurrency=1)
+
+    assert list(pool.fetch(["1", "2"])) == []
+    assert pool.stats.captcha_hits == 1
+    assert context.pages[0].visited == ["1"]
+    assert context.pages[0].closed
+
+
+def test_captcha_tab_opened_elsewhere_is_closed():
+    context = FakeContext({"1": ["captcha", "ok"]})
+    extra = FakePage({})
+    pool = make_pool(context, ensure_no_captcha=lambda page: extra, concurrency=1)
+
+    assert dict(pool.fetch(["1"])) == {"1": "org-1"}
+    assert extra.closed
@@ -0,0 +1,64 @@
+"""Run journal recovery after a crash mid-line."""
+from __future__ import annotations
+
+import pytest
+
+checkpoint = pytest.importorskip("app.checkpoint")
+Organization = checkpoint.Organization
+RunJournal = checkpoint.RunJournal
+
+
+def test_resume_after_torn_line(tmp_path):
+    path = tmp_path / "result.journal.jsonl"
+    journal = RunJournal(path)
+    journal.write_header("кафе", tmp_path / "result.xlsx")
+    journal.write_org("1", Organization(name="Первая"))
+    journal.close()
+    # Процесс упал посреди записи.
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"type": "org", "id": "2", "org": {"na')
+
+    journal = RunJournal(path)
+    journal.write_org("3", Organization(name="Третья"))
+    journal.close()
+
+    state = RunJournal.load(path)
+    assert state.query == "кафе"
+    assert sorted(state.orgs) == ["1", "3"]
+    assert state.orgs["3"].name == "Третья"
+
+
+def test_load_skips_non_object_lines(tmp_path):
+    path = tmp_path / "result.journal.jsonl"
+    path.write_text('[1, 2]\n"text"\n{"type": "ids", "ids": ["7", "8"]}\n{"type": "org", "id": "7", "org": null}\n',
+                    encoding="utf-8")
+    state = RunJournal.load(path)
+    assert state.all_ids == ["7", "8"]
+    assert state.orgs == {}
+
+
+def test_truncated_streaming_journal_is_rediscovered(tmp_path):
+    path = tmp_path / "result.journal.jsonl"
+    journal = RunJournal(path)
+    journal.write_header("кафе", tmp_path / "result.xlsx")
+    # Потоковый сбор: id порциями вперемешку с карточками, отметки о конце нет.
+    journal.write_ids(["1", "2"])
+    journal.write_org("1", Organization(name="Первая"))
+    journal.write_ids(["3"])
+    journal.close()
+
+    state = RunJournal.load(path)
+    assert state.all_ids == ["1", "2", "3"]
+    assert state.known_ids is None
+    assert sorted(state.orgs) == ["1"]
+
+
+def test_complete_id_list_is_reused(tmp_path):
+    path = tmp_path / "result.journal.jsonl"
+    journal = RunJournal(path)
+    journal.write_ids(["1", "2"])
+    journal.write_ids(["2", "3"])
+    journal.mark_ids_complete()
+    journal.close()
+
+    assert RunJournal.load(path).known_ids == ["1", "2", "3"]
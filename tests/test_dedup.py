@@ -0,0 +1,86 @@
+"""Cross-query dedup index: merge keys, shared phones and master export."""
+import pytest
+
+dedup = pytest.importorskip("app.dedup")
+
+from app.organization import Organization  # noqa: E402
+
+
+def _org(org_id, **values):
+    return Organization(card_url=f"https://yandex.ru/maps/org/{org_id}/", **values)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = dedup.DedupIndex(tmp_path / "dedup.sqlite3")
+    yield index
+    index.close()
+
+
+def test_same_phone_merges_and_fills_empty_fields(index):
+    first, is_new = index.add(_org("1", name="Кофейня", phone="+7 (812) 555-01-02"), query="кофе")
+    second, second_new = index.add(
+        _org("2", name="КОФЕЙНЯ", phone="8 812 555 01 02", website="coffee.ru"), query="кафе"
+    )
+
+    assert is_new and not second_new
+    assert first == second == "1"
+    (master_id, org, queries), = index.masters()
+    assert master_id == "1"
+    assert org.name == "Кофейня" and org.website == "coffee.ru"
+    assert queries == ["кофе", "кафе"]
+
+
+def test_phone_and_domain_merge_without_name(index):
+    index.add(_org("1", name="Кофейня на Невском", phone="+7 (812) 555-01-02", website="https://coffee.ru/"))
+    master, is_new = index.add(_org("2", name="Coffee", phone="8 812 555 01 02", website="www.coffee.ru"))
+
+    assert not is_new and master == "1"
+
+
+def test_single_shared_key_does_not_merge(index):
+    index.add(_org("1", name="Стоматология", phone="+7 (495) 123-45-67"))
+    _master, phone_only = index.add(_org("2", name="Юрист", phone="+7 (495) 123-45-67"))
+    index.add(_org("3", name="Додо Пицца", website="dodopizza.ru"))
+    _master, domain_only = index.add(_org("4", name="Додо Пицца", website="https://dodopizza.ru/"))
+
+    assert phone_only and domain_only
+    assert len(index) == 4
+
+
+def test_three_branches_of_one_chain_stay_separate(index):
+    # Общий номер колл-центра и сайт сети, у каждого филиала свой адрес в названии.
+    for number, street in enumerate(("Тверская", "Арбат", "Маросейка"), start=1):
+        branch = _org(
+            str(number), name=f"Кофе Хауз, {street}", phone="+7 (495) 777-77-77", website=f"{number}.coffee.ru"
+        )
+        _master, is_new = index.add(branch)
+        assert is_new
+    assert [master_id for master_id, _org, _queries in index.masters()] == ["1", "2", "3"]
+
+
+def test_toll_free_numbers_are_not_dedup_keys(index):
+    index.add(_org("1", name="Сеть 1", phone="8 (800) 555-35-35"))
+    _master, is_new = index.add(_org("2", name="Сеть 2", phone="8 (800) 555-35-35"))
+
+    assert is_new
+    assert len(index) == 2
+
+
+def test_key_shared_by_many_orgs_stops_merging(index):
+    phone, site = "+7 (495) 123-45-67", "chain.ru"
+    for number in range(1, dedup.MAX_KEY_ORGS + 1):
+        index.add(_org(str(number), name="Сеть", phone=phone, website=site))
+    _master, is_new = index.add(_org("99", name="Сеть", phone=phone, website=site))
+
+    assert is_new
+    assert index.find_master("", _org("100", name="Сеть", phone=phone, website=site)) is None
+
+
+def test_masters_streams_in_insertion_order(index, monkeypatch):
+    monkeypatch.setattr(dedup, "MASTERS_BATCH", 2)
+    for number in range(5):
+        index.add(_org(str(number), name=f"Организация {number}", website=f"site{number}.ru"))
+
+    assert [master_id for master_id, _org, _queries in index.masters()] == ["0", "1", "2", "3", "4"]
+    assert "3" in index and "42" not in index
@@ -0,0 +1,39 @@
+"""StreamingExcelWriter workbook round trip."""
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from app.excel_stream import ALL_SHEET_TITLE, POTENTIAL_SHEET_TITLE, StreamingExcelWriter  # noqa: E402
+from app.organization import Organization, organization_columns, organization_from_dict  # noqa: E402
+
+
+def read_sheet(path, title):
+    sheet = openpyxl.load_workbook(path, read_only=True)[title]
+    header, *rows = [[value or "" for value in row] for row in sheet.iter_rows(values_only=True)]
+    return [organization_from_dict(dict(zip(header, row))) for row in rows], header
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "result.xlsx"
+    orgs = [
+        Organization(name="Кофейня «Зерно»", phone="+74951234567", vk="https://vk.com/zerno", rating="4.8"),
+        Organization(name="Аптека", phones="+74951112233, 12-34-56", mobile_phone="+79161234567"),
+    ]
+    writer = StreamingExcelWriter(path)
+    writer.append(orgs[0], include_in_potential=True)
+    writer.append(orgs[1])
+    writer.close()
+
+    all_rows, header = read_sheet(path, ALL_SHEET_TITLE)
+    potential_rows, _ = read_sheet(path, POTENTIAL_SHEET_TITLE)
+    assert header == organization_columns()
+    assert all_rows == orgs
+    assert potential_rows == orgs[:1]
+    assert (writer.rows, writer.potential_rows) == (2, 1)
+
+
+def test_append_after_close_fails(tmp_path):
+    writer = StreamingExcelWriter(tmp_path / "result.xlsx")
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.append(Organization(name="Поздно"))
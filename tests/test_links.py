@@ -0,0 +1,106 @@
+"""Link classification and website canonicalization."""
+import pytest
+
+from app.links import canonical_website, classify_links, classify_url, host_kind, website_domain
+
+
+@pytest.mark.parametrize(
+    "url, domain",
+    [
+        ("https://www.Coffee.example:8443/menu?utm_source=yandex", "coffee.example"),
+        ("coffee.example/menu", "coffee.example"),
+        ("//shop.coffee.example", "shop.coffee.example"),
+        ("http://user@coffee.example/", "coffee.example"),
+        ("", ""),
+        ("localhost", ""),
+    ],
+)
+def test_website_domain(url, domain):
+    assert website_domain(url) == domain
+
+
+@pytest.mark.parametrize(
+    "url, canonical",
+    [
+        ("https://coffee.ru/menu/?yclid=1&utm_medium=cpc&page=2", "https://coffee.ru/menu/?page=2"),
+        ("https://site.ru/?utm_source=yandex&id=5", "https://site.ru/?id=5"),
+        ("https://site.ru/?utm_source=yandex", "https://site.ru"),
+        ("HTTP://Site.RU/", "http://site.ru"),
+        ("site.ru/?r=http://x", "https://site.ru/?r=http://x"),
+        ("https://yandex.ru/maps/org/1/", "https://yandex.ru/maps/org/1/"),
+        ("mailto:info@site.ru", ""),
+    ],
+)
+def test_canonical_website(url, canonical):
+    assert canonical_website(url) == canonical
+
+
+@pytest.mark.parametrize(
+    "href, expected",
+    [
+        (
+            "https://yandex.ru/redirect?url=https%3A%2F%2Fcoffee.ru%2F%3Futm_source%3Dya",
+            ("website", "https://coffee.ru"),
+        ),
+        ("https://clck.yandex.ru/redir/abc/*https://coffee.ru/menu", ("website", "https://coffee.ru/menu")),
+        ("https://vk.com/away.php?to=https%3A%2F%2Ft.me%2Fcoffee", ("telegram", "https://t.me/coffee")),
+        ("https://yandex.ru/maps/org/1/", ("", "")),
+    ],
+)
+def test_redirects_are_unwrapped(href, expected):
+    assert classify_url(href) == expected
+
+
+@pytest.mark.parametrize(
+    "href",
+    [
+        "https://vk.com/share.php?url=https://yandex.ru/maps/org/1/",
+        "https://t.me/share/url?url=https://yandex.ru/maps/org/1/",
+        "https://connect.ok.ru/dk?st.cmd=WidgetSharePreview",
+        "https://wa.me/send?text=https://yandex.ru/maps/org/1/",
+    ],
+)
+def test_share_buttons_are_not_contacts(href):
+    assert classify_url(href) == ("", "")
+
+
+@pytest.mark.parametrize(
+    "href, expected",
+    [
+        ("https://m.vk.com/coffee?w=wall-1", ("vk", "https://vk.com/coffee")),
+        ("https://telegram.me/coffee", ("telegram", "https://t.me/coffee")),
+        ("tg://resolve?domain=coffee", ("telegram", "https://t.me/coffee")),
+        ("https://api.whatsapp.com/send?phone=%2B79991234567", ("whatsapp", "https://wa.me/79991234567")),
+        ("https://www.odnoklassniki.ru/group/1", ("ok", "https://ok.ru/group/1")),
+        (
+            "https://www.youtube.com/@coffee?si=abc&utm_source=x",
+            ("youtube", "https://www.youtube.com/@coffee?si=abc"),
+        ),
+        ("https://instagr.am/coffee/", ("instagram", "https://instagram.com/coffee")),
+        ("viber://chat?number=123&utm_source=x", ("viber", "viber://chat?number=123")),
+    ],
+)
+def test_social_links_are_canonicalized(href, expected):
+    assert classify_url(href) == expected
+
+
+def test_host_kind_walks_parent_domains():
+    assert host_kind("m.vk.com") == "vk"
+    assert host_kind("clck.yandex.ru") == "yandex"
+    assert host_kind("vk.com.evil.ru") is None
+
+
+def test_classify_links_takes_first_link_per_network():
+    links = classify_links(
+        [
+            "tel:+79991234567",
+            "https://vk.com/share.php?url=x",
+            "https://vk.com/first",
+            "https://vk.com/second",
+        ],
+        website="https://coffee.ru/?utm_source=yandex",
+    )
+
+    assert links.vk == "https://vk.com/first"
+    assert links.website == "https://coffee.ru"
+    assert links.telegram == ""
@@ -0,0 +1,49 @@
+"""Prometheus rendering for single-process timers and worker snapshots."""
+from app.metrics import MetricsServer, timer_snapshot
+from app.timing import StageTimer
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def _worker_timer(cards, captchas, ids_total, stage=""):
+    timer = StageTimer()
+    for _ in range(captchas):
+        timer.record("captcha_wait", 2.0)
+    timer.count_card(cards)
+    timer.set_progress(cards, ids_total)
+    timer.current_stage = stage
+    return timer
+
+
+def test_single_process_timer():
+    server = MetricsServer("127.0.0.1:0")
+    server.attach(_worker_timer(3, 1, 10, stage="card_wait"), "кафе")
+
+    samples = _samples(server.render())
+
+    assert samples['serm_ids_discovered{query="кафе"}'] == "10"
+    assert samples["serm_captcha_total"] == "1"
+    assert samples['serm_current_stage{stage="card_wait"}'] == "1"
+    assert samples["serm_queries_started_total"] == "1"
+
+
+def test_worker_snapshots_are_aggregated():
+    server = MetricsServer("127.0.0.1:0")
+    server.update_remote((0, "кафе", 1), timer_snapshot(_worker_timer(4, 1, 20, stage="card_wait"), "кафе"))
+    server.update_remote((1, "кафе", 2), timer_snapshot(_worker_timer(5, 2, 20, stage="card_wait"), "кафе"))
+    server.update_remote(
+        (2, "бар", 0), timer_snapshot(_worker_timer(7, 0, 7), "бар", active=False)
+    )
+
+    samples = _samples(server.render())
+
+    assert samples["serm_cards_total"] == "16"
+    assert samples["serm_captcha_total"] == "3"
+    assert samples["serm_captcha_wait_seconds_total"] == "6"
+    assert samples['serm_ids_discovered{query="кафе"}'] == "40"
+    assert samples['serm_ids_parsed{query="кафе"}'] == "9"
+    assert 'serm_ids_discovered{query="бар"}' not in samples
+    assert samples['serm_current_stage{stage="card_wait"}'] == "2"
+    assert samples["serm_queries_started_total"] == "3"
@@ -0,0 +1,59 @@
+"""Card phone extraction: E.164, extensions and short local numbers."""
+from app.phones import card_phones, extract_phones, load_registry
+
+
+def _registry(tmp_path):
+    (tmp_path / "area_codes.csv").write_text("495;Москва\n8342;Саранск\n", encoding="utf-8")
+    (tmp_path / "ABC-4xx.csv").write_text(
+        "АВС/ DEF;От;До;Емкость;Оператор;Регион\n495;1000000;9999999;9000000;МГТС;г. Москва\n",
+        encoding="cp1251",
+    )
+    return load_registry([tmp_path / "area_codes.csv", tmp_path / "ABC-4xx.csv"])
+
+
+def test_short_number_is_kept_raw_without_known_area_code():
+    phones = card_phones(["+7 (495) 123-45-67", "12-34-56"])
+
+    assert phones.phone == "+74951234567"
+    assert phones.phones == "+74951234567, 12-34-56"
+
+
+def test_short_number_is_completed_only_with_matching_code_length(tmp_path):
+    index = _registry(tmp_path)
+
+    assert index.area_codes == {"495", "8342"}
+    assert extract_phones(["+7 (495) 123-45-67", "765-43-21", "12-34-56"], index) == [
+        "+74951234567",
+        "+74957654321",
+        "12-34-56",
+    ]
+    assert extract_phones(["8 (8342) 12-34-56", "65-43-21"], index) == ["+78342123456", "+78342654321"]
+
+
+def test_phone_column_is_first_plain_number():
+    phones = card_phones(["+7 495 111-22-33 доб. 12", "+375 29 123-45-67", "+7 (916) 000-00-00"])
+
+    assert phones.phone == "+74951112233"
+    assert phones.phones == "+74951112233;ext=12, +375291234567, +79160000000"
+    assert phones.mobile_phone == "+79160000000"
+
+
+def test_text_without_a_number_is_dropped():
+    assert card_phones(["Показать телефон", ""]).phones == ""
+
+
+def test_extension_after_comma_stays_with_its_number():
+    assert extract_phones(["+7 (495) 123-45-67, доб. 123"]) == ["+74951234567;ext=123"]
+    assert extract_phones(["+7 (495) 123-45-67, 8 (495) 765-43-21; (495) 111-22-33"]) == [
+        "+74951234567",
+        "+74957654321",
+        "+74951112233",
+    ]
+
+
+def test_foreign_number_is_kept_in_phones_but_not_in_phone():
+    phones = card_phones(["+375 29 123-45-67", "+7 (495) 123-45-67"])
+
+    assert phones.phone == "+74951234567"
+    assert phones.phones == "+375291234567, +74951234567"
+    assert card_phones(["+375 29 123-45-67"]).phone == ""
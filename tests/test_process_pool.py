@@ -0,0 +1,61 @@
+"""Process orchestrator bookkeeping that runs in the main process."""
+import queue
+import threading
+
+import pytest
+
+process_pool = pytest.importorskip("app.process_pool")
+
+
+def _orchestrator(**kwargs):
+    return process_pool.ProcessOrchestrator(["кафе Москва"], settings=None, results_dir=".", **kwargs)
+
+
+def test_captcha_budget_is_split_between_started_workers():
+    orchestrator = _orchestrator(workers=8, worker_options={"captcha_budget": 6.0, "dedup_path": "x"})
+
+    assert orchestrator._worker_options(3) == {"captcha_budget": 2.0, "dedup_path": "x"}
+    assert orchestrator.worker_options["captcha_budget"] == 6.0
+
+
+def test_one_resume_releases_the_longest_waiting_worker():
+    stages = []
+    orchestrator = _orchestrator(
+        captcha_resume_event=threading.Event(), captcha_hook=lambda stage, _page: stages.append(stage)
+    )
+    orchestrator._resume_events = [threading.Event() for _ in range(3)]
+
+    orchestrator._on_captcha(2, "detected")
+    orchestrator._on_captcha(0, "detected")
+    orchestrator.captcha_resume_event.set()
+    orchestrator._forward_resume()
+
+    assert [event.is_set() for event in orchestrator._resume_events] == [False, False, True]
+    assert not orchestrator.captcha_resume_event.is_set()
+    assert stages == ["detected", "detected"]
+
+    orchestrator._on_captcha(0, "resolved")
+    orchestrator.captcha_resume_event.set()
+    orchestrator._forward_resume()
+
+    assert not orchestrator._resume_events[0].is_set()
+
+
+def test_worker_reports_timer_snapshots():
+    from app.timing import StageTimer
+
+    results = queue.Queue()
+    timer = StageTimer()
+    with process_pool._report_stats(results, (0, "кафе", 0), timer, "кафе", interval=0.01):
+        timer.count_card(2)
+        timer.set_progress(2, 5)
+        threading.Event().wait(0.05)
+
+    messages = []
+    while not results.empty():
+        messages.append(results.get_nowait())
+    assert all(kind == "stats" and key == (0, "кафе", 0) for kind, key, _snapshot in messages)
+    assert len(messages) >= 2
+    final = messages[-1][2]
+    assert not final["active"]
+    assert final["cards"] == 2 and final["ids_total"] == 5
@@ -0,0 +1,88 @@
+"""RequestBlocker presets: resource types, URL patterns and captcha exemption."""
+import pytest
+
+from app.request_blocking import RequestBlocker, get_preset
+
+SEARCH_XHR = "https://yandex.ru/maps/api/search?text=кафе"
+
+
+class FakeRequest:
+    def __init__(self, url: str, resource_type: str, frame_url: str = "") -> None:
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = type("Frame", (), {"url": frame_url})()
+
+
+class FakeRoute:
+    def __init__(self, request: FakeRequest) -> None:
+        self.request = request
+        self.outcome = ""
+
+    def continue_(self) -> None:
+        self.outcome = "continue"
+
+    def abort(self, _reason: str) -> None:
+        self.outcome = "abort"
+
+
+def test_off_blocks_nothing_and_installs_no_route():
+    blocker = RequestBlocker("off")
+    routed = []
+    blocker.install(type("Context", (), {"route": lambda self, *args: routed.append(args)})())
+
+    assert not blocker.enabled
+    assert routed == []
+    assert not blocker.should_block("https://mc.yandex.ru/watch/1", "image")
+
+
+@pytest.mark.parametrize(
+    "url, resource_type, blocked",
+    [
+        ("https://avatars.mds.yandex.net/get-altay/1.jpg", "image", True),
+        ("https://yastatic.net/s3/front-maps-static/font.woff2", "font", True),
+        ("https://yastatic.net/s3/front-maps-static/main.css", "stylesheet", False),
+        ("https://mc.yandex.ru/watch/12345", "script", True),
+        ("https://core-renderer-tiles.maps.yandex.net/tiles?l=map", "fetch", True),
+        (SEARCH_XHR, "xhr", False),
+        ("https://yastatic.net/s3/front-maps-static/main.js", "script", False),
+    ],
+)
+def test_list_only_preset(url, resource_type, blocked):
+    assert RequestBlocker("list-only").should_block(url, resource_type) is blocked
+
+
+def test_card_only_preset_also_drops_stylesheets():
+    blocker = RequestBlocker("card-only")
+    assert blocker.should_block("https://yastatic.net/s3/front-maps-static/main.css", "stylesheet")
+    assert not blocker.should_block(SEARCH_XHR, "xhr")
+
+
+def test_captcha_requests_are_never_blocked():
+    blocker = RequestBlocker("card-only")
+    assert not blocker.should_block("https://yandex.ru/captcha/image.png", "image")
+    assert not blocker.should_block(
+        "https://avatars.mds.yandex.net/x.png", "image", frame_url="https://yandex.ru/showcaptcha?retpath=x"
+    )
+
+
+def test_extra_patterns_extend_the_preset():
+    blocker = RequestBlocker("off", extra_patterns=[r"metrika\.example"])
+    assert blocker.enabled
+    assert blocker.should_block("https://metrika.example/collect", "xhr")
+
+
+def test_handle_counts_blocked_and_allowed():
+    blocker = RequestBlocker("list-only")
+    image = FakeRoute(FakeRequest("https://avatars.mds.yandex.net/1.jpg", "image"))
+    search = FakeRoute(FakeRequest(SEARCH_XHR, "xhr"))
+    blocker._handle(image)
+    blocker._handle(search)
+
+    assert (image.outcome, search.outcome) == ("abort", "continue")
+    assert (blocker.blocked, blocker.allowed) == (1, 1)
+    assert blocker.blocked_by_type == {"image": 1}
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError):
+        get_preset("everything")
@@ -0,0 +1,76 @@
+"""Search API payloads: recorded fixture shape and the stand-in endpoint."""
+import json
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+search_api = pytest.importorskip("app.search_api")
+
+from benchmarks.maps_standin import MapsStandIn, StandInConfig  # noqa: E402
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "search_api"
+
+
+def _filters(**overrides):
+    values = {"exclude_blue_checkmark": False, "exclude_green_checkmark": False, "exclude_good_place": False}
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_search_page_fixture():
+    data = json.loads((FIXTURES / "search_page.json").read_text(encoding="utf-8"))
+
+    parsed = search_api.parse_search_payload(data)
+
+    assert list(parsed) == ["1124715036", "2235826147"]
+    cafe = parsed["1124715036"]
+    assert cafe.name == "Кофейня на Литейном"
+    assert cafe.phone == "+78125550102"
+    assert cafe.mobile_phone == "+79215550304"
+    assert cafe.website == "http://coffee-liteyny.ru"
+    assert cafe.vk == "https://vk.com/coffee_liteyny"
+    assert cafe.telegram == "https://t.me/coffee_liteyny"
+    assert cafe.rating == "4.8"
+    assert cafe.rating_count == "312"
+    assert cafe.card_url.endswith("/1124715036/")
+    assert parsed["2235826147"].website == ""
+
+
+def test_collector_against_standin_search_api():
+    collector = search_api.SearchResponseCollector(required_fields=("name", "phone"))
+    config = StandInConfig(cards=30, page_size=10, list_latency=(0.0, 0.0))
+    with MapsStandIn(config) as standin:
+        origin = standin.base_url.split("/web-maps/", 1)[0]
+        for skip in (0, 10, 20):
+            with urllib.request.urlopen(f"{origin}/maps/api/search?text=x&skip={skip}&results=10") as response:
+                collector.feed(json.loads(response.read().decode("utf-8")))
+        expected = [standin.fields_for(index) for index in range(config.cards)]
+
+    assert collector.responses == 3
+    assert len(collector.records) == config.cards
+    for fields in expected:
+        org = collector.get(fields["id"])
+        assert org is not None
+        assert org.name == fields["name"]
+        assert org.rating == fields["rating"].replace(",", ".")
+        assert org.rating_count == str(fields["count"])
+        assert bool(org.website) == bool(fields["website"])
+        assert bool(org.vk) == any(link["type"] == "vkontakte" for link in fields["social_links"])
+        assert collector.is_complete(org) == bool(org.phone)
+
+
+def test_required_fields_follow_potential_filters():
+    assert search_api.required_fields_for(_filters()) == ("name", "phone", "website")
+    assert "verified" in search_api.required_fields_for(_filters(exclude_green_checkmark=True))
+    assert "award" in search_api.required_fields_for(_filters(exclude_good_place=True))
+
+    data = json.loads((FIXTURES / "search_page.json").read_text(encoding="utf-8"))
+    org = search_api.parse_search_payload(data)["1124715036"]
+    assert search_api.SearchResponseCollector(search_api.required_fields_for(_filters())).is_complete(org)
+    assert not search_api.SearchResponseCollector(
+        search_api.required_fields_for(_filters(exclude_blue_checkmark=True))
+    ).is_complete(org)
+    assert not search_api.SearchResponseCollector().is_complete(org)
@@ -0,0 +1,85 @@
+"""CSV, JSONL and columnar JSON sinks and output path resolution."""
+import csv
+import json
+from pathlib import Path
+
+from app.organization import Organization, organization_columns
+from app.sinks import (
+    POTENTIAL_COLUMN,
+    ColumnarJsonSink,
+    CsvSink,
+    JsonlSink,
+    MultiSink,
+    open_sinks,
+    resolve_output_paths,
+)
+
+ORGS = [
+    (Organization(name="Кофейня «Зерно», центр", phone="+74951234567"), True),
+    (Organization(name='Аптека "Здоровье"', phones="+74951112233;ext=12, 12-34-56"), False),
+]
+
+
+def fill(sink):
+    for org, include in ORGS:
+        sink.append(org, include_in_potential=include)
+    sink.close()
+
+
+def test_csv_sink(tmp_path):
+    path = tmp_path / "result.csv"
+    fill(CsvSink(path, flush_every=1))
+
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        header, *rows = list(csv.reader(handle))
+    assert header == [*organization_columns(), POTENTIAL_COLUMN]
+    assert [row[:-1] for row in rows] == [[getattr(org, column) for column in organization_columns()] for org, _ in ORGS]
+    assert [row[-1] for row in rows] == ["1", "0"]
+
+
+def test_jsonl_sink(tmp_path):
+    path = tmp_path / "result.jsonl"
+    fill(JsonlSink(path))
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record.pop(POTENTIAL_COLUMN) for record in records] == [True, False]
+    assert [Organization(**record) for record in records] == [org for org, _ in ORGS]
+
+
+def test_columnar_json_sink(tmp_path):
+    path = tmp_path / "result.json"
+    sink = ColumnarJsonSink(path)
+    fill(sink)
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["rows"] == 2
+    assert data["columns"]["name"] == [org.name for org, _ in ORGS]
+    assert data["columns"][POTENTIAL_COLUMN] == [True, False]
+    assert list(data["columns"]) == [*organization_columns(), POTENTIAL_COLUMN]
+    # Временные файлы колонок убраны.
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["result.json"]
+
+
+def test_columnar_json_sink_without_rows(tmp_path):
+    path = tmp_path / "empty.json"
+    ColumnarJsonSink(path).close()
+    assert json.loads(path.read_text(encoding="utf-8"))["columns"]["name"] == []
+
+
+def test_open_sinks_fans_out(tmp_path):
+    sink = open_sinks([tmp_path / "a.csv", tmp_path / "a.jsonl", tmp_path / "a.csv"])
+    assert isinstance(sink, MultiSink)
+    assert len(sink.sinks) == 2
+    fill(sink)
+    assert len((tmp_path / "a.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_resolve_output_paths(tmp_path):
+    default = tmp_path / "кафе" / "result.xlsx"
+    assert resolve_output_paths([], default) == [default]
+    assert resolve_output_paths([".csv", " ", "/data/out.jsonl"], default) == [
+        default.with_suffix(".csv"),
+        Path("/data/out.jsonl"),
+    ]
+    # Пакетный режим: от имени остаётся только расширение.
+    assert resolve_output_paths(["/data/out.jsonl"], default, per_query=True) == [default.with_suffix(".jsonl")]
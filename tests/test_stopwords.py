@@ -0,0 +1,87 @@
+"""Stop-word pre-check in front of passes_potential_filters."""
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from app.stopwords import StopWordMatcher, passes_filters
+
+
+def _settings(stop_words="", white_list="", exclude_no_phone=False):
+    return SimpleNamespace(
+        potential_filters=SimpleNamespace(
+            stop_words=stop_words, white_list=white_list, exclude_no_phone=exclude_no_phone
+        )
+    )
+
+
+@pytest.fixture
+def seen_settings(monkeypatch):
+    # Подменяем app.filters: проверяем, с какими настройками его зовут.
+    seen = []
+
+    def passes_potential_filters(org, settings):
+        seen.append(settings)
+        return True
+
+    monkeypatch.setitem(sys.modules, "app.filters", SimpleNamespace(passes_potential_filters=passes_potential_filters))
+    return seen
+
+
+def test_substring_and_punctuation_insensitive_match():
+    matcher = StopWordMatcher("общественная организация, мин., фонд, контрольно-счетная")
+
+    assert matcher.find_stop_word("Региональная Общественная  организация") == "общественная организация"
+    assert matcher.find_stop_word("Мин. культуры") == "мин"
+    assert matcher.find_stop_word("Фондовая биржа") == "фонд"
+    assert matcher.find_stop_word("Контрольно счётная палата") == "контрольно счетная"
+    assert matcher.find_stop_word("Кофейня") == ""
+
+
+def test_notes_in_parentheses_are_not_part_of_the_phrase():
+    matcher = StopWordMatcher("палата (общественная),управляющая компания (если не звонишь ЖКХ-сегменту)")
+
+    assert matcher.stop_phrases == ["управляющая компания", "палата"]
+    assert matcher.filter_stop_words == "палата,управляющая компания"
+    assert matcher.find_stop_word("Общественная палата района") == "палата"
+
+
+def test_every_string_field_is_checked():
+    matcher = StopWordMatcher("фонд")
+    assert matcher.is_candidate(SimpleNamespace(name="Помощь детям", website="", award="Фонд года", rating=4.5))
+    assert not matcher.is_candidate(SimpleNamespace(name="Кофейня", website="https://fond.example"))
+
+
+def test_passes_filters_skips_stop_words_only_without_candidates(seen_settings):
+    settings = _settings("палата (общественная), фонд", "фонд красоты")
+
+    assert passes_filters(SimpleNamespace(name="Кофейня"), settings)
+    assert passes_filters(SimpleNamespace(name="Салон «Фонд красоты»"), settings)
+    assert passes_filters(SimpleNamespace(name="Общественная палата"), settings)
+
+    blank, candidate, candidate_again = seen_settings
+    assert blank.potential_filters.stop_words == ""
+    # Белый список остаётся решать app.filters.
+    assert blank.potential_filters.white_list == "фонд красоты"
+    assert candidate.potential_filters.stop_words == "палата, фонд"
+    assert candidate_again is candidate
+    assert settings.potential_filters.stop_words == "палата (общественная), фонд"
+
+
+def test_settings_copies_follow_changes(seen_settings):
+    settings = _settings("фонд")
+    passes_filters(SimpleNamespace(name="Кофейня"), settings)
+    passes_filters(SimpleNamespace(name="Кондитерская"), settings)
+    settings.potential_filters.exclude_no_phone = True
+    passes_filters(SimpleNamespace(name="Кофейня"), settings)
+
+    first, second, third = seen_settings
+    assert first is second
+    assert third is not first
+    assert third.potential_filters.exclude_no_phone
+
+
+def test_empty_list_passes_settings_through(seen_settings):
+    settings = _settings()
+    passes_filters(SimpleNamespace(name="Кофейня"), settings)
+    assert seen_settings == [settings]
@@ -0,0 +1,84 @@
+"""Stage timer: reservoir percentiles, nested spans and profile.json."""
+import json
+import random
+
+import pytest
+
+from app.timing import LatencyHistogram, StageTimer
+
+
+def test_percentiles_over_full_samples():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value / 1000)
+
+    assert histogram.count == 100
+    assert histogram.min == pytest.approx(0.001) and histogram.max == pytest.approx(0.1)
+    assert histogram.mean == pytest.approx(0.0505)
+    assert histogram.percentile(0) == pytest.approx(0.001)
+    assert histogram.percentile(50) == pytest.approx(0.051)
+    assert histogram.percentile(95) == pytest.approx(0.095)
+    assert histogram.percentile(100) == pytest.approx(0.1)
+    assert LatencyHistogram().percentile(95) == 0.0
+
+
+def test_reservoir_keeps_bounded_representative_sample(monkeypatch):
+    monkeypatch.setattr(random, "randrange", random.Random(7).randrange)
+    histogram = LatencyHistogram(max_samples=200)
+    for value in range(10_000):
+        histogram.record(value / 10_000)
+
+    # Счётчики и экстремумы точные, перцентили — по выборке из 200 замеров.
+    assert len(histogram._samples) == 200
+    assert histogram.count == 10_000
+    assert histogram.min == 0.0 and histogram.max == pytest.approx(0.9999)
+    assert histogram.percentile(50) == pytest.approx(0.5, abs=0.1)
+    assert histogram.percentile(95) == pytest.approx(0.95, abs=0.05)
+
+
+def test_nested_spans_restore_current_stage():
+    timer = StageTimer()
+    with timer.span("parse"):
+        assert timer.current_stage == "parse"
+        with timer.span("card_wait") as inner:
+            assert timer.current_stage == "card_wait"
+        assert timer.current_stage == "parse"
+    assert timer.current_stage == ""
+    assert inner.seconds >= 0
+    assert timer.histograms["parse"].count == timer.histograms["card_wait"].count == 1
+
+
+def test_span_restores_stage_and_records_on_error():
+    timer = StageTimer()
+    with pytest.raises(RuntimeError):
+        with timer.span("navigate"):
+            with timer.span("captcha_wait"):
+                raise RuntimeError("boom")
+
+    assert timer.current_stage == ""
+    assert timer.histograms["captcha_wait"].count == 1
+
+
+def test_write_profile_orders_stages_and_keeps_extra(tmp_path):
+    timer = StageTimer()
+    timer.record("custom", 0.5)
+    timer.record("parse", 0.02)
+    timer.record("navigate", 1.0)
+    timer.count_card(3)
+    timer.finish()
+
+    path = timer.write_profile(tmp_path / "run" / "profile.json", query="кофе")
+    profile = json.loads(path.read_text(encoding="utf-8"))
+
+    assert path == tmp_path / "run" / "profile.json"
+    assert profile["query"] == "кофе" and profile["cards"] == 3
+    assert list(profile["stages"]) == ["navigate", "parse", "custom"]
+    assert profile["stages"]["navigate"] == {
+        "count": 1,
+        "total_s": 1.0,
+        "mean_ms": 1000.0,
+        "p50_ms": 1000.0,
+        "p95_ms": 1000.0,
+        "p99_ms": 1000.0,
+        "max_ms": 1000.0,
+    }
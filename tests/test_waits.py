@@ -0,0 +1,51 @@
+"""AdaptiveWaiter fallbacks on failed evaluate and the politeness floor."""
+import pytest
+
+from app import waits
+from app.waits import AdaptiveWaiter
+
+
+class FakePage:
+    def __init__(self, result=None, error: Exception | None = None) -> None:
+        self.result = result
+        self.error = error
+
+    def evaluate(self, _script, _arg):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_card_wait_returns_none_on_timeout_and_on_error():
+    waiter = AdaptiveWaiter()
+    # Скрипт по таймауту отдаёт null, а разрыв контекста — исключение.
+    assert waiter.wait_for_card(FakePage(result=None), "#exact", "#any") is None
+    assert waiter.wait_for_card(FakePage(error=RuntimeError("Target closed")), "#exact", "#any") is None
+    assert waiter.wait_for_card(FakePage(result="fallback"), "#exact", "#any") == "fallback"
+    assert waiter.histograms["card"].count == 3
+
+
+def test_list_growth_and_scroll_fall_back_to_empty_dict():
+    waiter = AdaptiveWaiter()
+    assert waiter.wait_for_list_growth(FakePage(error=RuntimeError("boom")), ".item", 1.0) == {}
+    assert waiter.scroll_and_wait(FakePage(result=None), ".list", ".item", 1200) == {}
+
+
+def test_politeness_keeps_the_old_floor(monkeypatch):
+    slept = []
+    monkeypatch.setattr(waits.time, "sleep", slept.append)
+    monkeypatch.setattr(waits.random, "uniform", lambda low, high: low)
+    waiter = AdaptiveWaiter()
+
+    waiter.politeness()
+    waiter.politeness(scale=2.0)
+
+    assert slept == [pytest.approx(0.2), pytest.approx(0.4)]
+    assert waiter.histograms["politeness"].count == 2
+
+
+def test_politeness_can_be_disabled(monkeypatch):
+    slept = []
+    monkeypatch.setattr(waits.time, "sleep", slept.append)
+    AdaptiveWaiter(politeness=(0.0, 0.0)).politeness()
+    assert slept == []